@@ -0,0 +1,52 @@
+from airlines.streaming import wants_streaming
+
+JSON_FORMAT = 'json'
+COLUMNAR_FORMAT = 'columnar'
+FORMATS = (JSON_FORMAT, COLUMNAR_FORMAT)
+
+
+def parse_format(request):
+    """Return the response format asked for with ``?format=``, ``json`` by default."""
+    response_format = request.GET.get('format', JSON_FORMAT)
+    if response_format not in FORMATS:
+        raise ValueError(f"The format parameter must be one of: {', '.join(FORMATS)}.")
+    if response_format == COLUMNAR_FORMAT and wants_streaming(request):
+        raise ValueError("The columnar format cannot be streamed.")
+    return response_format
+
+
+def _flatten(row, prefix=''):
+    """Yield the (dotted path, value) pairs of the leaves of a nested dict."""
+    for key, value in row.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f'{prefix}{key}.')
+        else:
+            yield prefix + key, value
+
+
+def to_columns(rows):
+    """Return the rows as one array per dotted field path, with None where a row lacks the field."""
+    columns = {}
+    for index, row in enumerate(rows):
+        for path, value in _flatten(row):
+            column = columns.get(path)
+            if column is None:
+                column = columns[path] = [None] * len(rows)
+            column[index] = value
+    return columns
+
+
+def columnar_combinations(combinations):
+    """Return the combinator payload with its round trips as arrays per field instead of one object each.
+
+    ``round_trips[i].departure_flight.price.total`` becomes
+    ``round_trips["departure_flight.price.total"][i]``, so each key is sent once instead
+    of once per round trip.
+    """
+    round_trips = combinations['round_trips']
+    return {
+        **combinations,
+        "format": COLUMNAR_FORMAT,
+        "n_round_trips": len(round_trips),
+        "round_trips": to_columns(round_trips),
+    }
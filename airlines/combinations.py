@@ -0,0 +1,75 @@
+import heapq
+
+
+def _to_cents(value):
+    """Return the value in cents, or None when it is not a whole number of cents."""
+    cents = round(value * 100)
+    if abs(value * 100 - cents) > 1e-6:
+        return None
+    return cents
+
+
+def _round_trip_total(departure_flight, return_flight):
+    """Return the round trip total exactly as ``RoundTrip._calculate_total_price`` does."""
+    total_fare = departure_flight.price['fare'] + return_flight.price['fare']
+    total_fees = departure_flight.price['fees'] + return_flight.price['fees']
+    return total_fare + total_fees
+
+
+def _iter_all_pairs(departure_flights, return_flights):
+    """Yield every pair of indexes sorted by total price, building the full product."""
+    pairs = [
+        (departure_index, return_index)
+        for departure_index in range(len(departure_flights))
+        for return_index in range(len(return_flights))
+    ]
+    pairs.sort(key=lambda pair: _round_trip_total(departure_flights[pair[0]], return_flights[pair[1]]))
+    yield from pairs
+
+
+def iter_cheapest_pairs(departure_flights, return_flights):
+    """Yield the (departure, return) index pairs from the cheapest to the most expensive round trip.
+
+    The pairs come out in the same order as sorting the whole cartesian product by the
+    round trip total, ties kept in (departure, return) order, but they are produced lazily
+    with a heap over the k-smallest pair sums, so taking the first K costs O(K log K)
+    instead of O(N * M). Prices are compared in integer cents to keep the sums exact; if a
+    price is not a whole number of cents the full product is sorted instead.
+    """
+    departure_cents = [_to_cents(flight.price['fare'] + flight.price['fees']) for flight in departure_flights]
+    return_cents = [_to_cents(flight.price['fare'] + flight.price['fees']) for flight in return_flights]
+
+    if None in departure_cents or None in return_cents:
+        yield from _iter_all_pairs(departure_flights, return_flights)
+        return
+
+    departure_order = sorted(range(len(departure_flights)), key=departure_cents.__getitem__)
+    return_order = sorted(range(len(return_flights)), key=return_cents.__getitem__)
+
+    if not departure_order or not return_order:
+        return
+
+    def _entry(departure_rank, return_rank):
+        cents = departure_cents[departure_order[departure_rank]] + return_cents[return_order[return_rank]]
+        return (cents, departure_rank, return_rank)
+
+    heap = [_entry(0, 0)]
+
+    while heap:
+        group_cents = heap[0][0]
+        group = []
+
+        while heap and heap[0][0] == group_cents:
+            _, departure_rank, return_rank = heapq.heappop(heap)
+            group.append((departure_order[departure_rank], return_order[return_rank]))
+
+            if return_rank + 1 < len(return_order):
+                heapq.heappush(heap, _entry(departure_rank, return_rank + 1))
+            if return_rank == 0 and departure_rank + 1 < len(departure_order):
+                heapq.heappush(heap, _entry(departure_rank + 1, 0))
+
+        group.sort(key=lambda pair: (
+            _round_trip_total(departure_flights[pair[0]], return_flights[pair[1]]),
+            pair
+        ))
+        yield from group
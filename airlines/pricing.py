@@ -0,0 +1,50 @@
+import numpy as np
+
+from common.rounding import round_exact
+
+
+def price_flights(flights, linear_distance, fee_percent, minimal_fee_value):
+    """Calculate the price and meta of every flight of a leg in a single vectorized pass.
+
+    Returns a list of ``(price, meta)`` dicts, one per flight, with the same values and
+    rounding as ``Airline._calculate_flight_price`` and ``Airline._calculate_flight_meta``.
+    """
+    fares = np.fromiter((flight.price['fare'] for flight in flights), dtype=np.float64, count=len(flights))
+    travel_seconds = np.fromiter(
+        ((flight.arrival_time - flight.departure_time).total_seconds() for flight in flights),
+        dtype=np.float64, count=len(flights)
+    )
+
+    percent_fees = fares * fee_percent
+    uses_minimal_fee = minimal_fee_value > percent_fees
+    fees = round_exact(np.where(uses_minimal_fee, minimal_fee_value, percent_fees), 2)
+    totals = round_exact(fares + fees, 2)
+
+    travel_hours = travel_seconds / 3600
+    cruise_speeds = round_exact(linear_distance / travel_hours, 2)
+    costs_per_km = round_exact(totals / linear_distance, 2)
+
+    minimal_fee = round(minimal_fee_value, 2)
+
+    return [
+        (
+            {
+                **flight.price,
+                'fees': minimal_fee if use_minimal else fee,
+                'total': total,
+            },
+            {
+                'range': linear_distance,
+                'cruise_speed_kmh': cruise_speed,
+                'cost_per_km': cost_per_km,
+            }
+        )
+        for flight, use_minimal, fee, total, cruise_speed, cost_per_km in zip(
+            flights,
+            uses_minimal_fee.tolist(),
+            fees.tolist(),
+            totals.tolist(),
+            cruise_speeds.tolist(),
+            costs_per_km.tolist()
+        )
+    ]
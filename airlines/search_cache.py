@@ -0,0 +1,169 @@
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class _InFlightSearch:
+    """A search being fetched from the upstream API that other callers can wait for."""
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class AirlineSearchCache:
+    """This class caches the parsed air/search payloads keyed by route and date.
+
+    The storage is the Django cache configured on ``AIRLINE_SEARCH_CACHE_ALIAS``, so the
+    backend, TTL and max size come from ``CACHES``. Concurrent misses for the same key are
+    coalesced into a single upstream call.
+    """
+    def __init__(self, alias=None):
+        self.alias = alias or settings.AIRLINE_SEARCH_CACHE_ALIAS
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._async_in_flight = {}
+        self._stored = OrderedDict()
+        self._stats = self._empty_stats()
+
+    @property
+    def cache(self):
+        """Return the Django cache backend used as storage."""
+        return caches[self.alias]
+
+    @property
+    def timeout(self):
+        """Return the TTL in seconds of the cached searches."""
+        return self.cache.default_timeout
+
+    def _empty_stats(self):
+        return {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "expirations": 0}
+
+    def make_key(self, from_iata, to_iata, date):
+        """Return the cache key of a route and date."""
+        return f"air-search:{from_iata}:{to_iata}:{date}"
+
+    def _record_hit(self):
+        with self._lock:
+            self._stats["hits"] += 1
+
+    def _record_miss(self, key):
+        """Count a miss, telling apart entries evicted before their TTL from expired ones."""
+        self._stats["misses"] += 1
+        expires_at = self._stored.pop(key, None)
+        if expires_at is None:
+            return
+        if time.monotonic() < expires_at:
+            self._stats["evictions"] += 1
+        else:
+            self._stats["expirations"] += 1
+
+    def _remember(self, key):
+        """Keep track of a stored key so a later miss on it can be classified."""
+        with self._lock:
+            timeout = self.timeout
+            self._stored[key] = math.inf if timeout is None else time.monotonic() + timeout
+            self._stored.move_to_end(key)
+            while len(self._stored) > settings.AIRLINE_SEARCH_CACHE_MAX_ENTRIES:
+                self._stored.popitem(last=False)
+
+    def get_or_fetch(self, from_iata, to_iata, date, fetch):
+        """Return the cached search of the route and date, calling ``fetch`` once on a miss."""
+        key = self.make_key(from_iata, to_iata, date)
+
+        data = self.cache.get(key)
+        if data is not None:
+            self._record_hit()
+            return data
+
+        with self._lock:
+            self._record_miss(key)
+            in_flight = self._in_flight.get(key)
+            is_leader = in_flight is None
+            if is_leader:
+                in_flight = self._in_flight[key] = _InFlightSearch()
+            else:
+                self._stats["coalesced"] += 1
+
+        if not is_leader:
+            in_flight.event.wait()
+            if in_flight.error:
+                raise in_flight.error
+            return in_flight.result
+
+        try:
+            data = fetch()
+            if data is not None:
+                self.cache.set(key, data)
+                self._remember(key)
+            in_flight.result = data
+            return data
+        except Exception as e:
+            in_flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            in_flight.event.set()
+
+    async def aget_or_fetch(self, from_iata, to_iata, date, fetch):
+        """Asynchronous version of ``get_or_fetch`` where ``fetch`` returns an awaitable."""
+        key = self.make_key(from_iata, to_iata, date)
+
+        data = await self.cache.aget(key)
+        if data is not None:
+            self._record_hit()
+            return data
+
+        loop_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            self._record_miss(key)
+            in_flight = self._async_in_flight.get(loop_key)
+            is_leader = in_flight is None
+            if is_leader:
+                in_flight = self._async_in_flight[loop_key] = asyncio.get_running_loop().create_future()
+            else:
+                self._stats["coalesced"] += 1
+
+        if not is_leader:
+            return await asyncio.shield(in_flight)
+
+        try:
+            data = await fetch()
+            if data is not None:
+                await self.cache.aset(key, data)
+                self._remember(key)
+            in_flight.set_result(data)
+            return data
+        except Exception as e:
+            in_flight.set_exception(e)
+            in_flight.exception()
+            raise
+        finally:
+            if not in_flight.done():
+                in_flight.cancel()
+            with self._lock:
+                self._async_in_flight.pop(loop_key, None)
+
+    def stats(self):
+        """Return the hit, miss, coalesced, eviction and expiration counters."""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """Remove every cached search and reset the counters."""
+        self.cache.clear()
+        with self._lock:
+            self._stored.clear()
+            self._stats = self._empty_stats()
+
+
+airline_search_cache = AirlineSearchCache()
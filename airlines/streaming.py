@@ -0,0 +1,75 @@
+from django.http import StreamingHttpResponse
+
+from common.json_encoder import get_json_backend
+
+CHUNK_SIZE = 64 * 1024
+JSON_CONTENT_TYPE = 'application/json'
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+
+def wants_ndjson(request):
+    """Return whether the client asked for newline delimited JSON."""
+    return NDJSON_CONTENT_TYPE in request.headers.get('Accept', '')
+
+
+def wants_streaming(request):
+    """Return whether the response should be streamed, with ``?stream=true`` or by asking for NDJSON."""
+    return request.GET.get('stream', '').lower() in ('1', 'true') or wants_ndjson(request)
+
+
+def _buffered(pieces, chunk_size=CHUNK_SIZE):
+    """Join small serialized pieces into chunks of about ``chunk_size`` bytes."""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def iter_json_combinations(summary, round_trips):
+    """Yield the combinator payload as the same JSON bytes ``FastJsonResponse`` renders, one round trip at a time."""
+    backend = get_json_backend()
+    item_separator = backend.item_separator.encode()
+    key_separator = backend.key_separator.encode()
+
+    def pieces():
+        yield b'{"summary"' + key_separator + backend.dumps(summary) + item_separator + b'"round_trips"' + key_separator + b'['
+        for index, round_trip in enumerate(round_trips):
+            yield (item_separator if index else b'') + backend.dumps(round_trip.__dict__())
+        yield b']}'
+
+    return _buffered(pieces())
+
+
+def iter_ndjson_combinations(summary, round_trips):
+    """Yield the combinator payload as NDJSON: a summary line followed by one line per round trip."""
+    backend = get_json_backend()
+
+    def pieces():
+        yield backend.dumps({"summary": summary}) + b'\n'
+        for round_trip in round_trips:
+            yield backend.dumps(round_trip.__dict__()) + b'\n'
+
+    return _buffered(pieces())
+
+
+async def _aiter(iterator):
+    """Expose a synchronous iterator as an asynchronous one for ASGI responses."""
+    for chunk in iterator:
+        yield chunk
+
+
+def streaming_combinations_response(request, summary, round_trips, is_async=False):
+    """Return a streaming response of the round trips, as NDJSON when the client asks for it."""
+    if wants_ndjson(request):
+        content, content_type = iter_ndjson_combinations(summary, round_trips), NDJSON_CONTENT_TYPE
+    else:
+        content, content_type = iter_json_combinations(summary, round_trips), JSON_CONTENT_TYPE
+
+    return StreamingHttpResponse(_aiter(content) if is_async else content, content_type=content_type)
@@ -1,7 +1,18 @@
+import copy
+import json
+import random
+import time
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
 from django.test import TestCase
 
+from airlines.search_cache import airline_search_cache
 from airlines.views.airline_combinator_view import Airline, AirlineManager, Flight, RoundTrip
+from airports.models import Airport
+from common import timing
 from common.api_client import ApiClient
+from common.timestamps import TIMESTAMP_FORMAT, parse_timestamp
 from setup import settings
 
 MOCK_DATA = {
@@ -120,7 +131,35 @@ class TestAirlineCalculation(TestCase):
         self.assertDictEqual(flight1.__dict__(), self.airline.options[0].__dict__())
         self.assertDictEqual(flight2.__dict__(), self.airline.options[1].__dict__())
 
-    
+
+
+class TestBatchAirlineCalculation(TestAirlineCalculation):
+    """Run the Airline calculation tests with the vectorized pricing."""
+
+    def __init__(self, methodName = "runTest"):
+        super().__init__(methodName)
+        self.airline : Airline = Airline(MOCK_DATA['summary'], MOCK_DATA['options'], batch_pricing=True)
+
+    def test_batch_pricing_matches_per_flight_pricing(self):
+        rng = random.Random(42)
+        options = [
+            {
+                **MOCK_DATA['options'][0],
+                "departure_time": "2022-06-12T%02d:%02d:00" % (rng.randint(0, 11), rng.randint(0, 59)),
+                "arrival_time": "2022-06-12T%02d:%02d:%02d" % (rng.randint(12, 23), rng.randint(0, 59), rng.randint(0, 59)),
+                "price": {"fare": fare, "fees": 0.0, "total": 0.0},
+            }
+            for fare in [round(rng.uniform(50, 5000), 2) for _ in range(500)] + [0.05, 1.005, 400, 400.05, 2.675, 1234.565]
+        ]
+
+        batch_airline = Airline(MOCK_DATA['summary'], copy.deepcopy(options), batch_pricing=True)
+        scalar_airline = Airline(MOCK_DATA['summary'], copy.deepcopy(options), batch_pricing=False)
+
+        self.assertEqual(
+            json.dumps(batch_airline.__dict__(), cls=DjangoJSONEncoder),
+            json.dumps(scalar_airline.__dict__(), cls=DjangoJSONEncoder)
+        )
+
 
 class TestRoundTripCalculation(TestCase):
     def test_round_trip_total_price(self):
@@ -224,7 +263,75 @@ class TestAirlineManager(TestCase):
             "Invalid airport IATA codes."
         )
 
-        
 
-        
-        
\ No newline at end of file
+class SlowStubApiClient:
+    """Stub API client that answers every search after a fixed delay, recording the searches it answered."""
+    def __init__(self, delay=0, failing_routes=()):
+        self.delay = delay
+        self.failing_routes = failing_routes
+        self.searches = []
+
+    def get(self, endpoint, params=None):
+        self.searches.append(params)
+        time.sleep(self.delay)
+        if any(params.startswith(route) for route in self.failing_routes):
+            return None
+        return copy.deepcopy(MOCK_DATA)
+
+
+class TestAirlineManagerConcurrency(TestCase):
+    def setUp(self):
+        airline_search_cache.clear()
+
+    def test_get_airlines_fetches_legs_concurrently(self):
+        delay = 0.3
+        manager = AirlineManager(SlowStubApiClient(delay))
+
+        started_at = time.perf_counter()
+        airlines = manager.get_airlines('PLU', 'MAO', '2022-06-12', '2022-06-15')
+        elapsed = time.perf_counter() - started_at
+
+        self.assertEqual(len(airlines), 2)
+        self.assertLess(elapsed, delay * 1.8)
+
+    def test_get_airlines_reports_errors_per_leg(self):
+        manager = AirlineManager(SlowStubApiClient(0, failing_routes=('MAO/PLU',)))
+
+        with self.assertRaises(ValueError) as context:
+            manager.get_airlines('PLU', 'MAO', '2022-06-12', '2022-06-15')
+
+        self.assertIn('return leg', str(context.exception))
+        self.assertNotIn('departure leg', str(context.exception))
+
+    def test_phases_of_concurrent_legs_are_recorded_on_the_request(self):
+        Airport.objects.create(iata='PLU', city='Belo Horizonte', latitude=-19.75, longitude=-43.75, state='MG')
+        Airport.objects.create(iata='MAO', city='Manaus', latitude=-3.031327, longitude=-60.046093, state='AM')
+        api_client = SlowStubApiClient(0)
+        stub_get = api_client.get
+
+        def timed_get(endpoint, params=None):
+            with timing.timed('upstream'):
+                return stub_get(endpoint, params)
+
+        api_client.get = timed_get
+
+        with timing.collect() as phases:
+            AirlineManager(api_client).get_airlines_combinations('PLU', 'MAO', '2022-06-12', '2022-06-15')
+
+        self.assertEqual(
+            {phase: count for phase, (seconds, count) in phases.items()},
+            {'upstream': 2, 'pricing': 2, 'combine': 1, 'serialize': 1}
+        )
+
+
+class TestParseTimestamp(TestCase):
+    def test_matches_strptime(self):
+        for value in ('2022-06-12T20:40:00', '2022-06-12T00:05:59', '2024-02-29T23:59:59', '2022-6-12T1:05:00', '2022-06- 2T20:40:00'):
+            self.assertEqual(parse_timestamp(value), datetime.strptime(value, TIMESTAMP_FORMAT))
+
+    def test_rejects_what_strptime_rejects(self):
+        for value in ('2022-06-12 20:40:00', '2022-06-12T20:40:00Z', '2022-06-12T20:40', '2022-06-12T2040:00.', '2022-02-30T20:40:00'):
+            with self.assertRaises(ValueError):
+                datetime.strptime(value, TIMESTAMP_FORMAT)
+            with self.assertRaises(ValueError):
+                parse_timestamp(value)
@@ -0,0 +1,266 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from common.api_client import ApiClient, AsyncApiClient
+from common.resilience import CircuitBreaker, UpstreamEndpoint, deadline, upstream_registry
+
+
+class KeepAliveStubHandler(BaseHTTPRequestHandler):
+    """Stub handler answering every GET with a small JSON body over HTTP/1.1."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = json.dumps({"path": self.path}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestApiClientConnectionPool(SimpleTestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveStubHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_clients_share_pooled_connections(self):
+        stats_before = ApiClient.connection_stats()
+
+        for _ in range(3):
+            api_client = ApiClient(self.base_url, 'user', 'password', 'key')
+            self.assertEqual(api_client.get('air/airports'), {"path": "/air/airports/key"})
+
+        stats_after = ApiClient.connection_stats()
+
+        self.assertEqual(stats_after['requests'] - stats_before['requests'], 3)
+        self.assertEqual(stats_after['new_connections'] - stats_before['new_connections'], 1)
+        self.assertEqual(stats_after['reused_connections'] - stats_before['reused_connections'], 2)
+
+    async def test_async_clients_share_pooled_connections_on_the_event_loop(self):
+        api_clients = [AsyncApiClient(self.base_url, 'user', 'password', 'key') for _ in range(3)]
+
+        for api_client in api_clients:
+            self.assertEqual(await api_client.get('air/airports'), {"path": "/air/airports/key"})
+
+        self.assertIs(api_clients[0].get_client(), api_clients[2].get_client())
+
+    def test_timeouts_are_split_into_connect_and_read(self):
+        api_client = ApiClient(self.base_url, 'user', 'password', 'key')
+
+        self.assertEqual(api_client.timeout, (settings.API_CLIENT_CONNECT_TIMEOUT, settings.API_CLIENT_READ_TIMEOUT))
+
+
+class ScriptedStubHandler(BaseHTTPRequestHandler):
+    """Stub handler answering with the (status, delay) of its server script, then 200 right away."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.n_requests += 1
+            status, delay = self.server.script.pop(0) if self.server.script else (200, 0)
+        time.sleep(delay)
+        body = json.dumps({"status": status}).encode()
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+@override_settings(
+    API_CLIENT_MAX_RETRIES=2,
+    API_CLIENT_BACKOFF_BASE=0.01,
+    API_CLIENT_BACKOFF_MAX=0.02,
+    API_CLIENT_BREAKER_FAILURE_THRESHOLD=3,
+    API_CLIENT_BREAKER_RECOVERY_TIMEOUT=0.2,
+    API_CLIENT_HEDGE_DEFAULT_DELAY=0.1,
+)
+class TestApiClientResilience(SimpleTestCase):
+    def setUp(self):
+        upstream_registry.clear()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ScriptedStubHandler)
+        self.server.script = []
+        self.server.n_requests = 0
+        self.server.lock = threading.Lock()
+        self.server.block_on_close = False
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.api_client = ApiClient(f'http://127.0.0.1:{self.server.server_port}', 'user', 'password', 'key')
+        self.upstream = upstream_registry.get(self.api_client.base_url, 'air/search')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        upstream_registry.clear()
+
+    def test_failed_requests_are_retried(self):
+        self.server.script = [(503, 0), (502, 0)]
+
+        self.assertEqual(self.api_client.get('air/search', 'PLU/MAO/2022-06-12'), {"status": 200})
+        self.assertEqual(self.server.n_requests, 3)
+        self.assertEqual(self.upstream.stats()['retries'], 2)
+        self.assertEqual(self.upstream.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_breaker_opens_then_recovers_through_a_half_open_probe(self):
+        self.server.script = [(503, 0)] * 3
+
+        self.assertIsNone(self.api_client.get('air/search', 'PLU/MAO/2022-06-12'))
+        self.assertIsNone(self.api_client.get('air/search', 'PLU/MAO/2022-06-12'))
+        self.assertEqual(self.server.n_requests, 3)
+        self.assertEqual(self.upstream.breaker.stats()['trips'], 1)
+        self.assertEqual(self.upstream.breaker.stats()['rejected'], 1)
+
+        time.sleep(0.25)
+        self.assertEqual(self.upstream.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertEqual(self.api_client.get('air/search', 'PLU/MAO/2022-06-12'), {"status": 200})
+        self.assertEqual(self.upstream.breaker.state, CircuitBreaker.CLOSED)
+
+    async def test_cancelled_probe_releases_the_half_open_slot(self):
+        self.server.script = [(503, 0)] * 3 + [(200, 1)]
+        api_client = AsyncApiClient(self.api_client.base_url, 'user', 'password', 'key')
+        self.assertIsNone(await api_client.get('air/search', 'PLU/MAO/2022-06-12'))
+
+        await asyncio.sleep(0.25)
+        probe = asyncio.ensure_future(api_client.get('air/search', 'PLU/MAO/2022-06-12'))
+        await asyncio.sleep(0.1)
+        probe.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await probe
+
+        self.assertEqual(self.upstream.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertEqual(await api_client.get('air/search', 'PLU/MAO/2022-06-12'), {"status": 200})
+        self.assertEqual(self.upstream.breaker.state, CircuitBreaker.CLOSED)
+
+    async def test_cancelled_requests_are_not_counted_as_failures(self):
+        self.server.script = [(200, 0.5)] * 5
+        api_client = AsyncApiClient(self.api_client.base_url, 'user', 'password', 'key')
+
+        for _ in range(5):
+            request = asyncio.ensure_future(api_client.get('air/search', 'PLU/MAO/2022-06-12'))
+            await asyncio.sleep(0.05)
+            request.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await request
+
+        stats = self.upstream.breaker.stats()
+        self.assertEqual((stats['state'], stats['consecutive_failures'], stats['trips']), (CircuitBreaker.CLOSED, 0, 0))
+
+    def test_unreported_probe_loses_its_slot_after_the_recovery_timeout(self):
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.1)
+        breaker.record_failure()
+        time.sleep(0.15)
+
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        time.sleep(0.15)
+        self.assertTrue(breaker.allow())
+
+    @override_settings(API_CLIENT_RETRY_TIMEOUTS=True)
+    def test_requests_stop_at_the_deadline(self):
+        self.server.script = [(200, 1)]
+
+        start = time.perf_counter()
+        with deadline(0.2):
+            self.assertIsNone(self.api_client.get('air/search', 'PLU/MAO/2022-06-12'))
+
+        self.assertLess(time.perf_counter() - start, 0.6)
+        self.assertEqual(self.upstream.stats()['deadline_exceeded'], 1)
+
+    @override_settings(API_CLIENT_READ_TIMEOUT=0.1)
+    def test_read_timeouts_are_only_retried_when_enabled(self):
+        api_client = ApiClient(self.api_client.base_url, 'user', 'password', 'key')
+        self.server.script = [(200, 0.5)]
+
+        self.assertIsNone(api_client.get('air/search', 'PLU/MAO/2022-06-12'))
+        self.assertEqual((self.server.n_requests, self.upstream.stats()['retries']), (1, 0))
+
+        self.server.script = [(200, 0.5)]
+        with self.settings(API_CLIENT_RETRY_TIMEOUTS=True):
+            self.assertEqual(api_client.get('air/search', 'PLU/MAO/2022-06-12'), {"status": 200})
+        self.assertEqual((self.server.n_requests, self.upstream.stats()['retries']), (3, 1))
+
+    def test_hedged_request_gets_the_budget_left(self):
+        budgets = []
+
+        def attempt(budget):
+            budgets.append(budget)
+            time.sleep(0.3 if len(budgets) == 1 else 0)
+            return 200
+
+        with deadline(1):
+            self.assertEqual(UpstreamEndpoint('stub', 3, 1)._hedged_attempt(attempt, 1, lambda result: False), 200)
+
+        self.assertEqual(len(budgets), 2)
+        self.assertLess(budgets[1], 0.95)
+
+    @override_settings(API_CLIENT_HEDGE=True)
+    def test_slow_failing_requests_are_replaced_by_their_hedge(self):
+        self.server.script = [(503, 0.4)]
+
+        start = time.perf_counter()
+        self.assertEqual(self.api_client.get('air/search', 'PLU/MAO/2022-06-12'), {"status": 200})
+
+        self.assertLess(time.perf_counter() - start, 0.6)
+        self.assertEqual(self.server.n_requests, 2)
+        stats = self.upstream.stats()
+        self.assertEqual((stats['hedges'], stats['hedge_wins'], stats['retries']), (1, 1, 0))
+
+    @override_settings(API_CLIENT_HEDGE=True)
+    def test_busy_hedge_pool_does_not_delay_the_request(self):
+        busy_pool = ThreadPoolExecutor(max_workers=1)
+        release = threading.Event()
+        busy_pool.submit(release.wait, 5)
+        self.server.script = [(200, 0.2)]
+
+        try:
+            with mock.patch('common.resilience._get_hedge_executor', return_value=busy_pool):
+                start = time.perf_counter()
+                self.assertEqual(self.api_client.get('air/search', 'PLU/MAO/2022-06-12'), {"status": 200})
+                self.assertLess(time.perf_counter() - start, 0.4)
+        finally:
+            release.set()
+            busy_pool.shutdown()
+
+        self.assertEqual(self.server.n_requests, 1)
+        self.assertEqual(self.upstream.stats()['hedges'], 0)
+
+    async def test_async_hedge_waits_are_bounded_by_the_deadline(self):
+        self.server.script = [(200, 1), (200, 1)]
+        api_client = AsyncApiClient(self.api_client.base_url, 'user', 'password', 'key')
+
+        start = time.perf_counter()
+        with self.settings(API_CLIENT_HEDGE=True, API_CLIENT_MAX_RETRIES=0), deadline(0.3):
+            self.assertIsNone(await api_client.get('air/search', 'PLU/MAO/2022-06-12'))
+
+        self.assertLess(time.perf_counter() - start, 0.6)
+
+    async def test_async_client_retries_and_hedges_the_same_way(self):
+        self.server.script = [(503, 0), (200, 1)]
+        api_client = AsyncApiClient(self.api_client.base_url, 'user', 'password', 'key')
+
+        with self.settings(API_CLIENT_HEDGE=True, API_CLIENT_HEDGE_DEFAULT_DELAY=0.3):
+            self.assertEqual(await api_client.get('air/search', 'PLU/MAO/2022-06-12'), {"status": 200})
+
+        self.assertEqual(self.upstream.stats()['retries'], 1)
+        self.assertEqual(self.upstream.stats()['hedge_wins'], 1)
@@ -0,0 +1,68 @@
+import asyncio
+import copy
+import time
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase
+
+from airlines.search_cache import airline_search_cache
+from airlines.tests.airline_combinator_test import MOCK_DATA, SlowStubApiClient
+from airlines.views.airline_combinator_view import AirlineManager
+from airlines.views.async_airline_combinator_view import AsyncAirlineManager
+from airports.models import Airport
+from airports.registry import AirportRegistry, airport_registry
+
+
+class AsyncSlowStubApiClient:
+    """Async stub API client that answers every search after a fixed delay."""
+    def __init__(self, delay):
+        self.delay = delay
+
+    async def get(self, endpoint, params=None):
+        await asyncio.sleep(self.delay)
+        return copy.deepcopy(MOCK_DATA)
+
+
+class TestAsyncAirlineManager(TestCase):
+    def setUp(self):
+        airline_search_cache.clear()
+        Airport.objects.create(iata='PLU', city='Belo Horizonte', latitude=-19.75, longitude=-43.75, state='MG')
+        Airport.objects.create(iata='MAO', city='Manaus', latitude=-3.031327, longitude=-60.046093, state='AM')
+
+    async def test_async_combinations_match_sync_combinations(self):
+        args = ('PLU', 'MAO', '2022-06-12', '2022-06-15')
+
+        async_result = await AsyncAirlineManager(AsyncSlowStubApiClient(0)).get_airlines_combinations(*args)
+        sync_result = await sync_to_async(AirlineManager(SlowStubApiClient(0)).get_airlines_combinations)(*args)
+
+        self.assertEqual(async_result, sync_result)
+
+    async def test_async_get_airlines_fetches_legs_concurrently(self):
+        delay = 0.3
+        manager = AsyncAirlineManager(AsyncSlowStubApiClient(delay))
+
+        started_at = time.perf_counter()
+        airlines = await manager.get_airlines('PLU', 'MAO', '2022-06-12', '2022-06-15')
+        elapsed = time.perf_counter() - started_at
+
+        self.assertEqual(len(airlines), 2)
+        self.assertLess(elapsed, delay * 1.8)
+
+    async def test_async_combinations_with_invalid_iatas(self):
+        with self.assertRaises(ValueError) as context:
+            await AsyncAirlineManager(AsyncSlowStubApiClient(0)).get_airlines_combinations(
+                'MSAO', 'PLU', '2022-01-01', '2022-01-05'
+            )
+
+        self.assertEqual(str(context.exception), "Invalid airport IATA codes.")
+
+    async def test_async_validation_does_not_query_on_the_event_loop(self):
+        def reload_then_invalidate():
+            airports = AirportRegistry.reload(airport_registry)
+            airport_registry.invalidate()
+            return airports
+
+        airport_registry.invalidate()
+        with mock.patch.object(airport_registry, 'reload', side_effect=reload_then_invalidate):
+            await AsyncAirlineManager(AsyncSlowStubApiClient(0))._validate_airports('PLU', 'MAO')
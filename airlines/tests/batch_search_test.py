@@ -0,0 +1,101 @@
+import json
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from airlines.search_cache import airline_search_cache
+from airlines.tests.airline_combinator_test import SlowStubApiClient
+from airlines.views.airline_combinator_view import AirlineManager
+from airlines.views.batch_airline_combinator_view import BatchAirlineManager
+from airports.models import Airport
+from airports.registry import airport_registry
+from setup.utils.jwt_utils import JWTUtils
+
+
+class TestBatchAirlineManager(TestCase):
+    def setUp(self):
+        airline_search_cache.clear()
+        Airport.objects.create(iata='PLU', city='Belo Horizonte', latitude=-19.75, longitude=-43.75, state='MG')
+        Airport.objects.create(iata='MAO', city='Manaus', latitude=-3.031327, longitude=-60.046093, state='AM')
+        Airport.objects.create(iata='GRU', city='Sao Paulo', latitude=-23.435556, longitude=-46.473056, state='SP')
+        Airport.objects.create(iata='CGH', city='Sao Paulo', latitude=-23.626111, longitude=-46.656389, state='SP')
+        airport_registry.reload()
+
+    def test_states_are_expanded_into_distinct_routes(self):
+        routes = BatchAirlineManager(SlowStubApiClient(0)).expand_routes([
+            {"from_state": "SP", "to": "MAO", "departure_date": "2022-06-12", "return_date": "2022-06-15"},
+            {"from": "GRU", "to": "MAO", "departure_date": "2022-06-12", "return_date": "2022-06-15"},
+        ])
+
+        self.assertEqual(routes, [
+            ('CGH', 'MAO', '2022-06-12', '2022-06-15'),
+            ('GRU', 'MAO', '2022-06-12', '2022-06-15'),
+        ])
+
+    def test_shared_legs_are_fetched_once_and_match_single_searches(self):
+        api_client = SlowStubApiClient()
+        manager = BatchAirlineManager(api_client)
+        routes = [
+            ('PLU', 'MAO', '2022-06-12', '2022-06-15'),
+            ('MAO', 'PLU', '2022-06-15', '2022-06-20'),
+        ]
+
+        with self.assertNumQueries(0):
+            batch = manager.search(routes, limit=2)
+
+        self.assertEqual(batch['n_upstream_searches'], 3)
+        self.assertEqual(len(api_client.searches), 3)
+        single = AirlineManager(SlowStubApiClient(0)).get_airlines_combinations(*routes[0], limit=2)
+        self.assertEqual(batch['results'][0]['round_trips'], single['round_trips'])
+        self.assertTrue(all(result['success'] for result in batch['results']))
+
+    def test_invalid_routes_fail_alone(self):
+        batch = BatchAirlineManager(SlowStubApiClient(0)).search([
+            ('PLU', 'XXX', '2022-06-12', '2022-06-15'),
+            ('PLU', 'MAO', '2022-06-15', '2022-06-12'),
+            ('PLU', 'MAO', '2022-06-12', '2022-06-15'),
+        ])
+
+        self.assertEqual([result['success'] for result in batch['results']], [False, False, True])
+        self.assertEqual(batch['results'][0]['message'], "Invalid airport IATA codes.")
+        self.assertEqual(batch['n_upstream_searches'], 2)
+
+    @override_settings(AIRLINE_BATCH_MAX_ROUTES=1)
+    def test_batches_are_bounded(self):
+        with self.assertRaises(ValueError):
+            BatchAirlineManager(SlowStubApiClient(0)).expand_routes([
+                {"from_state": "SP", "to": "MAO", "departure_date": "2022-06-12", "return_date": "2022-06-15"},
+            ])
+
+    def test_endpoint_returns_every_route_in_one_response(self):
+        headers = {'Authorization': f"Bearer {JWTUtils.encode({'user_id': 1})}"}
+        body = {
+            "searches": [{"from_state": "SP", "to": "MAO", "departure_date": "2022-06-12", "return_date": "2022-06-15"}],
+            "limit": 1,
+        }
+
+        with mock.patch('airlines.views.batch_airline_combinator_view.ApiClient.from_settings', return_value=SlowStubApiClient(0)):
+            response = self.client.post('/api/airlines/airline-combinator-batch/', json.dumps(body), content_type='application/json', headers=headers)
+            invalid = self.client.post('/api/airlines/airline-combinator-batch/', '{}', content_type='application/json', headers=headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['summary']['from'] for result in response.json()['results']], ['CGH', 'GRU'])
+        self.assertEqual(len(response.json()['results'][0]['round_trips']), 1)
+        self.assertEqual(invalid.status_code, 400)
+
+    def test_malformed_searches_are_rejected_with_a_400(self):
+        headers = {'Authorization': f"Bearer {JWTUtils.encode({'user_id': 1})}"}
+        searches = [
+            {"from": ["GRU"], "to": "MAO", "departure_date": "2022-06-12", "return_date": "2022-06-15"},
+            {"from": "GRU", "to": "MAO", "departure_date": 20220612, "return_date": "2022-06-15"},
+        ]
+
+        for search in searches:
+            with self.subTest(search=search):
+                response = self.client.post(
+                    '/api/airlines/airline-combinator-batch/', json.dumps({"searches": [search]}),
+                    content_type='application/json', headers=headers
+                )
+
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("must be strings", response.json()['message'])
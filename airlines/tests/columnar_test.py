@@ -0,0 +1,48 @@
+from django.test import RequestFactory, SimpleTestCase, TestCase
+
+from airlines.columnar import COLUMNAR_FORMAT, columnar_combinations, parse_format, to_columns
+from airlines.search_cache import airline_search_cache
+from airlines.tests.airline_combinator_test import SlowStubApiClient
+from airlines.views.airline_combinator_view import AirlineManager
+from airports.models import Airport
+
+SEARCH = ('PLU', 'MAO', '2022-06-12', '2022-06-15')
+
+
+class TestColumnarCombinations(TestCase):
+    def setUp(self):
+        airline_search_cache.clear()
+        Airport.objects.create(iata='PLU', city='Belo Horizonte', latitude=-19.75, longitude=-43.75, state='MG')
+        Airport.objects.create(iata='MAO', city='Manaus', latitude=-3.031327, longitude=-60.046093, state='AM')
+        self.combinations = AirlineManager(SlowStubApiClient(0)).get_airlines_combinations(*SEARCH, limit=5)
+
+    def test_columns_hold_the_round_trip_fields_in_order(self):
+        columnar = columnar_combinations(self.combinations)
+        round_trips = self.combinations['round_trips']
+
+        self.assertEqual(columnar['summary'], self.combinations['summary'])
+        self.assertEqual(columnar['n_round_trips'], len(round_trips))
+        self.assertEqual(
+            columnar['round_trips']['total_price.total'],
+            [round_trip['total_price']['total'] for round_trip in round_trips]
+        )
+        self.assertEqual(
+            columnar['round_trips']['departure_flight.aircraft.model'],
+            [round_trip['departure_flight']['aircraft']['model'] for round_trip in round_trips]
+        )
+
+
+class TestColumnarFormat(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_missing_fields_are_filled_with_none(self):
+        self.assertEqual(to_columns([{'a': 1, 'b': {'c': 2}}, {'a': 3}]), {'a': [1, 3], 'b.c': [2, None]})
+
+    def test_format_parameter_is_validated(self):
+        self.assertEqual(parse_format(self.factory.get('/')), 'json')
+        self.assertEqual(parse_format(self.factory.get('/', {'format': 'columnar'})), COLUMNAR_FORMAT)
+        with self.assertRaises(ValueError):
+            parse_format(self.factory.get('/', {'format': 'xml'}))
+        with self.assertRaises(ValueError):
+            parse_format(self.factory.get('/', {'format': 'columnar', 'stream': 'true'}))
@@ -0,0 +1,81 @@
+import random
+from itertools import islice
+
+from django.test import SimpleTestCase
+
+from airlines.combinations import iter_cheapest_pairs
+from airlines.views.airline_combinator_view import Airline, AirlineManager, RoundTrip
+
+
+def make_options(rng, size, fares):
+    """Build upstream options drawing the fares from the given values."""
+    return [
+        {
+            "departure_time": "2022-06-12T10:00:00",
+            "arrival_time": "2022-06-12T12:%02d:00" % rng.randint(0, 59),
+            "price": {"fare": rng.choice(fares), "fees": 0.0, "total": 0.0},
+            "aircraft": {"model": "A 320", "manufacturer": "Airbus"},
+            "meta": {"range": 0, "cruise_speed_kmh": 0, "cost_per_km": 0.0},
+        }
+        for _ in range(size)
+    ]
+
+
+def full_sort(airlines):
+    """Reference ordering: build every round trip and sort them by total price."""
+    round_trips = [
+        RoundTrip(departure_flight, return_flight)
+        for departure_flight in airlines[0].options
+        for return_flight in airlines[1].options
+    ]
+    return sorted(round_trips, key=lambda round_trip: round_trip.total_price['total'])
+
+
+class TestCheapestPairs(SimpleTestCase):
+    summary = {
+        "from": {"iata": "PLU", "lat": -19.75, "lon": -43.75},
+        "to": {"iata": "MAO", "lat": -3.031327, "lon": -60.046093},
+    }
+
+    def make_airlines(self, seed, size, fares):
+        rng = random.Random(seed)
+        return [
+            Airline(self.summary, make_options(rng, size, fares)),
+            Airline(self.summary, make_options(rng, size + 3, fares)),
+        ]
+
+    def assert_same_window(self, airlines, limit, offset):
+        expected = full_sort(airlines)[offset:None if limit is None else offset + limit]
+        result = AirlineManager(None)._combine_round_trips(airlines, limit, offset)
+
+        self.assertEqual(
+            [round_trip.__dict__() for round_trip in result],
+            [round_trip.__dict__() for round_trip in expected]
+        )
+        self.assertEqual(
+            [(id(rt.departure_flight), id(rt.return_flight)) for rt in result],
+            [(id(rt.departure_flight), id(rt.return_flight)) for rt in expected]
+        )
+
+    def test_windows_match_full_sort(self):
+        fares = [round(random.Random(1).uniform(100, 3000), 2) for _ in range(30)]
+        for seed in range(5):
+            airlines = self.make_airlines(seed, 20, fares)
+            for limit, offset in [(None, 0), (1, 0), (10, 0), (10, 25), (50, 400), (5, 1000)]:
+                self.assert_same_window(airlines, limit, offset)
+
+    def test_ties_keep_cartesian_order(self):
+        airlines = self.make_airlines(7, 15, [100.0, 100.1, 250.55])
+        self.assert_same_window(airlines, None, 0)
+        self.assert_same_window(airlines, 30, 10)
+
+    def test_prices_with_fractions_of_cents_fall_back_to_full_sort(self):
+        airlines = self.make_airlines(3, 10, [100.005, 99.999, 120.5])
+        self.assert_same_window(airlines, 20, 5)
+
+    def test_only_requested_pairs_are_generated(self):
+        airlines = self.make_airlines(11, 200, [round(100 + i * 0.37, 2) for i in range(400)])
+        pairs = list(islice(iter_cheapest_pairs(airlines[0].options, airlines[1].options), 10))
+
+        self.assertEqual(len(pairs), 10)
+        self.assert_same_window(airlines, 10, 0)
@@ -0,0 +1,50 @@
+from django.test import TestCase
+
+from airlines.search_cache import airline_search_cache
+from airlines.tests.airline_combinator_test import SlowStubApiClient
+from airlines.views.airline_combinator_view import AirlineManager
+from airlines.views.flexible_airline_combinator_view import FlexibleAirlineManager
+from airports.models import Airport
+
+
+class TestFlexibleAirlineManager(TestCase):
+    def setUp(self):
+        airline_search_cache.clear()
+        Airport.objects.create(iata='PLU', city='Belo Horizonte', latitude=-19.75, longitude=-43.75, state='MG')
+        Airport.objects.create(iata='MAO', city='Manaus', latitude=-3.031327, longitude=-60.046093, state='AM')
+
+    def test_each_leg_is_fetched_once_for_the_whole_grid(self):
+        api_client = SlowStubApiClient()
+
+        calendar = FlexibleAirlineManager(api_client).get_price_calendar('PLU', 'MAO', '2022-06-12', '2022-06-15', days=1)
+
+        self.assertEqual(len(api_client.searches), 6)
+        self.assertEqual(len(set(api_client.searches)), 6)
+        self.assertEqual(len(calendar['calendar']), 9)
+        self.assertEqual(calendar['unavailable_legs'], [])
+
+    def test_calendar_entries_match_the_single_search(self):
+        calendar = FlexibleAirlineManager(SlowStubApiClient()).get_price_calendar(
+            'PLU', 'MAO', '2022-06-12', '2022-06-13', days=1, limit=2
+        )
+        single = AirlineManager(SlowStubApiClient()).get_airlines_combinations(
+            'PLU', 'MAO', '2022-06-12', '2022-06-13', limit=2
+        )
+
+        entry = next(
+            entry for entry in calendar['calendar']
+            if (entry['departure_date'], entry['return_date']) == ('2022-06-12', '2022-06-13')
+        )
+        self.assertEqual(entry['round_trips'], single['round_trips'])
+        self.assertTrue(all(entry['departure_date'] <= entry['return_date'] for entry in calendar['calendar']))
+        self.assertEqual(len(calendar['calendar']), 8)
+        self.assertEqual(calendar['cheapest']['total'], min(entry['cheapest_total'] for entry in calendar['calendar']))
+
+    def test_unavailable_legs_only_drop_their_date_pairs(self):
+        api_client = SlowStubApiClient(failing_routes=('MAO/PLU/2022-06-16',))
+
+        calendar = FlexibleAirlineManager(api_client).get_price_calendar('PLU', 'MAO', '2022-06-12', '2022-06-15', days=1)
+
+        self.assertEqual([(leg['leg'], leg['date']) for leg in calendar['unavailable_legs']], [('return', '2022-06-16')])
+        self.assertEqual(len(calendar['calendar']), 6)
+        self.assertNotIn('2022-06-16', {entry['return_date'] for entry in calendar['calendar']})
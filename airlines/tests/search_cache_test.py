@@ -0,0 +1,79 @@
+import copy
+import threading
+
+from django.test import SimpleTestCase, override_settings
+
+from airlines.search_cache import AirlineSearchCache
+from airlines.tests.airline_combinator_test import MOCK_DATA, SlowStubApiClient
+from airlines.views.airline_combinator_view import AirlineManager
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'airline_search': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'airline-search-test',
+        'TIMEOUT': 60,
+        'OPTIONS': {
+            'MAX_ENTRIES': 2,
+            'CULL_FREQUENCY': 2,
+        },
+    },
+}
+
+
+@override_settings(CACHES=TEST_CACHES, AIRLINE_SEARCH_CACHE_MAX_ENTRIES=2)
+class TestAirlineSearchCache(SimpleTestCase):
+    def setUp(self):
+        self.search_cache = AirlineSearchCache()
+        self.search_cache.clear()
+
+    def test_repeated_search_is_served_from_cache(self):
+        api_client = SlowStubApiClient()
+        manager = AirlineManager(api_client, search_cache=self.search_cache)
+
+        manager.get_airlines('PLU', 'MAO', '2022-06-12', '2022-06-15')
+        manager.get_airlines('PLU', 'MAO', '2022-06-12', '2022-06-15')
+
+        self.assertEqual(len(api_client.searches), 2)
+        self.assertEqual(self.search_cache.stats()['hits'], 2)
+        self.assertEqual(self.search_cache.stats()['misses'], 2)
+
+    def test_concurrent_misses_are_coalesced(self):
+        api_client = SlowStubApiClient(0.2)
+        fetch = lambda: api_client.get('air/search', 'PLU/MAO/2022-06-12')
+        results = []
+
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                self.search_cache.get_or_fetch('PLU', 'MAO', '2022-06-12', fetch)
+            ))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(api_client.searches), 1)
+        self.assertEqual(len(results), 5)
+        self.assertEqual(self.search_cache.stats()['coalesced'], 4)
+
+    def test_least_recently_used_search_is_evicted(self):
+        fetch = lambda: copy.deepcopy(MOCK_DATA)
+
+        self.search_cache.get_or_fetch('PLU', 'MAO', '2022-06-12', fetch)
+        self.search_cache.get_or_fetch('MAO', 'PLU', '2022-06-15', fetch)
+        self.search_cache.get_or_fetch('PLU', 'MAO', '2022-06-12', fetch)
+        self.search_cache.get_or_fetch('PLU', 'GRU', '2022-06-12', fetch)
+        self.search_cache.get_or_fetch('MAO', 'PLU', '2022-06-15', fetch)
+
+        stats = self.search_cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['evictions'], 1)
+
+    def test_failed_searches_are_not_cached(self):
+        self.search_cache.get_or_fetch('PLU', 'MAO', '2022-06-12', lambda: None)
+
+        self.assertIsNone(self.search_cache.cache.get(self.search_cache.make_key('PLU', 'MAO', '2022-06-12')))
@@ -0,0 +1,53 @@
+import json
+
+from django.http import JsonResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from airlines.search_cache import airline_search_cache
+from airlines.streaming import NDJSON_CONTENT_TYPE, streaming_combinations_response, wants_streaming
+from airlines.tests.airline_combinator_test import SlowStubApiClient
+from airlines.views.airline_combinator_view import AirlineManager
+from airports.models import Airport
+from common.json_encoder import FastJsonResponse
+
+SEARCH = ('PLU', 'MAO', '2022-06-12', '2022-06-15')
+
+
+class TestStreamingCombinations(TestCase):
+    def setUp(self):
+        airline_search_cache.clear()
+        Airport.objects.create(iata='PLU', city='Belo Horizonte', latitude=-19.75, longitude=-43.75, state='MG')
+        Airport.objects.create(iata='MAO', city='Manaus', latitude=-3.031327, longitude=-60.046093, state='AM')
+        self.manager = AirlineManager(SlowStubApiClient(0))
+        self.factory = RequestFactory()
+
+    def test_streamed_json_matches_json_response(self):
+        request = self.factory.get('/', {'stream': 'true'})
+        self.assertTrue(wants_streaming(request))
+
+        for backend in ('json', 'orjson'):
+            with self.subTest(backend=backend), override_settings(JSON_RESPONSE_BACKEND=backend):
+                summary, round_trips = self.manager.stream_airlines_combinations(*SEARCH)
+
+                response = streaming_combinations_response(request, summary, round_trips)
+
+                self.assertEqual(
+                    b''.join(response.streaming_content),
+                    FastJsonResponse(self.manager.get_airlines_combinations(*SEARCH)).content
+                )
+
+    def test_ndjson_yields_summary_then_one_round_trip_per_line(self):
+        request = self.factory.get('/', HTTP_ACCEPT=NDJSON_CONTENT_TYPE)
+        summary, round_trips = self.manager.stream_airlines_combinations(*SEARCH, limit=3)
+
+        response = streaming_combinations_response(request, summary, round_trips)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(response['Content-Type'], NDJSON_CONTENT_TYPE)
+        expected = json.loads(JsonResponse(self.manager.get_airlines_combinations(*SEARCH, limit=3)).content)
+        self.assertEqual(json.loads(lines[0]), {"summary": expected['summary']})
+        self.assertEqual([json.loads(line) for line in lines[1:]], expected['round_trips'])
+
+    def test_validation_errors_are_raised_before_streaming(self):
+        with self.assertRaises(ValueError):
+            self.manager.stream_airlines_combinations('PLU', 'XXX', '2022-06-12', '2022-06-15')
@@ -1,8 +1,14 @@
 from django.urls import path
 from airlines.views.airline_combinator_view import AirlineCombinatorView
+from airlines.views.async_airline_combinator_view import AsyncAirlineCombinatorView
+from airlines.views.batch_airline_combinator_view import BatchAirlineCombinatorView
+from airlines.views.flexible_airline_combinator_view import FlexibleAirlineCombinatorView
 
 
 urlpatterns = [
     ## localhost:8000/airlines/airline_combinator?from=PLU&to=MAO&departure_date=2022-06-12&return_date=2022-06-15
     path('airline-combinator/<str:from_iata>/<str:to_iata>/<str:departure_date>/<str:return_date>', AirlineCombinatorView.as_view(), name='airline_combinator'),
+    path('airline-combinator-async/<str:from_iata>/<str:to_iata>/<str:departure_date>/<str:return_date>', AsyncAirlineCombinatorView.as_view(), name='airline_combinator_async'),
+    path('airline-combinator-flexible/<str:from_iata>/<str:to_iata>/<str:departure_date>/<str:return_date>', FlexibleAirlineCombinatorView.as_view(), name='airline_combinator_flexible'),
+    path('airline-combinator-batch/', BatchAirlineCombinatorView.as_view(), name='airline_combinator_batch'),
 ]
@@ -1 +1,4 @@
-from .airline_combinator_view import AirlineCombinatorView
\ No newline at end of file
+from .airline_combinator_view import AirlineCombinatorView
+from .async_airline_combinator_view import AsyncAirlineCombinatorView
+from .flexible_airline_combinator_view import FlexibleAirlineCombinatorView
+from .batch_airline_combinator_view import BatchAirlineCombinatorView
@@ -1,12 +1,23 @@
 
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import islice
 
 from django.http import JsonResponse
 from django.views import View
 from requests import Response
-from airports.models.airport import Airport
+from airlines.columnar import COLUMNAR_FORMAT, columnar_combinations, parse_format
+from airlines.combinations import iter_cheapest_pairs
+from airlines.pricing import price_flights
+from airlines.search_cache import airline_search_cache
+from airlines.streaming import streaming_combinations_response, wants_streaming
+from airports.registry import airport_registry
+from common import timing
 from common.api_client import ApiClient
-from common.haversine_calculator import HaversineCalculator
+from common.distance_service import distance_service
+from common.json_encoder import FastJsonResponse
+from common.timestamps import parse_timestamp
 from setup import settings
 from setup.decorators.jwt_decorator import jwt_required
 
@@ -31,10 +42,12 @@ class Flight:
 			}
 	},
     """
+    __slots__ = ('departure_time', 'arrival_time', 'price', 'aircraft', 'meta')
+
     def __init__(self, departure_time, arrival_time, price, aircraft, meta):
         """Initialize the flight object with the given attributes."""
-        self.departure_time = datetime.strptime(departure_time, "%Y-%m-%dT%H:%M:%S")
-        self.arrival_time = datetime.strptime(arrival_time, "%Y-%m-%dT%H:%M:%S")
+        self.departure_time = parse_timestamp(departure_time)
+        self.arrival_time = parse_timestamp(arrival_time)
         self.price = price
         self.aircraft = aircraft
         self.meta = meta
@@ -74,8 +87,13 @@ class Airline:
 	},
     """
 
-    def __init__(self, summary, options, minimal_fee_value = 40, fee_percent = 0.1):
-        """Initialize the airline object with the given attributes."""
+    def __init__(self, summary, options, minimal_fee_value = 40, fee_percent = 0.1, batch_pricing = None):
+        """Initialize the airline object with the given attributes.
+
+        ``batch_pricing`` forces the vectorized or the per flight pricing; by default the
+        vectorized one is used when there are at least ``AIRLINE_BATCH_PRICING_MIN_OPTIONS`` options.
+        """
+        self.batch_pricing = batch_pricing
         self.fee_percent = fee_percent
         self.minimal_fee_value = minimal_fee_value
         self.summary = summary
@@ -89,7 +107,7 @@ class Airline:
         from_lon = self.summary['from']['lon']
         to_lat = self.summary['to']['lat']
         to_lon = self.summary['to']['lon']
-        return HaversineCalculator(from_lat, from_lon, to_lat, to_lon,2).calculate()
+        return distance_service.distance(from_lat, from_lon, to_lat, to_lon)
 
     def _calculate_flight_price(self, flight : Flight):
         """Calculate the total price of the flight."""
@@ -123,9 +141,30 @@ class Airline:
         flight.meta = self._calculate_flight_meta(flight)
         return flight
     
+    def _use_batch_pricing(self):
+        """Return whether the options should be priced in a single vectorized pass."""
+        if self.batch_pricing is None:
+            return len(self.options) >= settings.AIRLINE_BATCH_PRICING_MIN_OPTIONS
+        return self.batch_pricing
+
+    def _update_options_batch(self):
+        """Update every flight with the price and meta data calculated in a single vectorized pass."""
+        for flight, (price, meta) in zip(self.options, price_flights(
+            self.options, self.linear_distance, self.fee_percent, self.minimal_fee_value
+        )):
+            flight.price = price
+            flight.meta = meta
+        return self.options
+
     def update_options(self):
         """Update the options list with the calculated price and meta data."""
-        self.options = [self._update_flight(flight) for flight in self.options]
+        can_batch = self.options and self.linear_distance and all(
+            flight.arrival_time != flight.departure_time for flight in self.options
+        )
+        if can_batch and self._use_batch_pricing():
+            self.options = self._update_options_batch()
+        else:
+            self.options = [self._update_flight(flight) for flight in self.options]
 
     def __dict__(self):
         """Return a dictionary representation of the airline object."""
@@ -136,18 +175,23 @@ class Airline:
 
 class RoundTrip:
     """This class represents a combination of two flights, a departure and a return flight."""
+    __slots__ = ('departure_flight', 'return_flight')
+
     def __init__(self, departure_flight, return_flight):
         """Initialize the round trip object with the given departure and return flights."""
         self.departure_flight = departure_flight
         self.return_flight = return_flight
-        self.total_price = self._calculate_total_price()
+
+    @property
+    def total_price(self):
+        """Return the total price of the round trip, calculated on access instead of stored per pair."""
+        return self._calculate_total_price()
 
     def _calculate_total_price(self):
         """Calculate the total price of the round trip."""
         total_fare = self.departure_flight.price['fare'] + self.return_flight.price['fare']
         total_fees = self.departure_flight.price['fees'] + self.return_flight.price['fees']
         total_price = total_fare + total_fees
-        self.total_price = total_price
         return {
             "fare": total_fare,
             "fees": total_fees,
@@ -165,82 +209,183 @@ class RoundTrip:
 
 class AirlineManager:
     """This class is responsible for managing airline data."""
-    def __init__(self, api_client):
+    def __init__(self, api_client, max_workers=None, search_cache=None):
         self.api_client = api_client
+        self.max_workers = max_workers or settings.AIRLINE_SEARCH_MAX_WORKERS
+        self.search_cache = search_cache or airline_search_cache
+
+    def _build_airline(self, airline_data):
+        """Build an airline object from the upstream search payload."""
+        with timing.timed('pricing'):
+            return Airline(airline_data['summary'], airline_data['options'])
 
     def _get_airline(self, from_iata, to_iata, date):
         """Get airline data for a given route and date."""
         try:
-            airline_data = self.api_client.get(f'air/search', f'{from_iata}/{to_iata}/{date}')
-            return Airline(airline_data['summary'], airline_data['options'])
+            airline_data = self.search_cache.get_or_fetch(
+                from_iata, to_iata, date,
+                lambda: self.api_client.get(f'air/search', f'{from_iata}/{to_iata}/{date}')
+            )
+            return self._build_airline(airline_data)
         except Exception as e:
             raise ValueError(f"Error getting airline data: {e}")
-        
-    def get_airlines(self, from_iata, to_iata, departure_date, return_date):
-        departure_airline = self._get_airline(from_iata, to_iata, departure_date)
-        return_airline = self._get_airline(to_iata, from_iata, return_date)
 
-        if departure_airline and return_airline:
-            return [departure_airline, return_airline]
+    def _get_legs(self, from_iata, to_iata, departure_date, return_date):
+        """Return the route and date of the departure and return legs."""
+        return {
+            'departure': (from_iata, to_iata, departure_date),
+            'return': (to_iata, from_iata, return_date),
+        }
+
+    def _collect_airlines(self, results):
+        """Return the airlines of each leg, raising a single error listing every failed leg."""
+        errors = {leg: result for leg, result in results.items() if isinstance(result, Exception)}
+
+        if errors:
+            raise ValueError("; ".join(f"{leg} leg: {error}" for leg, error in errors.items()))
+
+        if results['departure'] and results['return']:
+            return [results['departure'], results['return']]
         
         return None
+        
+    def fetch_legs(self, legs):
+        """Fetch every distinct ``(from_iata, to_iata, date)`` leg once, concurrently on a bounded pool.
+
+        Returns the airline of each leg, or the ValueError raised while fetching it.
+        """
+        legs = list(dict.fromkeys(legs))
+        if not legs:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(legs))) as executor:
+            futures = {
+                leg: executor.submit(contextvars.copy_context().run, self._get_airline, *leg)
+                for leg in legs
+            }
+
+        results = {}
+        for leg, future in futures.items():
+            try:
+                results[leg] = future.result()
+            except ValueError as e:
+                results[leg] = e
+
+        return results
+
+    def get_airlines(self, from_iata, to_iata, departure_date, return_date):
+        """Get the departure and return airlines, fetching both legs concurrently."""
+        legs = self._get_legs(from_iata, to_iata, departure_date, return_date)
+        airlines = self.fetch_legs(legs.values())
+
+        return self._collect_airlines({leg: airlines[args] for leg, args in legs.items()})
     
-    def _sort_round_trips(self, round_trips):
-        """Sort the round trips by total price."""
-        return sorted(round_trips, key=lambda round_trip: round_trip.total_price['total'])
+    def _iter_round_trips(self, airlines, limit=None, offset=0):
+        """Yield the round trips of the requested price window lazily, cheapest first."""
+        departure_options = airlines[0].options
+        return_options = airlines[1].options
+        stop = None if limit is None else offset + limit
 
-    def _get_round_trips(self, from_iata, to_iata, departure_date, return_date):
-        """Get all possible round trips for a given route and dates."""
-        airlines = self.get_airlines(from_iata, to_iata, departure_date, return_date)
-        
+        for departure_index, return_index in islice(iter_cheapest_pairs(departure_options, return_options), offset, stop):
+            yield RoundTrip(departure_options[departure_index], return_options[return_index])
+
+    def _combine_round_trips(self, airlines, limit=None, offset=0):
+        """Combine the departure and return options into the round trips of the requested price window."""
         if not airlines:
             return None
-        
-        round_trips = []
 
-        for departure_airline in airlines[0].options:
-            for return_airline in airlines[1].options:
-                round_trips.append(RoundTrip(departure_airline, return_airline))
-        
-        round_trips = self._sort_round_trips(round_trips)
+        with timing.timed('combine'):
+            return list(self._iter_round_trips(airlines, limit, offset))
 
-        return round_trips
-    
-    def get_airlines_combinations(self, from_iata, to_iata, departure_date, return_date):
-        """Get all possible round trips for a given route and dates."""
+    def _get_round_trips(self, from_iata, to_iata, departure_date, return_date, limit=None, offset=0):
+        """Get the round trips for a given route and dates, sorted by total price."""
+        airlines = self.get_airlines(from_iata, to_iata, departure_date, return_date)
+        return self._combine_round_trips(airlines, limit, offset)
+
+    def _validate_dates(self, departure_date, return_date):
+        """Raise an error if the departure date is after the return date."""
         if datetime.strptime(departure_date, "%Y-%m-%d") > datetime.strptime(return_date, "%Y-%m-%d"):
             raise ValueError("The departure date must be before the return date.")
 
-        airports = Airport.objects.filter(iata__in=[from_iata, to_iata])
+    def _build_summary(self, from_iata, to_iata, departure_date, return_date):
+        """Build the summary of the combinator response payload."""
+        return {
+            "from": from_iata,
+            "to": to_iata,
+            "departure_date": departure_date,
+            "return_date": return_date
+        }
+
+    def _build_combinations(self, from_iata, to_iata, departure_date, return_date, round_trips):
+        """Build the combinator response payload."""
+        with timing.timed('serialize'):
+            return {
+                "summary": self._build_summary(from_iata, to_iata, departure_date, return_date),
+                "round_trips": [round_trip.__dict__() for round_trip in round_trips]
+            }
+
+    def _validate_airports(self, from_iata, to_iata):
+        """Raise an error if any of the IATA codes is not a known airport."""
+        airports = airport_registry.get_many({from_iata, to_iata})
         
         if len(airports) != 2:
             raise ValueError("Invalid airport IATA codes.")
 
-        round_trips = self._get_round_trips(from_iata, to_iata, departure_date, return_date)
+    def stream_airlines_combinations(self, from_iata, to_iata, departure_date, return_date, limit=None, offset=0):
+        """Validate the search and fetch both legs, returning the summary and a lazy iterator of the round trips."""
+        self._validate_dates(departure_date, return_date)
+        self._validate_airports(from_iata, to_iata)
 
-        return {
-            "summary": {
-                "from": from_iata,
-                "to": to_iata,
-                "departure_date": departure_date,
-                "return_date": return_date
-            },
-            "round_trips": [round_trip.__dict__() for round_trip in round_trips]
-        }
+        airlines = self.get_airlines(from_iata, to_iata, departure_date, return_date)
+
+        return (
+            self._build_summary(from_iata, to_iata, departure_date, return_date),
+            self._iter_round_trips(airlines, limit, offset)
+        )
+    
+    def get_airlines_combinations(self, from_iata, to_iata, departure_date, return_date, limit=None, offset=0):
+        """Get the round trips for a given route and dates, skipping ``offset`` and returning up to ``limit``."""
+        self._validate_dates(departure_date, return_date)
+        self._validate_airports(from_iata, to_iata)
+
+        round_trips = self._get_round_trips(from_iata, to_iata, departure_date, return_date, limit, offset)
+
+        return self._build_combinations(from_iata, to_iata, departure_date, return_date, round_trips)
     
+def parse_pagination(request):
+    """Return the ``limit`` and ``offset`` query parameters as non negative integers."""
+    limit = request.GET.get('limit')
+    offset = request.GET.get('offset', 0)
+
+    try:
+        limit = None if limit is None else int(limit)
+        offset = int(offset)
+    except ValueError:
+        raise ValueError("The limit and offset parameters must be integers.")
+
+    if (limit is not None and limit < 0) or offset < 0:
+        raise ValueError("The limit and offset parameters must not be negative.")
+
+    return limit, offset
+
+
 class AirlineCombinatorView(View):
     """This class is responsible for handling the airline combinator API requests."""
 
     @jwt_required
     def get(self, request, from_iata, to_iata, departure_date, return_date):
+        try:
+            limit, offset = parse_pagination(request)
+            response_format = parse_format(request)
+        except ValueError as e:
+            return JsonResponse({
+                "message": str(e),
+                "success": False,
+            }, status=400)
+
         try:
             
-            api_client = ApiClient(
-                base_url=settings.STUB_AMOPROMO_BASE_URL,
-                username=settings.STUB_AMOPROMO_USERNAME,
-                password=settings.STUB_AMOPROMO_PASSWORD,
-                api_key=settings.STUP_AMOPROMO_API_KEY
-            )
+            api_client = ApiClient.from_settings()
 
             if not api_client:
                 return JsonResponse({
@@ -248,9 +393,20 @@ class AirlineCombinatorView(View):
                     "success": False,
                 }, status=500)
             airline_manager = AirlineManager(api_client)
-            airlines_combinations = airline_manager.get_airlines_combinations(from_iata, to_iata, departure_date, return_date)
 
-            return JsonResponse(airlines_combinations)
+            if wants_streaming(request):
+                summary, round_trips = airline_manager.stream_airlines_combinations(
+                    from_iata, to_iata, departure_date, return_date, limit, offset
+                )
+                return streaming_combinations_response(request, summary, round_trips)
+
+            airlines_combinations = airline_manager.get_airlines_combinations(from_iata, to_iata, departure_date, return_date, limit, offset)
+            if response_format == COLUMNAR_FORMAT:
+                with timing.timed('serialize'):
+                    airlines_combinations = columnar_combinations(airlines_combinations)
+
+            with timing.timed('encode'):
+                return FastJsonResponse(airlines_combinations)
         except Exception as e:
             return JsonResponse({
                 "message": f"An error occurred: {e}",
@@ -0,0 +1,113 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views import View
+from airlines.columnar import COLUMNAR_FORMAT, columnar_combinations, parse_format
+from airlines.streaming import streaming_combinations_response, wants_streaming
+from airlines.views.airline_combinator_view import AirlineManager, parse_pagination
+from airports.registry import airport_registry
+from common import timing
+from common.api_client import AsyncApiClient
+from common.json_encoder import FastJsonResponse
+from setup.decorators.jwt_decorator import jwt_required
+
+class AsyncAirlineManager(AirlineManager):
+    """This class is responsible for managing airline data without blocking the event loop."""
+
+    async def _get_airline(self, from_iata, to_iata, date):
+        """Get airline data for a given route and date."""
+        try:
+            airline_data = await self.search_cache.aget_or_fetch(
+                from_iata, to_iata, date,
+                lambda: self.api_client.get(f'air/search', f'{from_iata}/{to_iata}/{date}')
+            )
+            return self._build_airline(airline_data)
+        except Exception as e:
+            raise ValueError(f"Error getting airline data: {e}")
+
+    async def get_airlines(self, from_iata, to_iata, departure_date, return_date):
+        """Get the departure and return airlines, fetching both legs concurrently."""
+        legs = self._get_legs(from_iata, to_iata, departure_date, return_date)
+
+        airlines = await asyncio.gather(
+            *(self._get_airline(*args) for args in legs.values()),
+            return_exceptions=True
+        )
+
+        return self._collect_airlines(dict(zip(legs, airlines)))
+
+    async def _get_round_trips(self, from_iata, to_iata, departure_date, return_date, limit=None, offset=0):
+        """Get the round trips for a given route and dates, sorted by total price."""
+        airlines = await self.get_airlines(from_iata, to_iata, departure_date, return_date)
+        return self._combine_round_trips(airlines, limit, offset)
+
+    async def _validate_airports(self, from_iata, to_iata):
+        """Raise an error if any of the IATA codes is not a known airport."""
+        airports = airport_registry.loaded()
+        if airports is None:
+            airports = await sync_to_async(airport_registry.reload)()
+
+        if from_iata == to_iata or from_iata not in airports or to_iata not in airports:
+            raise ValueError("Invalid airport IATA codes.")
+
+    async def stream_airlines_combinations(self, from_iata, to_iata, departure_date, return_date, limit=None, offset=0):
+        """Validate the search and fetch both legs, returning the summary and a lazy iterator of the round trips."""
+        self._validate_dates(departure_date, return_date)
+        await self._validate_airports(from_iata, to_iata)
+
+        airlines = await self.get_airlines(from_iata, to_iata, departure_date, return_date)
+
+        return (
+            self._build_summary(from_iata, to_iata, departure_date, return_date),
+            self._iter_round_trips(airlines, limit, offset)
+        )
+
+    async def get_airlines_combinations(self, from_iata, to_iata, departure_date, return_date, limit=None, offset=0):
+        """Get the round trips for a given route and dates, skipping ``offset`` and returning up to ``limit``."""
+        self._validate_dates(departure_date, return_date)
+        await self._validate_airports(from_iata, to_iata)
+
+        round_trips = await self._get_round_trips(from_iata, to_iata, departure_date, return_date, limit, offset)
+
+        return self._build_combinations(from_iata, to_iata, departure_date, return_date, round_trips)
+
+
+class AsyncAirlineCombinatorView(View):
+    """This class is responsible for handling the airline combinator API requests on the ASGI entry point."""
+
+    @jwt_required
+    async def get(self, request, from_iata, to_iata, departure_date, return_date):
+        try:
+            limit, offset = parse_pagination(request)
+            response_format = parse_format(request)
+        except ValueError as e:
+            return JsonResponse({
+                "message": str(e),
+                "success": False,
+            }, status=400)
+
+        try:
+
+            api_client = AsyncApiClient.from_settings()
+
+            airline_manager = AsyncAirlineManager(api_client)
+
+            if wants_streaming(request):
+                summary, round_trips = await airline_manager.stream_airlines_combinations(
+                    from_iata, to_iata, departure_date, return_date, limit, offset
+                )
+                return streaming_combinations_response(request, summary, round_trips, is_async=True)
+
+            airlines_combinations = await airline_manager.get_airlines_combinations(from_iata, to_iata, departure_date, return_date, limit, offset)
+            if response_format == COLUMNAR_FORMAT:
+                with timing.timed('serialize'):
+                    airlines_combinations = columnar_combinations(airlines_combinations)
+
+            with timing.timed('encode'):
+                return FastJsonResponse(airlines_combinations)
+        except Exception as e:
+            return JsonResponse({
+                "message": f"An error occurred: {e}",
+                "success": False,
+            }, status=500)
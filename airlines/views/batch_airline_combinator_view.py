@@ -0,0 +1,145 @@
+import json
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.views import View
+from airlines.views.airline_combinator_view import AirlineManager
+from airports.registry import airport_registry
+from common import timing
+from common.api_client import ApiClient
+from common.json_encoder import FastJsonResponse
+from setup.decorators.jwt_decorator import jwt_required
+
+class BatchAirlineManager(AirlineManager):
+    """This class is responsible for the cheapest round trips of many routes searched at once."""
+    def __init__(self, api_client, max_workers=None, search_cache=None):
+        super().__init__(api_client, max_workers or settings.AIRLINE_BATCH_MAX_WORKERS, search_cache)
+
+    def _expand_codes(self, search, side):
+        """Return the IATA codes of one side of a search, given as ``<side>`` or ``<side>_state``."""
+        if search.get(f'{side}_state'):
+            return airport_registry.in_state(search[f'{side}_state'])
+        if search.get(side):
+            return [search[side]]
+        raise ValueError(f"Each search needs '{side}' or '{side}_state'.")
+
+    def expand_routes(self, searches):
+        """Expand the searches into distinct (from, to, departure date, return date) routes."""
+        routes = []
+        for search in searches:
+            if not isinstance(search, dict):
+                raise ValueError("Each search must be an object.")
+            if not search.get('departure_date') or not search.get('return_date'):
+                raise ValueError("Each search needs 'departure_date' and 'return_date'.")
+            invalid = [
+                key for key in ('from', 'to', 'from_state', 'to_state', 'departure_date', 'return_date')
+                if search.get(key) is not None and not isinstance(search[key], str)
+            ]
+            if invalid:
+                raise ValueError(f"The search fields {', '.join(invalid)} must be strings.")
+
+            routes.extend(
+                (from_iata, to_iata, search['departure_date'], search['return_date'])
+                for from_iata in self._expand_codes(search, 'from')
+                for to_iata in self._expand_codes(search, 'to')
+                if from_iata != to_iata
+            )
+
+        routes = list(dict.fromkeys(routes))
+        if len(routes) > settings.AIRLINE_BATCH_MAX_ROUTES:
+            raise ValueError(f"The searches expand to {len(routes)} routes, the limit is {settings.AIRLINE_BATCH_MAX_ROUTES}.")
+        return routes
+
+    def _route_error(self, route, airports):
+        """Return why a route cannot be searched, or None when it is valid."""
+        from_iata, to_iata, departure_date, return_date = route
+        if from_iata not in airports or to_iata not in airports:
+            return "Invalid airport IATA codes."
+        try:
+            self._validate_dates(departure_date, return_date)
+        except ValueError as e:
+            return str(e)
+        return None
+
+    def _build_result(self, route, airlines=None, message=None, limit=None):
+        """Build the result of a route, with its cheapest round trips or the reason it failed."""
+        result = {"summary": self._build_summary(*route), "success": message is None}
+        if message is not None:
+            result["message"] = message
+        else:
+            result["round_trips"] = [round_trip.__dict__() for round_trip in self._iter_round_trips(airlines, limit)]
+        return result
+
+    def search(self, routes, limit=3):
+        """Search every expanded route, validating all IATA codes at once and fetching each leg once."""
+        airports = airport_registry.get_many({iata for route in routes for iata in route[:2]})
+        errors = {route: self._route_error(route, airports) for route in routes}
+
+        legs = {
+            route: self._get_legs(*route)
+            for route in routes
+            if errors[route] is None
+        }
+        airlines = self.fetch_legs(leg for route_legs in legs.values() for leg in route_legs.values())
+
+        results = []
+        with timing.timed('combine'):
+            for route in routes:
+                if errors[route] is not None:
+                    results.append(self._build_result(route, message=errors[route]))
+                    continue
+                try:
+                    route_airlines = self._collect_airlines({leg: airlines[args] for leg, args in legs[route].items()})
+                    results.append(self._build_result(route, route_airlines, limit=limit))
+                except ValueError as e:
+                    results.append(self._build_result(route, message=str(e)))
+
+        return {
+            "n_routes": len(routes),
+            "n_upstream_searches": len(airlines),
+            "results": results,
+        }
+
+
+def parse_batch_body(request):
+    """Return the searches and the ``limit`` of round trips per route of the request body."""
+    try:
+        body = json.loads(request.body)
+    except ValueError:
+        raise ValueError("The request body must be valid JSON.")
+
+    if not isinstance(body, dict) or not isinstance(body.get('searches'), list) or not body['searches']:
+        raise ValueError("The request body must have a non empty 'searches' list.")
+
+    limit = body.get('limit', 3)
+    if not isinstance(limit, int) or isinstance(limit, bool) or limit < 1:
+        raise ValueError("The limit must be a positive integer.")
+
+    return body['searches'], limit
+
+
+class BatchAirlineCombinatorView(View):
+    """This class is responsible for handling the batch airline combinator API requests."""
+
+    @jwt_required
+    def post(self, request):
+        try:
+            searches, limit = parse_batch_body(request)
+            manager = BatchAirlineManager(ApiClient.from_settings())
+            routes = manager.expand_routes(searches)
+        except ValueError as e:
+            return JsonResponse({
+                "message": str(e),
+                "success": False,
+            }, status=400)
+
+        try:
+            batch = manager.search(routes, limit)
+
+            with timing.timed('encode'):
+                return FastJsonResponse(batch)
+        except Exception as e:
+            return JsonResponse({
+                "message": f"An error occurred: {e}",
+                "success": False,
+            }, status=500)
@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta
+
+from django.http import JsonResponse
+from django.views import View
+from airlines.views.airline_combinator_view import AirlineManager
+from common import timing
+from common.api_client import ApiClient
+from common.json_encoder import FastJsonResponse
+from setup import settings
+from setup.decorators.jwt_decorator import jwt_required
+
+class FlexibleAirlineManager(AirlineManager):
+    """This class is responsible for the cheapest round trips of every date pair within +/- N days."""
+    def __init__(self, api_client, max_workers=None, search_cache=None):
+        super().__init__(api_client, max_workers or settings.AIRLINE_FLEXIBLE_MAX_WORKERS, search_cache)
+
+    def _date_range(self, date, days):
+        """Return the dates from ``days`` before to ``days`` after the given one."""
+        day = datetime.strptime(date, "%Y-%m-%d")
+        return [(day + timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range(-days, days + 1)]
+
+    def _get_date_pairs(self, departure_dates, return_dates):
+        """Return the (departure, return) date pairs of the grid where the departure is not after the return."""
+        return [
+            (departure_date, return_date)
+            for departure_date in departure_dates
+            for return_date in return_dates
+            if departure_date <= return_date
+        ]
+
+    def _build_calendar_entry(self, departure_date, return_date, round_trips):
+        """Build the calendar entry of a date pair from its cheapest round trips."""
+        return {
+            "departure_date": departure_date,
+            "return_date": return_date,
+            "cheapest_total": round_trips[0].total_price['total'],
+            "round_trips": [round_trip.__dict__() for round_trip in round_trips],
+        }
+
+    def get_price_calendar(self, from_iata, to_iata, departure_date, return_date, days=1, limit=1):
+        """Get the ``limit`` cheapest round trips of every date pair within ``days`` of the requested dates.
+
+        Each (route, date) leg is fetched once, however many pairs use it, so the search
+        costs 2 * (2 * days + 1) upstream requests instead of one pair of requests per date pair.
+        """
+        self._validate_dates(departure_date, return_date)
+        self._validate_airports(from_iata, to_iata)
+
+        departure_dates = self._date_range(departure_date, days)
+        return_dates = self._date_range(return_date, days)
+        legs = {
+            **{('departure', date): (from_iata, to_iata, date) for date in departure_dates},
+            **{('return', date): (to_iata, from_iata, date) for date in return_dates},
+        }
+        airlines = self.fetch_legs(legs.values())
+
+        unavailable_legs = [
+            {"leg": leg, "date": date, "message": str(airlines[args])}
+            for (leg, date), args in legs.items()
+            if isinstance(airlines[args], Exception)
+        ]
+
+        calendar = []
+        with timing.timed('combine'):
+            for pair_departure_date, pair_return_date in self._get_date_pairs(departure_dates, return_dates):
+                pair = [airlines[legs[('departure', pair_departure_date)]], airlines[legs[('return', pair_return_date)]]]
+                if any(isinstance(airline, Exception) for airline in pair):
+                    continue
+
+                round_trips = list(self._iter_round_trips(pair, limit))
+                if round_trips:
+                    calendar.append(self._build_calendar_entry(pair_departure_date, pair_return_date, round_trips))
+
+        cheapest = min(calendar, key=lambda entry: entry['cheapest_total'], default=None)
+
+        return {
+            "summary": {**self._build_summary(from_iata, to_iata, departure_date, return_date), "days": days},
+            "cheapest": cheapest and {
+                "departure_date": cheapest['departure_date'],
+                "return_date": cheapest['return_date'],
+                "total": cheapest['cheapest_total'],
+            },
+            "calendar": calendar,
+            "unavailable_legs": unavailable_legs,
+        }
+
+
+def parse_flexible_params(request):
+    """Return the ``days`` window and the ``limit`` of round trips per date pair of the query string."""
+    try:
+        days = int(request.GET.get('days', 1))
+        limit = int(request.GET.get('limit', 1))
+    except ValueError:
+        raise ValueError("The days and limit parameters must be integers.")
+
+    if not 0 <= days <= settings.AIRLINE_FLEXIBLE_MAX_DAYS:
+        raise ValueError(f"The days parameter must be between 0 and {settings.AIRLINE_FLEXIBLE_MAX_DAYS}.")
+    if limit < 1:
+        raise ValueError("The limit parameter must be positive.")
+
+    return days, limit
+
+
+class FlexibleAirlineCombinatorView(View):
+    """This class is responsible for handling the flexible dates airline combinator API requests."""
+
+    @jwt_required
+    def get(self, request, from_iata, to_iata, departure_date, return_date):
+        try:
+            days, limit = parse_flexible_params(request)
+        except ValueError as e:
+            return JsonResponse({
+                "message": str(e),
+                "success": False,
+            }, status=400)
+
+        try:
+            api_client = ApiClient.from_settings()
+
+            if not api_client:
+                return JsonResponse({
+                    "message": "Error setting up the API client.",
+                    "success": False,
+                }, status=500)
+
+            price_calendar = FlexibleAirlineManager(api_client).get_price_calendar(
+                from_iata, to_iata, departure_date, return_date, days, limit
+            )
+
+            with timing.timed('encode'):
+                return FastJsonResponse(price_calendar)
+        except Exception as e:
+            return JsonResponse({
+                "message": f"An error occurred: {e}",
+                "success": False,
+            }, status=500)
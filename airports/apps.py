@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class AirportsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'airports'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from airports.models import Airport
+        from airports.registry import invalidate_airport_registry
+        from airports.snapshot import invalidate_airport_snapshot
+
+        post_save.connect(invalidate_airport_registry, sender=Airport, dispatch_uid='airport_registry_save')
+        post_delete.connect(invalidate_airport_registry, sender=Airport, dispatch_uid='airport_registry_delete')
+        post_save.connect(invalidate_airport_snapshot, sender=Airport, dispatch_uid='airport_snapshot_save')
+        post_delete.connect(invalidate_airport_snapshot, sender=Airport, dispatch_uid='airport_snapshot_delete')
@@ -0,0 +1,110 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+
+from logs.models.data_load_log import DataLoadLog
+
+
+class ETLAlreadyRunningError(Exception):
+    """Raised when an airports ETL run is requested while another one is in progress."""
+    def __init__(self, log_id):
+        super().__init__("An ETL process is already running.")
+        self.log_id = log_id
+
+
+class AirportETLRunner:
+    """Runs the airports ETL on a single background thread, one run at a time.
+
+    The lock serializes the runs of this process. Across processes, a run is claimed by
+    creating its log, which the database rejects while another airports log is unfinished;
+    unfinished logs older than ``AIRPORT_ETL_STALE_AFTER`` seconds are failed first. The log
+    of the run in progress is kept in memory, since its progress is only committed to
+    the database when the load transaction finishes.
+    """
+    MODEL = 'Airport'
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='airport-etl')
+        self._lock = threading.Lock()
+        self._etl = None
+        self._future = None
+
+    def _unfinished_log_id(self):
+        """Return the id of the unfinished airports log in the database, or None."""
+        return DataLoadLog.objects.filter(
+            model=self.MODEL,
+            status__in=DataLoadLog.UNFINISHED_STATUSES
+        ).values_list('id', flat=True).first()
+
+    def _fail_stale_logs(self):
+        """Fail the unfinished airports logs older than ``AIRPORT_ETL_STALE_AFTER`` seconds."""
+        now = timezone.now()
+        DataLoadLog.objects.filter(
+            model=self.MODEL,
+            status__in=DataLoadLog.UNFINISHED_STATUSES,
+            started_at__lt=now - timedelta(seconds=settings.AIRPORT_ETL_STALE_AFTER)
+        ).update(status=DataLoadLog.FAILED, success=False, message="The ETL process was abandoned.", finished_at=now)
+
+    def _start(self, etl_factory):
+        """Take the lock and create the ETL, raising ETLAlreadyRunningError when a run is in progress.
+
+        ``etl_factory`` creates the unfinished log of the run, so the unique constraint on
+        unfinished logs lets a single process claim it.
+        """
+        if not self._lock.acquire(blocking=False):
+            etl = self._etl
+            raise ETLAlreadyRunningError(etl.log.id if etl else None)
+
+        try:
+            self._fail_stale_logs()
+            try:
+                with transaction.atomic():
+                    self._etl = etl_factory()
+            except IntegrityError:
+                raise ETLAlreadyRunningError(self._unfinished_log_id())
+        except BaseException:
+            self._lock.release()
+            raise
+        return self._etl
+
+    def _run(self, etl, close_connections=False):
+        """Run the ETL and release the lock, recording unexpected errors on its log."""
+        try:
+            return etl.run()
+        except Exception as e:
+            etl.update_log(False, f"Error during the ETL process: {e}", 0)
+            return etl.log
+        finally:
+            self._etl = None
+            self._lock.release()
+            if close_connections:
+                connections.close_all()
+
+    def submit(self, etl_factory):
+        """Create the ETL with ``etl_factory`` and run it in the background, returning its pending log."""
+        etl = self._start(etl_factory)
+        self._future = self._executor.submit(self._run, etl, True)
+        return etl.log
+
+    def run(self, etl_factory):
+        """Create the ETL with ``etl_factory`` and run it in the calling thread, returning its log."""
+        return self._run(self._start(etl_factory))
+
+    def current_log(self, log_id):
+        """Return the in-memory log of the run in progress when it is ``log_id``, or None."""
+        etl = self._etl
+        if etl is not None and etl.log.id == log_id:
+            return etl.log
+        return None
+
+    def wait(self, timeout=None):
+        """Block until the last submitted run finishes."""
+        if self._future is not None:
+            self._future.result(timeout)
+
+
+airport_etl_runner = AirportETLRunner()
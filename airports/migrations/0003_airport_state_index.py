@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airports', '0002_rename_lat_airport_latitude_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='airport',
+            name='state',
+            field=models.CharField(db_index=True, max_length=2),
+        ),
+    ]
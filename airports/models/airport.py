@@ -5,7 +5,7 @@ class Airport(models.Model):
     city = models.CharField(max_length=100, blank=False, null=False) 
     latitude = models.DecimalField(max_digits=9, decimal_places=6, blank=False, null=False)  
     longitude = models.DecimalField(max_digits=9, decimal_places=6, blank=False, null=False) 
-    state = models.CharField(max_length=2, blank=False, null=False) 
+    state = models.CharField(max_length=2, blank=False, null=False, db_index=True)
     log = models.ForeignKey('logs.DataLoadLog', on_delete=models.DO_NOTHING, null=True, blank=True)
 
     def __str__(self):
@@ -0,0 +1,94 @@
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+from django.conf import settings
+from django.db import DatabaseError
+
+from airports.models.airport import Airport
+
+AirportEntry = namedtuple('AirportEntry', ['iata', 'city', 'latitude', 'longitude', 'state'])
+
+
+class AirportRegistry:
+    """Process-local, read-only index of the airports keyed by IATA code.
+
+    The index is built with a single query and swapped atomically on reload, so readers
+    always see either the previous or the new catalogue. It is reloaded after each
+    successful ETL load, invalidated when an airport is saved or deleted, and rebuilt
+    after ``AIRPORT_REGISTRY_TTL`` seconds so other worker processes catch up too.
+    """
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def _build(self):
+        """Build the IATA index from the database."""
+        return MappingProxyType({
+            iata: AirportEntry(iata, city, float(latitude), float(longitude), state)
+            for iata, city, latitude, longitude, state in Airport.objects.values_list(
+                'iata', 'city', 'latitude', 'longitude', 'state'
+            )
+        })
+
+    def reload(self):
+        """Rebuild the index from the database and swap it in."""
+        with self._lock:
+            airports = self._build()
+            self._snapshot = (airports, time.monotonic())
+        return airports
+
+    def invalidate(self):
+        """Drop the index so the next lookup rebuilds it."""
+        self._snapshot = None
+
+    def warmup(self):
+        """Load the index at startup, ignoring a database that was not migrated yet."""
+        try:
+            self.reload()
+        except DatabaseError:
+            self.invalidate()
+
+    def _is_fresh(self, snapshot):
+        """Return whether a snapshot exists and is younger than the configured TTL."""
+        if snapshot is None:
+            return False
+        ttl = settings.AIRPORT_REGISTRY_TTL
+        return not ttl or time.monotonic() - snapshot[1] <= ttl
+
+    def needs_reload(self):
+        """Return whether the index is missing or older than the configured TTL."""
+        return not self._is_fresh(self._snapshot)
+
+    def loaded(self):
+        """Return the IATA index when it is loaded and fresh, or None, without ever querying the database."""
+        snapshot = self._snapshot
+        return snapshot[0] if self._is_fresh(snapshot) else None
+
+    @property
+    def airports(self):
+        """Return the IATA index, loading it when needed."""
+        airports = self.loaded()
+        return self.reload() if airports is None else airports
+
+    def get(self, iata):
+        """Return the airport of an IATA code, or None when it is unknown."""
+        return self.airports.get(iata)
+
+    def get_many(self, iatas):
+        """Return the known airports among the IATA codes, keyed by IATA code."""
+        airports = self.airports
+        return {iata: airports[iata] for iata in iatas if iata in airports}
+
+    def in_state(self, state):
+        """Return the IATA codes of the airports of a state, sorted."""
+        return sorted(airport.iata for airport in self.airports.values() if airport.state == state)
+
+
+airport_registry = AirportRegistry()
+
+
+def invalidate_airport_registry(sender, **kwargs):
+    """Signal receiver dropping the index when an airport changes."""
+    airport_registry.invalidate()
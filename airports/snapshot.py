@@ -0,0 +1,174 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+from airports.models.airport import Airport
+from common.content_encoding import accepted_encodings
+from common.json_encoder import get_json_backend
+from logs.models.data_load_log import DataLoadLog
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+AirportSnapshotData = namedtuple('AirportSnapshotData', ['version', 'digest', 'bodies'])
+
+EDIT_VERSION_KEY = 'airports:edit_version'
+
+
+def airport_data_version():
+    """Return the version of the airports: the last ETL run that changed them, and the last edit outside it.
+
+    Saving or deleting an airport stores a new edit token in the ``AIRPORT_VERSION_CACHE_ALIAS``
+    cache, so every worker sharing that cache sees the version change.
+    """
+    log_id = DataLoadLog.objects.filter(
+        model='Airport',
+        status=DataLoadLog.SUCCESS
+    ).values_list('id', flat=True).first()
+    edit_version = caches[settings.AIRPORT_VERSION_CACHE_ALIAS].get(EDIT_VERSION_KEY)
+    if log_id is None or edit_version is None:
+        return log_id
+    return f"{log_id}.{edit_version}"
+
+
+def bump_airport_edit_version():
+    """Store a new edit token, changing the airport data version of every worker sharing the cache."""
+    caches[settings.AIRPORT_VERSION_CACHE_ALIAS].set(EDIT_VERSION_KEY, uuid.uuid4().hex[:12], timeout=None)
+
+
+class AirportSnapshot:
+    """Process-local, pre-rendered response of the full airport list.
+
+    The list is serialized once per data version (see ``airport_data_version``) to JSON,
+    gzip and, when the ``brotli`` package is installed, brotli bytes, and served with a
+    strong ETag. It is rebuilt after each successful ETL load, when an airport is saved or
+    deleted, and whenever the requested version differs, so other worker processes catch up. With ``AIRPORT_SNAPSHOT_DIR`` set, a copy is kept on disk so a
+    restarted process serves it without querying the airports.
+    """
+    ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    def __init__(self):
+        self._data = None
+        self._lock = threading.Lock()
+
+    def _render(self, version):
+        """Serialize the airport list as the list endpoint does and compress it."""
+        content = get_json_backend().dumps(list(Airport.objects.order_by('pk').values()))
+        bodies = {'identity': content, 'gzip': gzip.compress(content, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            bodies['br'] = brotli.compress(content)
+        return AirportSnapshotData(version, hashlib.sha256(content).hexdigest()[:32], bodies)
+
+    def _path(self, name):
+        """Return the path of a snapshot file on ``AIRPORT_SNAPSHOT_DIR``."""
+        return os.path.join(settings.AIRPORT_SNAPSHOT_DIR, name)
+
+    def _save(self, data):
+        """Write the snapshot files to disk, replacing the previous ones atomically."""
+        os.makedirs(settings.AIRPORT_SNAPSHOT_DIR, exist_ok=True)
+        files = {f'airports.{encoding}': body for encoding, body in data.bodies.items()}
+        files['airports.meta.json'] = json.dumps({
+            'version': data.version,
+            'digest': data.digest,
+            'encodings': list(data.bodies),
+        }).encode()
+
+        for name, body in files.items():
+            temporary_path = self._path(f'.{name}.tmp')
+            with open(temporary_path, 'wb') as file:
+                file.write(body)
+            os.replace(temporary_path, self._path(name))
+
+    def _load(self, version):
+        """Read the snapshot of ``version`` from disk, returning None when it is missing or outdated."""
+        try:
+            with open(self._path('airports.meta.json'), 'rb') as file:
+                meta = json.load(file)
+            if meta['version'] != version:
+                return None
+            bodies = {}
+            for encoding in meta['encodings']:
+                with open(self._path(f'airports.{encoding}'), 'rb') as file:
+                    bodies[encoding] = file.read()
+        except (OSError, ValueError, KeyError):
+            return None
+        return AirportSnapshotData(version, meta['digest'], bodies)
+
+    def rebuild(self, version):
+        """Render the snapshot of ``version`` from the database and swap it in."""
+        with self._lock:
+            data = self._render(version)
+            if settings.AIRPORT_SNAPSHOT_DIR:
+                self._save(data)
+            self._data = data
+        return data
+
+    def invalidate(self):
+        """Drop the snapshot, and its copy on disk, so the next request renders it again."""
+        self._data = None
+        if settings.AIRPORT_SNAPSHOT_DIR:
+            try:
+                os.remove(self._path('airports.meta.json'))
+            except FileNotFoundError:
+                pass
+
+    def get(self, version):
+        """Return the snapshot of ``version``, loading it from disk or rendering it when needed."""
+        data = self._data
+        if data is not None and data.version == version:
+            return data
+
+        if settings.AIRPORT_SNAPSHOT_DIR:
+            with self._lock:
+                data = self._load(version)
+                if data is not None:
+                    self._data = data
+                    return data
+        return self.rebuild(version)
+
+    def _encoding(self, request, data):
+        """Return the best encoding of the snapshot accepted by the request."""
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        for encoding in self.ENCODINGS:
+            if encoding in accepted and encoding in data.bodies:
+                return encoding
+        return 'identity'
+
+    def response(self, request, version):
+        """Return the snapshot of ``version`` in the encoding negotiated with the request."""
+        data = self.get(version)
+        encoding = self._encoding(request, data)
+        etag = f'"{data.digest}"' if encoding == 'identity' else f'"{data.digest}-{encoding}"'
+
+        if etag in [tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))]:
+            response = HttpResponseNotModified()
+        else:
+            body = data.bodies[encoding]
+            response = HttpResponse(body, content_type='application/json')
+            response['Content-Length'] = str(len(body))
+            if encoding != 'identity':
+                response['Content-Encoding'] = encoding
+
+        response['ETag'] = etag
+        response['Vary'] = 'Accept-Encoding'
+        return response
+
+
+airport_snapshot = AirportSnapshot()
+
+
+def invalidate_airport_snapshot(sender, **kwargs):
+    """Signal receiver dropping the snapshot and bumping the shared data version when an airport changes."""
+    bump_airport_edit_version()
+    airport_snapshot.invalidate()
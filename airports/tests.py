@@ -1,3 +1,411 @@
-from django.test import TestCase
+import gzip
+import json
+import random
+import tempfile
+import threading
+from contextlib import contextmanager
+from unittest import mock
 
-# Create your tests here.
+from django.db import IntegrityError
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from airports.etl_jobs import AirportETLRunner, ETLAlreadyRunningError
+from airports.models import Airport
+from airports.registry import AirportRegistry, airport_registry
+from airports.snapshot import AirportSnapshot, accepted_encodings, airport_snapshot, bump_airport_edit_version
+from airports.views.aiport_etl_view import AirportETL, serialize_etl_log
+from airports.views.aiport_view import AirportViewSet
+from common.distance_service import DistanceService
+from common.haversine_calculator import HaversineCalculator
+from setup.utils.jwt_utils import JWTUtils
+from logs.models.data_load_log import DataLoadLog
+
+
+class TestAirportRegistry(TestCase):
+    def setUp(self):
+        Airport.objects.create(iata='PLU', city='Belo Horizonte', latitude=-19.75, longitude=-43.75, state='MG')
+        Airport.objects.create(iata='MAO', city='Manaus', latitude=-3.031327, longitude=-60.046093, state='AM')
+
+    def test_lookups_do_not_query_the_database_once_loaded(self):
+        registry = AirportRegistry()
+        registry.reload()
+
+        with self.assertNumQueries(0):
+            airports = registry.get_many(['PLU', 'MAO', 'XXX'])
+            airport = registry.get('MAO')
+
+        self.assertEqual(set(airports), {'PLU', 'MAO'})
+        self.assertEqual((airport.city, airport.latitude, airport.state), ('Manaus', -3.031327, 'AM'))
+
+    def test_index_is_read_only(self):
+        registry = AirportRegistry()
+
+        with self.assertRaises(TypeError):
+            registry.airports['GRU'] = None
+
+    def test_saving_an_airport_invalidates_the_shared_index(self):
+        airport_registry.reload()
+        Airport.objects.create(iata='GRU', city='Sao Paulo', latitude=-23.435556, longitude=-46.473056, state='SP')
+
+        self.assertTrue(airport_registry.needs_reload())
+        self.assertIsNotNone(airport_registry.get('GRU'))
+
+
+class TestDistanceService(SimpleTestCase):
+    def setUp(self):
+        rng = random.Random(7)
+        self.points = [(round(rng.uniform(-33, 5), 6), round(rng.uniform(-73, -34), 6)) for _ in range(60)]
+
+    def test_distances_match_haversine_calculator(self):
+        service = DistanceService(decimal_places=2)
+
+        for lat1, lon1 in self.points[:20]:
+            for lat2, lon2 in self.points[20:40]:
+                self.assertEqual(
+                    service.distance(lat1, lon1, lat2, lon2),
+                    HaversineCalculator(lat1, lon1, lat2, lon2, 2).calculate()
+                )
+                self.assertEqual(
+                    service.distance(lat2, lon2, lat1, lon1),
+                    HaversineCalculator(lat2, lon2, lat1, lon1, 2).calculate()
+                )
+
+    def test_pairs_are_memoized_under_a_symmetric_key(self):
+        service = DistanceService()
+        (lat1, lon1), (lat2, lon2) = self.points[:2]
+
+        service.distance(lat1, lon1, lat2, lon2)
+        service.distance(lat2, lon2, lat1, lon1)
+
+        self.assertEqual(service.stats()['hits'], 1)
+        self.assertEqual(service.stats()['pairs'], 1)
+
+    def test_memoized_pairs_are_bounded(self):
+        service = DistanceService(max_pairs=5)
+
+        for lat, lon in self.points[1:20]:
+            service.distance(*self.points[0], lat, lon)
+
+        self.assertEqual(service.stats()['pairs'], 5)
+
+    def test_distance_matrix_matches_haversine_calculator(self):
+        service = DistanceService(decimal_places=3)
+        latitudes, longitudes = zip(*self.points)
+
+        matrix = service.distance_matrix(latitudes, longitudes)
+
+        for i, (lat1, lon1) in enumerate(self.points):
+            for j, (lat2, lon2) in enumerate(self.points):
+                self.assertEqual(matrix[i, j], HaversineCalculator(lat1, lon1, lat2, lon2, 3).calculate())
+
+
+class StubResponse:
+    """Stub streamed response of StubAirportsApiClient."""
+    def __init__(self, status_code, headers, chunks):
+        self.status_code = status_code
+        self.headers = headers
+        self.chunks = chunks
+
+    def iter_content(self, chunk_size=None):
+        return self.chunks
+
+
+class StubAirportsApiClient:
+    """Stub API client streaming air/airports with a fixed catalogue in small chunks."""
+    def __init__(self, airports, chunk_size=16, etag=None):
+        self.airports = airports
+        self.chunk_size = chunk_size
+        self.etag = etag
+        self.requests = []
+
+    def iter_content(self, endpoint, params=None, chunk_size=None):
+        payload = json.dumps(self.airports).encode()
+        for start in range(0, len(payload), self.chunk_size):
+            yield payload[start:start + self.chunk_size]
+
+    @contextmanager
+    def stream(self, endpoint, params=None, headers=None):
+        self.requests.append(headers or {})
+        if self.etag is not None and (headers or {}).get('If-None-Match') == self.etag:
+            yield StubResponse(304, {'ETag': self.etag}, iter([]))
+        else:
+            yield StubResponse(200, {'ETag': self.etag} if self.etag else {}, self.iter_content(endpoint))
+
+
+AIRPORTS_PAYLOAD = {
+    "PLU": {"city": "Belo Horizonte", "lat": -19.75, "lon": -43.75, "state": "MG"},
+    "MAO": {"city": "Manaus", "lat": -3.031327, "lon": -60.046093, "state": "AM"},
+    "GRU": {"city": "Sao Paulo", "lat": -23.435556, "lon": -46.473056, "state": "SP"},
+}
+
+
+class TestAirportETLIncrementalLoad(TestCase):
+    def test_first_load_inserts_every_airport(self):
+        log = AirportETL(StubAirportsApiClient(AIRPORTS_PAYLOAD)).run()
+
+        self.assertTrue(log.success)
+        self.assertEqual((log.n_inserted, log.n_updated, log.n_deleted, log.n_unchanged), (3, 0, 0, 0))
+        self.assertEqual(Airport.objects.count(), 3)
+
+    def test_reload_only_writes_changed_rows_and_keeps_primary_keys(self):
+        AirportETL(StubAirportsApiClient(AIRPORTS_PAYLOAD)).run()
+        primary_keys = dict(Airport.objects.values_list('iata', 'id'))
+
+        payload = {
+            **{iata: data for iata, data in AIRPORTS_PAYLOAD.items() if iata != 'GRU'},
+            "MAO": {**AIRPORTS_PAYLOAD["MAO"], "city": "Manaus (Eduardo Gomes)"},
+            "CGH": {"city": "Sao Paulo", "lat": -23.626111, "lon": -46.656389, "state": "SP"},
+        }
+        log = AirportETL(StubAirportsApiClient(payload)).run()
+
+        self.assertTrue(log.success)
+        self.assertEqual((log.n_inserted, log.n_updated, log.n_deleted, log.n_unchanged), (1, 1, 1, 1))
+        self.assertEqual(log.n_records, 3)
+        self.assertEqual(Airport.objects.get(iata='PLU').id, primary_keys['PLU'])
+        self.assertEqual(Airport.objects.get(iata='MAO').id, primary_keys['MAO'])
+        self.assertEqual(Airport.objects.get(iata='MAO').log_id, log.id)
+        self.assertNotEqual(Airport.objects.get(iata='PLU').log_id, log.id)
+        self.assertFalse(Airport.objects.filter(iata='GRU').exists())
+        self.assertEqual(airport_registry.get('CGH').city, 'Sao Paulo')
+
+    def test_failed_cache_refresh_keeps_the_committed_load_successful(self):
+        with mock.patch.object(airport_snapshot, 'rebuild', side_effect=OSError("disk full")), \
+                self.assertLogs('airports.views.aiport_etl_view', 'ERROR'):
+            log = AirportETL(StubAirportsApiClient(AIRPORTS_PAYLOAD)).run()
+
+        self.assertEqual(DataLoadLog.objects.get(pk=log.id).status, DataLoadLog.SUCCESS)
+        self.assertEqual(Airport.objects.count(), 3)
+
+
+@override_settings(AIRPORT_ETL_BATCH_SIZE=2)
+class TestAirportETLStreaming(TestCase):
+    def test_airports_are_loaded_in_batches(self):
+        etl = AirportETL(StubAirportsApiClient(AIRPORTS_PAYLOAD))
+        batches = list(etl.transform(etl.extract(etl.fetch())))
+
+        self.assertEqual([len(batch) for batch in batches], [2, 1])
+        self.assertEqual([airport.iata for batch in batches for airport in batch], list(AIRPORTS_PAYLOAD))
+
+    def test_progress_is_recorded_per_batch(self):
+        etl = AirportETL(StubAirportsApiClient(AIRPORTS_PAYLOAD))
+        progress = []
+        record_progress = etl.record_progress
+        etl.record_progress = lambda n_records: (progress.append(n_records), record_progress(n_records))
+
+        log = etl.run()
+
+        self.assertTrue(log.success)
+        self.assertEqual(progress, [2, 3])
+        self.assertEqual(Airport.objects.count(), 3)
+
+    def test_malformed_payload_is_reported_as_an_extraction_error(self):
+        api_client = StubAirportsApiClient(AIRPORTS_PAYLOAD)
+        api_client.iter_content = lambda endpoint: iter([b'{"PLU": {"city": '])
+
+        log = AirportETL(api_client).run()
+
+        self.assertFalse(log.success)
+        self.assertTrue(log.message.startswith("Error during extraction"))
+        self.assertEqual(Airport.objects.count(), 0)
+
+    def test_empty_catalogue_is_not_loaded(self):
+        log = AirportETL(StubAirportsApiClient({})).run()
+
+        self.assertFalse(log.success)
+        self.assertEqual(log.message, "No airports data to load.")
+
+
+class TestAirportETLConditionalFetch(TestCase):
+    def test_not_modified_response_skips_the_load(self):
+        api_client = StubAirportsApiClient(AIRPORTS_PAYLOAD, etag='"v1"')
+        first = AirportETL(api_client).run()
+
+        with self.assertNumQueries(4):
+            log = AirportETL(api_client).run()
+
+        self.assertEqual(api_client.requests[-1], {'If-None-Match': '"v1"'})
+        self.assertEqual((log.status, log.success, log.n_records, log.n_unchanged), (DataLoadLog.SKIPPED, True, 3, 3))
+        self.assertEqual((log.etag, log.content_hash), (first.etag, first.content_hash))
+
+    def test_unchanged_content_hash_skips_the_load(self):
+        first = AirportETL(StubAirportsApiClient(AIRPORTS_PAYLOAD)).run()
+        skipped = AirportETL(StubAirportsApiClient(AIRPORTS_PAYLOAD)).run()
+
+        self.assertEqual(skipped.status, DataLoadLog.SKIPPED)
+        self.assertEqual(skipped.content_hash, first.content_hash)
+        self.assertEqual(skipped.message, "The airports data is unchanged, the load was skipped.")
+
+        payload = {**AIRPORTS_PAYLOAD, "MAO": {**AIRPORTS_PAYLOAD["MAO"], "city": "Manaus (Eduardo Gomes)"}}
+        log = AirportETL(StubAirportsApiClient(payload)).run()
+
+        self.assertEqual(log.status, DataLoadLog.SUCCESS)
+        self.assertEqual(log.n_updated, 1)
+        self.assertNotEqual(log.content_hash, first.content_hash)
+
+
+class TestAirportViewSet(TestCase):
+    def setUp(self):
+        AirportETL(StubAirportsApiClient(AIRPORTS_PAYLOAD)).run()
+        self.headers = {'Authorization': f"Bearer {JWTUtils.encode({'user_id': 1, 'username': 'amopromo'})}"}
+
+    def get(self, **params):
+        return self.client.get('/api/airports/airport/', params, headers=self.headers)
+
+    def test_full_list_is_kept_without_parameters(self):
+        response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([airport['iata'] for airport in response.json()], list(AIRPORTS_PAYLOAD))
+        self.assertEqual(set(response.json()[0]), {'id', 'iata', 'city', 'latitude', 'longitude', 'state', 'log_id'})
+        self.assertNotIn('X-Next-Cursor', response)
+
+    def test_pages_follow_the_cursor(self):
+        first = self.get(limit=2, fields='iata,state')
+        second = self.get(limit=2, cursor=first['X-Next-Cursor'], fields='iata,state')
+
+        self.assertEqual(first.json(), [{'iata': 'PLU', 'state': 'MG'}, {'iata': 'MAO', 'state': 'AM'}])
+        self.assertEqual(second.json(), [{'iata': 'GRU', 'state': 'SP'}])
+        self.assertNotIn('X-Next-Cursor', second)
+
+    def test_filters_and_unknown_parameters(self):
+        self.assertEqual(self.get(state='SP', fields='iata').json(), [{'iata': 'GRU'}])
+        self.assertEqual(self.get(city='Manaus').status_code, 400)
+        self.assertEqual(len(self.get(_='1700000000', utm_source='newsletter').json()), 3)
+        self.assertEqual(self.get(fields='iata,password').status_code, 400)
+        self.assertEqual(self.get(limit=0).status_code, 400)
+
+    def test_etag_changes_only_when_the_etl_changes_the_airports(self):
+        etag = self.get()['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/airports/airport/', headers={**self.headers, 'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertNotEqual(self.get(state='SP')['ETag'], etag)
+
+        AirportETL(StubAirportsApiClient(AIRPORTS_PAYLOAD)).run()
+        self.assertEqual(self.get()['ETag'], etag)
+
+        AirportETL(StubAirportsApiClient({**AIRPORTS_PAYLOAD, "CGH": AIRPORTS_PAYLOAD["GRU"]})).run()
+        self.assertNotEqual(self.get()['ETag'], etag)
+
+
+class TestAirportSnapshot(TestCase):
+    def setUp(self):
+        airport_snapshot.invalidate()
+        AirportETL(StubAirportsApiClient(AIRPORTS_PAYLOAD)).run()
+        self.headers = {'Authorization': f"Bearer {JWTUtils.encode({'user_id': 1, 'username': 'amopromo'})}"}
+
+    def get(self, **headers):
+        return self.client.get('/api/airports/airport/', headers={**self.headers, **headers})
+
+    def test_full_list_is_served_from_memory(self):
+        with self.assertNumQueries(1):
+            response = self.get()
+
+        paginated = self.client.get('/api/airports/airport/', {'limit': 1000}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, paginated.content)
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_gzip_is_negotiated_with_its_own_strong_etag(self):
+        identity = self.get()
+        compressed = self.get(**{'Accept-Encoding': 'br;q=0, gzip, deflate'})
+
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(compressed['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(compressed.content), identity.content)
+        self.assertEqual(compressed['ETag'], identity['ETag'][:-1] + '-gzip"')
+        self.assertEqual(self.get(**{'Accept-Encoding': 'gzip', 'If-None-Match': compressed['ETag']}).status_code, 304)
+
+    def test_snapshot_is_reloaded_from_disk(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(AIRPORT_SNAPSHOT_DIR=directory):
+            version = AirportViewSet().get_data_version()
+            data = AirportSnapshot().rebuild(version)
+
+            with self.assertNumQueries(0):
+                restored = AirportSnapshot().get(version)
+
+            self.assertEqual(restored, data)
+
+            airport = Airport.objects.get(iata='GRU')
+            airport.city = 'Guarulhos'
+            airport.save()
+            self.assertIn(b'Guarulhos', AirportSnapshot().get(version).bodies['identity'])
+
+    def test_edit_in_another_worker_changes_the_version(self):
+        etag = self.get()['ETag']
+
+        Airport.objects.filter(iata='GRU').update(city='Guarulhos')
+        bump_airport_edit_version()
+        response = self.get(**{'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Guarulhos', response.content)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_accepted_encodings_skip_refused_codings(self):
+        self.assertEqual(accepted_encodings('gzip;q=0.5, br;q=0, identity'), {'gzip', 'identity'})
+
+
+class BlockingAirportsApiClient(StubAirportsApiClient):
+    """Stub API client that holds the extraction until ``release`` is set."""
+    def __init__(self, airports):
+        super().__init__(airports)
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def iter_content(self, endpoint, params=None, chunk_size=None):
+        self.started.set()
+        self.release.wait(5)
+        yield from super().iter_content(endpoint, params, chunk_size)
+
+
+class TestAirportETLRunner(TransactionTestCase):
+    def setUp(self):
+        self.runner = AirportETLRunner()
+
+    def test_submit_returns_the_pending_log_and_runs_in_background(self):
+        log = self.runner.submit(lambda: AirportETL(StubAirportsApiClient(AIRPORTS_PAYLOAD)))
+        self.runner.wait(5)
+
+        log = DataLoadLog.objects.get(pk=log.id)
+        self.assertEqual(log.status, DataLoadLog.SUCCESS)
+        self.assertEqual(log.n_records, 3)
+        self.assertEqual(Airport.objects.count(), 3)
+
+    def test_overlapping_runs_are_rejected_while_progress_is_visible(self):
+        api_client = BlockingAirportsApiClient(AIRPORTS_PAYLOAD)
+        log = self.runner.submit(lambda: AirportETL(api_client))
+        api_client.started.wait(5)
+
+        with self.assertRaises(ETLAlreadyRunningError) as error:
+            self.runner.submit(lambda: AirportETL(StubAirportsApiClient(AIRPORTS_PAYLOAD)))
+        self.assertEqual(error.exception.log_id, log.id)
+        self.assertEqual(serialize_etl_log(self.runner.current_log(log.id))['status'], DataLoadLog.RUNNING)
+
+        api_client.release.set()
+        self.runner.wait(5)
+
+        self.assertIsNone(self.runner.current_log(log.id))
+        result = serialize_etl_log(DataLoadLog.objects.get(pk=log.id))
+        self.assertEqual((result['status'], result['success'], result['n_records']), (DataLoadLog.SUCCESS, True, 3))
+        self.assertGreaterEqual(result['duration_seconds'], 0)
+
+    def test_unfinished_log_of_another_process_blocks_until_stale(self):
+        unfinished = DataLoadLog.objects.create(model='Airport', status=DataLoadLog.RUNNING)
+
+        with self.assertRaises(ETLAlreadyRunningError) as error:
+            self.runner.run(lambda: AirportETL(StubAirportsApiClient(AIRPORTS_PAYLOAD)))
+        self.assertEqual(error.exception.log_id, unfinished.id)
+
+        with override_settings(AIRPORT_ETL_STALE_AFTER=0):
+            log = self.runner.run(lambda: AirportETL(StubAirportsApiClient(AIRPORTS_PAYLOAD)))
+        self.assertEqual(log.status, DataLoadLog.SUCCESS)
+        unfinished.refresh_from_db()
+        self.assertEqual(unfinished.status, DataLoadLog.FAILED)
+
+    def test_database_rejects_a_second_unfinished_log(self):
+        DataLoadLog.objects.create(model='Airport', status=DataLoadLog.RUNNING)
+
+        with self.assertRaises(IntegrityError):
+            DataLoadLog.objects.create(model='Airport', status=DataLoadLog.PENDING)
@@ -1,9 +1,10 @@
 from django.urls import path
-from airports.views import AiportETLView
+from airports.views import AiportETLView, AiportETLStatusView
 from airports.views.aiport_view import AirportViewSet
 
 urlpatterns = [
     path('load-airports/', AiportETLView.as_view(), name='load-aiports'),  
+    path('load-airports/<int:log_id>/', AiportETLStatusView.as_view(), name='load-airports-status'),
     path('airport/', AirportViewSet.as_view(), name='airport'),
     path('airport/<int:pk>/', AirportViewSet.as_view(), name='airport'),
 ]
@@ -1,2 +1,2 @@
-from .aiport_etl_view import AiportETLView
+from .aiport_etl_view import AiportETLView, AiportETLStatusView
 from .aiport_view import AirportViewSet
\ No newline at end of file
@@ -1,13 +1,44 @@
+import hashlib
+import logging
+import time
+from decimal import Decimal
+from functools import partial
+from tempfile import SpooledTemporaryFile
+
+from django.db import transaction
+from airports.etl_jobs import AirportETLRunner, ETLAlreadyRunningError, airport_etl_runner
 from airports.models.airport import Airport
+from airports.registry import airport_registry
+from airports.snapshot import airport_data_version, airport_snapshot
+from common import timing
 from common.api_client import ApiClient
+from common.json_stream import iter_json_object_items
 from logs.models.data_load_log import DataLoadLog
-from setup import settings
+from django.conf import settings
 from django.http import JsonResponse
+from django.urls import reverse
+from django.utils import timezone
 from django.views import View
 from setup.decorators.jwt_decorator import jwt_required
 
+logger = logging.getLogger(__name__)
+
+
+class AirportETLError(Exception):
+    """Error raised by a stage of the airports ETL, with the message to record on the log."""
+
+
+class AirportETLUnchanged(Exception):
+    """Raised when the upstream airports are the same as on the last successful run."""
+
+
 class AirportETL:
     """Extract, transform, and load data from an external API to a database."""
+    UPDATE_FIELDS = ['city', 'latitude', 'longitude', 'state', 'log']
+    COORDINATE_PLACES = Decimal('0.000001')
+    CHUNK_SIZE = 64 * 1024
+    SPOOL_MAX_SIZE = 4 * 1024 * 1024
+
     def __init__(self, api_client):
         """Initialize the ETL process with an API client."""
         self.api_client = api_client
@@ -17,87 +48,292 @@ class AirportETL:
         """Create an initial log for the ETL process."""
         return DataLoadLog.objects.create(
             model='Airport',
+            status=DataLoadLog.PENDING,
             success=False,
             message='The ETL process has started'
         )
 
-    def update_log(self, success, message, n_records):
+    def update_log(self, success, message, n_records, status=None, **counts):
         """Update the log with the current status of the ETL process."""
+        self.log.status = status or (DataLoadLog.SUCCESS if success else DataLoadLog.FAILED)
         self.log.success = success
         self.log.message = message
         self.log.n_records = n_records
+        for field, value in counts.items():
+            setattr(self.log, field, value)
         self.log.save()
 
-    def extract(self):
-        """Extract data from the external API."""
+    def record_progress(self, n_records):
+        """Record on the in-memory log how many airports were processed so far.
+
+        The load runs in one transaction, so a saved row would stay invisible to other
+        connections until it commits, and SQLite cannot write it from another connection
+        meanwhile. The progress is therefore only live on the worker running the ETL,
+        through ``airport_etl_runner.current_log``.
+        """
+        self.log.message = f"Loading airports: {n_records} processed."
+        self.log.n_records = n_records
+
+    def last_fetch_log(self):
+        """Return the latest successful or skipped log, whose fetch metadata describes the stored airports."""
+        return DataLoadLog.objects.filter(
+            model='Airport',
+            status__in=[DataLoadLog.SUCCESS, DataLoadLog.SKIPPED]
+        ).exclude(pk=self.log.pk).first()
+
+    def _conditional_headers(self, previous):
+        """Return the If-None-Match/If-Modified-Since headers of the previous fetch."""
+        headers = {}
+        if previous is not None and previous.etag:
+            headers['If-None-Match'] = previous.etag
+        if previous is not None and previous.last_modified:
+            headers['If-Modified-Since'] = previous.last_modified
+        return headers
+
+    def fetch(self, previous=None):
+        """Download the airports to a spooled file while hashing them, returning the file rewound.
+
+        Raises AirportETLUnchanged when the API answers 304 Not Modified or the content hash
+        equals the one of ``previous``.
+        """
+        payload = SpooledTemporaryFile(max_size=self.SPOOL_MAX_SIZE)
+        digest = hashlib.sha256()
         try:
-            return self.api_client.get('air/airports')
+            with self.api_client.stream('air/airports', headers=self._conditional_headers(previous)) as response:
+                if response.status_code == 304 and previous is not None:
+                    raise AirportETLUnchanged("The airports data was not modified, the load was skipped.")
+                self.log.etag = response.headers.get('ETag')
+                self.log.last_modified = response.headers.get('Last-Modified')
+                for chunk in response.iter_content(self.CHUNK_SIZE):
+                    digest.update(chunk)
+                    payload.write(chunk)
+        except AirportETLUnchanged:
+            payload.close()
+            raise
         except Exception as e:
-            self.update_log(False, f"Error during extraction: {e}", 0)
-            return None
+            payload.close()
+            raise AirportETLError(f"Error during extraction: {e}")
 
-    def transform(self, airports):
-        """Transform the extracted data into a list of Airport objects."""
-        if not airports:
-            self.update_log(False, "No airports data to transform.", 0)
-            return None
-        
+        self.log.content_hash = digest.hexdigest()
+        if previous is not None and previous.content_hash == self.log.content_hash:
+            payload.close()
+            raise AirportETLUnchanged("The airports data is unchanged, the load was skipped.")
+
+        payload.seek(0)
+        return payload
+
+    def extract(self, payload):
+        """Extract data from the fetched payload, yielding (IATA, data) pairs while it is read."""
         try:
-            to_create = [
-                Airport(
-                    iata=iata,
-                    city=data['city'],
-                    latitude=data['lat'],
-                    longitude=data['lon'],
-                    state=data['state'],
-                    log_id = self.log.id
-                )
-                for iata, data in airports.items()
-            ]
-            return to_create
+            yield from iter_json_object_items(iter(partial(payload.read, self.CHUNK_SIZE), b''))
         except Exception as e:
-            self.update_log(False, f"Error during transformation: {e}", 0)
-            return None
+            raise AirportETLError(f"Error during extraction: {e}")
 
-    def load(self, airports):
-        """Load the transformed data to database."""
-        if not airports:
-            self.update_log(False, "No airports data to load.", 0)
-            return
+    def skip(self, previous, message):
+        """Record the run as skipped, carrying the fetch metadata of the previous run over."""
+        self.log.etag = self.log.etag or previous.etag
+        self.log.last_modified = self.log.last_modified or previous.last_modified
+        self.log.content_hash = self.log.content_hash or previous.content_hash
+        self.update_log(
+            True, message, previous.n_records,
+            status=DataLoadLog.SKIPPED,
+            n_inserted=0,
+            n_updated=0,
+            n_deleted=0,
+            n_unchanged=previous.n_records
+        )
+
+    def _to_airport(self, iata, data):
+        """Transform an extracted pair into an Airport object."""
+        return Airport(
+            iata=iata,
+            city=data['city'],
+            latitude=data['lat'],
+            longitude=data['lon'],
+            state=data['state'],
+            log_id = self.log.id
+        )
+
+    def transform(self, airports):
+        """Transform the extracted pairs into batches of ``AIRPORT_ETL_BATCH_SIZE`` Airport objects."""
+        batch_size = settings.AIRPORT_ETL_BATCH_SIZE
+        batch = []
+
+        for iata, data in airports:
+            try:
+                batch.append(self._to_airport(iata, data))
+            except Exception as e:
+                raise AirportETLError(f"Error during transformation: {e}")
+
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
+    def _coordinate(self, value):
+        """Return a coordinate with the precision stored on the database."""
+        return Decimal(str(value)).quantize(self.COORDINATE_PLACES)
+
+    def _has_changed(self, current, incoming):
+        """Return whether the incoming airport differs from the stored one."""
+        return (
+            current.city != incoming.city
+            or current.state != incoming.state
+            or current.latitude != self._coordinate(incoming.latitude)
+            or current.longitude != self._coordinate(incoming.longitude)
+        )
+
+    def _load_batch(self, airports):
+        """Insert the new airports of a batch and update the changed ones, returning the counts."""
+        existing = Airport.objects.in_bulk([airport.iata for airport in airports], field_name='iata')
+        to_insert = []
+        to_update = []
+
+        for airport in airports:
+            current = existing.get(airport.iata)
+            if current is None:
+                to_insert.append(airport)
+            elif self._has_changed(current, airport):
+                current.city = airport.city
+                current.state = airport.state
+                current.latitude = self._coordinate(airport.latitude)
+                current.longitude = self._coordinate(airport.longitude)
+                current.log_id = self.log.id
+                to_update.append(current)
+
+        Airport.objects.bulk_create(
+            to_insert,
+            update_conflicts=True,
+            unique_fields=['iata'],
+            update_fields=self.UPDATE_FIELDS
+        )
+        Airport.objects.bulk_update(to_update, self.UPDATE_FIELDS)
+
+        return len(to_insert), len(to_update), len(airports) - len(to_insert) - len(to_update)
+
+    def _delete_missing(self, seen_iatas):
+        """Delete the stored airports that were not in the extracted data, returning how many."""
+        batch_size = settings.AIRPORT_ETL_BATCH_SIZE
+        to_delete = [
+            iata for iata in Airport.objects.values_list('iata', flat=True).iterator(chunk_size=batch_size)
+            if iata not in seen_iatas
+        ]
+        for start in range(0, len(to_delete), batch_size):
+            Airport.objects.filter(iata__in=to_delete[start:start + batch_size]).delete()
+        return len(to_delete)
+
+    def load(self, batches):
+        """Load the transformed batches to database, writing only the inserted, changed and removed airports."""
+        n_inserted = n_updated = n_unchanged = 0
+        seen_iatas = set()
 
         try:
-            Airport.objects.all().delete()
-            Airport.objects.bulk_create(airports)
-            self.update_log(True, "The ETL process finished successfully.", len(airports))
+            with transaction.atomic():
+                for airports in batches:
+                    inserted, updated, unchanged = self._load_batch(airports)
+                    n_inserted += inserted
+                    n_updated += updated
+                    n_unchanged += unchanged
+                    seen_iatas.update(airport.iata for airport in airports)
+                    self.record_progress(len(seen_iatas))
+
+                if not seen_iatas:
+                    raise AirportETLError("No airports data to load.")
+
+                n_deleted = self._delete_missing(seen_iatas)
+
+                self.update_log(
+                    True, "The ETL process finished successfully.", len(seen_iatas),
+                    n_inserted=n_inserted,
+                    n_updated=n_updated,
+                    n_deleted=n_deleted,
+                    n_unchanged=n_unchanged
+                )
+        except AirportETLError as e:
+            self.update_log(False, str(e), 0)
+            return
         except Exception as e:
             self.update_log(False, f"Error during loading: {e}", 0)
+            return
+
+        self.refresh_airport_caches()
+
+    def refresh_airport_caches(self):
+        """Reload the airport index and snapshot after a committed load, leaving its log successful on errors.
+
+        The airports are already committed, so a failed refresh is only logged: the index and
+        snapshot are rebuilt from the database by the next request that needs them.
+        """
+        try:
+            airport_registry.reload()
+            airport_snapshot.rebuild(airport_data_version())
+        except Exception:
+            logger.exception("Could not refresh the airport caches after ETL run %s.", self.log.id)
+            airport_registry.invalidate()
+            airport_snapshot.invalidate()
 
     def run(self):
-        """Run the ETL process."""
-        airports = self.extract()
-        if not airports:
-            return self.log
-        
-        transformed_data = self.transform(airports)
-        if not transformed_data:
-            return self.log
-        
-        self.load(transformed_data)
+        """Run the ETL process, skipping it when the airports are unchanged and loading them in batches otherwise."""
+        start_time = time.perf_counter()
+        with timing.collect() as phases:
+            self._run()
+        timing.log_timing(
+            'airport_etl', time.perf_counter() - start_time, phases,
+            log_id=self.log.id,
+            status=self.log.status,
+            n_records=self.log.n_records,
+        )
         return self.log
-    
+
+    def _run(self):
+        """Fetch the airports and load them unless they are unchanged."""
+        self.update_log(False, "The ETL process is running.", 0, status=DataLoadLog.RUNNING)
+        previous = self.last_fetch_log()
+
+        try:
+            with timing.timed('fetch'):
+                payload = self.fetch(previous)
+        except AirportETLUnchanged as e:
+            self.skip(previous, str(e))
+            return
+        except AirportETLError as e:
+            self.update_log(False, str(e), 0)
+            return
+
+        with payload, timing.timed('load'):
+            self.load(self.transform(self.extract(payload)))
+
+
+
+def serialize_etl_log(log):
+    """Return the status, progress, duration and result of an ETL log."""
+    finished = log.status in DataLoadLog.FINISHED_STATUSES
+    ended_at = log.finished_at if finished else timezone.now()
+
+    return {
+        "log_id": log.id,
+        "status": log.status,
+        "success": log.success,
+        "message": log.message,
+        "n_records": log.n_records,
+        "n_inserted": log.n_inserted,
+        "n_updated": log.n_updated,
+        "n_deleted": log.n_deleted,
+        "n_unchanged": log.n_unchanged,
+        "started_at": log.started_at,
+        "finished_at": log.finished_at if finished else None,
+        "duration_seconds": round((ended_at - log.started_at).total_seconds(), 3),
+    }
 
 
 class AiportETLView(View):
     """API view to trigger the Airport ETL process."""
     @jwt_required
     def post(self, request, *args, **kwargs):
-        """Handle POST requests to trigger the ETL process."""
-        api_client = ApiClient(
-            base_url=settings.STUB_AMOPROMO_BASE_URL,
-            username=settings.STUB_AMOPROMO_USERNAME,
-            password=settings.STUB_AMOPROMO_PASSWORD,
-            api_key=settings.STUP_AMOPROMO_API_KEY
-        )
+        """Handle POST requests to queue the ETL process, returning the log to poll."""
+        api_client = ApiClient.from_settings()
 
         if not api_client:
             return JsonResponse({
@@ -105,12 +341,36 @@ class AiportETLView(View):
                 "success": False,
             }, status=500)
 
-        etl = AirportETL(api_client)
-        log = etl.run()
+        try:
+            log = airport_etl_runner.submit(lambda: AirportETL(api_client))
+        except ETLAlreadyRunningError as e:
+            return JsonResponse({
+                "message": str(e),
+                "success": False,
+                "log_id": e.log_id,
+            }, status=409)
 
         return JsonResponse({
-            "message": log.message,
-            "success": log.success,
-            "n_records": log.n_records,
-        }, status=200)
+            "message": "The ETL process was queued.",
+            "success": True,
+            "log_id": log.id,
+            "status_url": reverse('load-airports-status', args=[log.id]),
+        }, status=202)
+
+
+class AiportETLStatusView(View):
+    """API view to poll the status of an Airport ETL process."""
+    @jwt_required
+    def get(self, request, log_id, *args, **kwargs):
+        """Handle GET requests returning the progress, duration and result of an ETL run."""
+        log = airport_etl_runner.current_log(log_id)
+        if log is None:
+            log = DataLoadLog.objects.filter(pk=log_id, model=AirportETLRunner.MODEL).first()
+
+        if log is None:
+            return JsonResponse({
+                "message": "ETL process not found.",
+                "success": False,
+            }, status=404)
 
+        return JsonResponse(serialize_etl_log(log), status=200)
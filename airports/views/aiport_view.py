@@ -1,6 +1,17 @@
 from airports.models import Airport
+from airports.snapshot import airport_data_version, airport_snapshot
 from setup.viewsets.protect_model_viewset import ProtectModelViewset
 
 class AirportViewSet(ProtectModelViewset):
     model = Airport
-    
\ No newline at end of file
+    filter_fields = ('iata', 'state')
+
+    def get_data_version(self):
+        """Return the version of the airports, changed by ETL runs and by edits in any worker."""
+        return airport_data_version()
+
+    def list(self, request):
+        """Serve the full list from the pre-rendered snapshot, and paginated or filtered lists from the database."""
+        if not request.GET:
+            return airport_snapshot.response(request, self.get_data_version())
+        return super().list(request)
@@ -0,0 +1,116 @@
+"""Compare the memory used by the slotted Flight/RoundTrip classes with the dict-based ones.
+
+Each variant builds every round trip of a search with ``--size`` options per leg in a
+fresh subprocess and reports its peak RSS and peak traced allocations.
+
+Usage:
+    python -m benchmarks.flight_memory_benchmark --size 500
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tracemalloc
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'setup.settings')
+
+import django
+
+django.setup()
+
+from airlines.views.airline_combinator_view import Flight, RoundTrip
+
+VARIANTS = ('dict', 'slotted')
+
+
+def _without_slots(cls):
+    """Return a copy of the class storing its attributes in a per instance dict, as before __slots__."""
+    namespace = {
+        name: value for name, value in vars(cls).items()
+        if name not in ('__slots__', *cls.__slots__)
+    }
+    return type(f'Dict{cls.__name__}', (), namespace)
+
+
+DictFlight = _without_slots(Flight)
+
+
+class DictRoundTrip:
+    """The round trip as it was before __slots__, storing a total price dict per pair."""
+    def __init__(self, departure_flight, return_flight):
+        self.departure_flight = departure_flight
+        self.return_flight = return_flight
+        self.total_price = RoundTrip._calculate_total_price(self)
+
+
+def make_option(index):
+    """Return an already priced upstream option."""
+    return {
+        "departure_time": "2022-06-12T%02d:%02d:00" % (index % 12, index % 60),
+        "arrival_time": "2022-06-12T%02d:%02d:00" % (12 + index % 12, index % 60),
+        "price": {"fare": 1000 + index * 0.37, "fees": 100 + index * 0.04, "total": 1100 + index * 0.41},
+        "aircraft": {"model": "A 320", "manufacturer": "Airbus"},
+        "meta": {"range": 2566.2, "cruise_speed_kmh": 832.28, "cost_per_km": 0.75},
+    }
+
+
+def build_round_trips(variant, size):
+    """Build the full cartesian product of round trips with the classes of the variant."""
+    flight_class, round_trip_class = (Flight, RoundTrip) if variant == 'slotted' else (DictFlight, DictRoundTrip)
+    departure_flights = [flight_class(**make_option(index)) for index in range(size)]
+    return_flights = [flight_class(**make_option(index + size)) for index in range(size)]
+
+    return [
+        round_trip_class(departure_flight, return_flight)
+        for departure_flight in departure_flights
+        for return_flight in return_flights
+    ]
+
+
+def measure(variant, size):
+    """Measure the memory used to build the round trips of a variant in this process."""
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    round_trips = build_round_trips(variant, size)
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    del round_trips
+
+    tracemalloc.start()
+    round_trips = build_round_trips(variant, size)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "variant": variant,
+        "size": size,
+        "round_trips": len(round_trips),
+        "peak_rss_kb": rss_after,
+        "peak_rss_delta_kb": rss_after - rss_before,
+        "traced_peak_kb": traced_peak // 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=500, help='options per leg')
+    parser.add_argument('--variant', choices=VARIANTS, help='measure a single variant in this process')
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(measure(args.variant, args.size)))
+        return
+
+    results = []
+    for variant in VARIANTS:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.flight_memory_benchmark', '--size', str(args.size), '--variant', variant],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results.append(json.loads(output))
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""Benchmark the combinator and airport ETL hot paths against a local stub API.
+
+Runs on a throwaway test database and a ``benchmarks.stub_server`` instance, and reports,
+per benchmark, the throughput, p50/p99 latency and peak traced memory. Results can be
+saved as JSON and compared with a previous run to spot regressions.
+
+Usage:
+    python -m benchmarks.hot_paths_benchmark --options 200 --airports 5000 --output results.json
+    python -m benchmarks.hot_paths_benchmark --compare results.json
+"""
+import argparse
+import copy
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'setup.settings')
+os.environ.setdefault('TIMING_LOG_LEVEL', 'WARNING')
+
+import django
+
+django.setup()
+
+from django.db import connection
+from django.http import JsonResponse
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from airlines.search_cache import airline_search_cache
+from airlines.views.airline_combinator_view import Airline, AirlineManager
+from airports.models import Airport
+from airports.views.aiport_etl_view import AirportETL
+from benchmarks.stub_server import AIRPORTS, StubApiServer, search_payload
+from common.api_client import ApiClient
+from common.json_encoder import FastJsonResponse, get_json_backend, orjson
+
+SEARCH = ('PLU', 'MAO', '2022-06-12', '2022-06-15')
+
+
+def percentile(samples, percent):
+    """Return the nearest-rank percentile of the samples."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def measure(name, function, iterations, setup=None):
+    """Time ``function`` over ``iterations`` calls, then trace the peak memory of one more call."""
+    function()
+
+    samples = []
+    for _ in range(iterations):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "name": name,
+        "iterations": iterations,
+        "throughput_per_s": round(iterations / sum(samples), 2),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "peak_memory_kb": peak // 1024,
+    }
+
+
+def json_backends():
+    """Return the installed JSON response backends."""
+    return [get_json_backend(name) for name in ('json', 'orjson') if name == 'json' or orjson is not None]
+
+
+def run_benchmarks(server, iterations):
+    """Run every benchmark against the stub server, returning their results."""
+    api_client = ApiClient(server.base_url, 'user', 'password', 'key')
+    manager = AirlineManager(api_client)
+    search = search_payload('PLU', 'MAO', SEARCH[2], server.n_options, server.seed)
+    combinations = manager.get_airlines_combinations(*SEARCH)
+
+    return [
+        measure(
+            'AirlineManager.get_airlines_combinations',
+            lambda: manager.get_airlines_combinations(*SEARCH),
+            iterations,
+            setup=airline_search_cache.clear,
+        ),
+        measure(
+            'Airline.update_options',
+            lambda: Airline(search['summary'], copy.deepcopy(search['options'])),
+            iterations,
+        ),
+        measure(
+            'JSON serialization',
+            lambda: JsonResponse(combinations).content,
+            iterations,
+        ),
+        *(
+            measure(
+                f'JSON serialization ({backend.name})',
+                lambda backend=backend: FastJsonResponse(combinations, backend=backend).content,
+                iterations,
+            )
+            for backend in json_backends()
+        ),
+        measure(
+            'AirportETL.run',
+            lambda: AirportETL(api_client).run(),
+            max(1, iterations // 10),
+        ),
+    ]
+
+
+def compare(results, baseline):
+    """Return the relative change of each metric against a baseline run."""
+    baseline_results = {result['name']: result for result in baseline['results']}
+    changes = {}
+    for result in results:
+        previous = baseline_results.get(result['name'])
+        if previous is None:
+            continue
+        changes[result['name']] = {
+            metric: f"{(result[metric] - previous[metric]) / previous[metric] * 100:+.1f}%"
+            for metric in ('throughput_per_s', 'p50_ms', 'p99_ms', 'peak_memory_kb')
+            if previous.get(metric)
+        }
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--options', type=int, default=100, help='flights per search leg')
+    parser.add_argument('--airports', type=int, default=1000, help='synthetic airports loaded by the ETL')
+    parser.add_argument('--iterations', type=int, default=50, help='timed calls per benchmark')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON file of a previous run to compare with')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    database_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        for iata, data in AIRPORTS.items():
+            Airport.objects.create(iata=iata, city=data['city'], latitude=data['lat'], longitude=data['lon'], state=data['state'])
+
+        with StubApiServer(args.options, args.airports, args.seed) as server:
+            results = run_benchmarks(server, args.iterations)
+    finally:
+        connection.creation.destroy_test_db(database_name, verbosity=0)
+        teardown_test_environment()
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "parameters": {
+            "options": args.options,
+            "airports": args.airports,
+            "iterations": args.iterations,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.compare:
+        with open(args.compare) as file:
+            report["changes"] = compare(results, json.load(file))
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
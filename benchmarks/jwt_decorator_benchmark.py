@@ -0,0 +1,74 @@
+"""Measure the overhead of jwt_required with and without the verified-token cache.
+
+A trivial view is decorated and called ``--requests`` times with the same bearer token,
+once verifying the token on every call and once through the cache.
+
+Usage:
+    python -m benchmarks.jwt_decorator_benchmark --requests 20000
+"""
+import argparse
+import json
+import os
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'setup.settings')
+
+import django
+
+django.setup()
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from setup.decorators import jwt_decorator
+from setup.utils.jwt_utils import JWTUtils
+from setup.utils.token_cache import VerifiedTokenCache
+
+VARIANTS = ('uncached', 'cached')
+
+
+class BenchmarkView:
+    """View doing no work, so only the decorator is measured."""
+    @jwt_decorator.jwt_required
+    def get(self, request):
+        return HttpResponse()
+
+
+def measure(variant, n_requests):
+    """Call the decorated view with the same token and return the time per call."""
+    token_cache = VerifiedTokenCache(max_entries=0 if variant == 'uncached' else 1024)
+    jwt_decorator.verified_token_cache = token_cache
+
+    request = RequestFactory().get('/', HTTP_AUTHORIZATION=f"Bearer {JWTUtils.encode({'user_id': 1})}")
+    view = BenchmarkView()
+
+    start = time.perf_counter()
+    for _ in range(n_requests):
+        view.get(request)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "variant": variant,
+        "requests": n_requests,
+        "total_ms": round(elapsed * 1000, 2),
+        "us_per_request": round(elapsed / n_requests * 1e6, 3),
+        "hit_rate": token_cache.stats()['hit_rate'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20000, help='calls per variant')
+    args = parser.parse_args()
+
+    original_cache = jwt_decorator.verified_token_cache
+    try:
+        results = [measure(variant, args.requests) for variant in VARIANTS]
+    finally:
+        jwt_decorator.verified_token_cache = original_cache
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
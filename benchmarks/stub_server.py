@@ -0,0 +1,163 @@
+"""Local stand-in for the stub API serving synthetic ``air/search`` and ``air/airports`` payloads.
+
+Payloads are generated from a seed, so every run of a benchmark sees the same data. The
+airports catalogue moves its coordinates slightly on every request, so each ETL run has
+rows to update instead of being skipped as unchanged.
+
+Usage:
+    python -m benchmarks.stub_server --options 200 --airports 5000 --port 8765
+"""
+import argparse
+import json
+import random
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+AIRPORTS = {
+    "PLU": {"city": "Belo Horizonte", "lat": -19.75, "lon": -43.75, "state": "MG"},
+    "MAO": {"city": "Manaus", "lat": -3.031327, "lon": -60.046093, "state": "AM"},
+}
+AIRCRAFTS = (
+    {"model": "A 320", "manufacturer": "Airbus"},
+    {"model": "777-200", "manufacturer": "Boeing"},
+    {"model": "E195", "manufacturer": "Embraer"},
+)
+
+
+def search_payload(from_iata, to_iata, date, n_options, seed=0):
+    """Return an ``air/search`` payload with ``n_options`` flights departing on ``date``."""
+    rng = random.Random(f"{seed}:{from_iata}:{to_iata}:{date}")
+    day = datetime.strptime(date, "%Y-%m-%d")
+    options = []
+
+    for _ in range(n_options):
+        departure_time = day + timedelta(minutes=rng.randrange(0, 24 * 60, 5))
+        arrival_time = departure_time + timedelta(minutes=rng.randrange(60, 8 * 60, 5))
+        options.append({
+            "departure_time": departure_time.isoformat(),
+            "arrival_time": arrival_time.isoformat(),
+            "price": {"fare": round(rng.uniform(150, 3500), 2), "fees": 0.0, "total": 0.0},
+            "aircraft": rng.choice(AIRCRAFTS),
+            "meta": {"range": 0, "cruise_speed_kmh": 0, "cost_per_km": 0.0},
+        })
+
+    return {
+        "summary": {
+            "departure_date": date,
+            "from": {"iata": from_iata, **AIRPORTS.get(from_iata, AIRPORTS["PLU"])},
+            "to": {"iata": to_iata, **AIRPORTS.get(to_iata, AIRPORTS["MAO"])},
+            "currency": "BRL",
+        },
+        "options": options,
+    }
+
+
+MAX_SYNTHETIC_AIRPORTS = 26 ** 3 - len(AIRPORTS)
+
+
+def check_n_airports(n_airports):
+    """Raise ValueError when ``n_airports`` synthetic airports do not fit in the three letter codes."""
+    if n_airports > MAX_SYNTHETIC_AIRPORTS:
+        raise ValueError(f"At most {MAX_SYNTHETIC_AIRPORTS} synthetic airports fit in three letter IATA codes.")
+
+
+def synthetic_iata(index):
+    """Return a unique three letter code for the ``index``-th synthetic airport."""
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    return letters[index // 676 % 26] + letters[index // 26 % 26] + letters[index % 26]
+
+
+def airports_payload(n_airports, revision=0, seed=0):
+    """Return an ``air/airports`` payload with the known airports plus ``n_airports`` synthetic ones."""
+    check_n_airports(n_airports)
+    rng = random.Random(seed)
+    airports = dict(AIRPORTS)
+    index = 0
+    while len(airports) < n_airports + len(AIRPORTS):
+        iata = synthetic_iata(index)
+        index += 1
+        if iata in airports:
+            continue
+        airports[iata] = {
+            "city": f"City {iata}",
+            "lat": round(rng.uniform(-33, 5) + revision * 1e-6, 6),
+            "lon": round(rng.uniform(-73, -35) + revision * 1e-6, 6),
+            "state": rng.choice(("AM", "BA", "MG", "PR", "RJ", "RS", "SP")),
+        }
+    return airports
+
+
+class StubApiHandler(BaseHTTPRequestHandler):
+    """Answer ``/air/search/<key>/<from>/<to>/<date>`` and ``/air/airports/<key>`` over HTTP/1.1."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        parts = self.path.strip('/').split('/')
+        if parts[:2] == ['air', 'search'] and len(parts) == 6:
+            payload = search_payload(*parts[3:6], self.server.n_options, self.server.seed)
+        elif parts[:2] == ['air', 'airports'] and len(parts) == 3:
+            payload = airports_payload(self.server.n_airports, self.server.next_revision(), self.server.seed)
+        else:
+            self.send_error(404)
+            return
+
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubApiServer(ThreadingHTTPServer):
+    """Threaded stub API server running on a background thread."""
+    daemon_threads = True
+
+    def __init__(self, n_options=100, n_airports=1000, seed=0, host='127.0.0.1', port=0):
+        check_n_airports(n_airports)
+        super().__init__((host, port), StubApiHandler)
+        self.n_options = n_options
+        self.n_airports = n_airports
+        self.seed = seed
+        self._revision = 0
+        self._revision_lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        """Return the base URL to give to the API client."""
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def next_revision(self):
+        """Return a new revision of the airports catalogue."""
+        with self._revision_lock:
+            self._revision += 1
+            return self._revision
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--options', type=int, default=100, help='flights per search')
+    parser.add_argument('--airports', type=int, default=1000, help='synthetic airports in the catalogue')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    server = StubApiServer(args.options, args.airports, args.seed, port=args.port)
+    print(f"Serving the stub API on {server.base_url}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Measure the parsing of option timestamps and the travel time computation of the pricing.
+
+``--timestamps`` option timestamps are generated like the stub API ones and parsed with
+``datetime.strptime`` and with ``common.timestamps.parse_timestamp``. The travel hours of
+the parsed flights are then computed through ``datetime64`` arrays, as the pricing used to,
+and from the ``timedelta`` of each flight, as it does now.
+
+Usage:
+    python -m benchmarks.timestamp_parsing_benchmark --timestamps 100000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from common.timestamps import TIMESTAMP_FORMAT, parse_timestamp
+
+
+def generate_timestamps(n_timestamps, seed=0):
+    """Return ``n_timestamps // 2`` (departure, arrival) pairs of option timestamps."""
+    rng = random.Random(seed)
+    day = datetime(2022, 6, 12)
+    pairs = []
+    for _ in range(n_timestamps // 2):
+        departure_time = day + timedelta(minutes=rng.randrange(0, 24 * 60, 5))
+        arrival_time = departure_time + timedelta(minutes=rng.randrange(60, 8 * 60, 5))
+        pairs.append((departure_time.isoformat(), arrival_time.isoformat()))
+    return pairs
+
+
+def measure(name, function, repeat):
+    """Return the best time of ``repeat`` calls of ``function`` and its result."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return {"name": name, "best_ms": round(best * 1000, 2)}, result
+
+
+def travel_hours_datetime64(flights):
+    """Travel hours through ``datetime64`` arrays, as the pricing computed them before."""
+    departures = np.array([departure for departure, _ in flights], dtype='datetime64[us]')
+    arrivals = np.array([arrival for _, arrival in flights], dtype='datetime64[us]')
+    return (arrivals - departures).astype(np.int64).astype(np.float64) / 1e6 / 3600
+
+
+def travel_hours_timedelta(flights):
+    """Travel hours from the ``timedelta`` of each flight, as the pricing computes them now."""
+    travel_seconds = np.fromiter(
+        ((arrival - departure).total_seconds() for departure, arrival in flights),
+        dtype=np.float64, count=len(flights)
+    )
+    return travel_seconds / 3600
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--timestamps', type=int, default=100000, help='option timestamps to parse')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per variant, the best one is reported')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    pairs = generate_timestamps(args.timestamps, args.seed)
+
+    strptime_result, expected = measure(
+        'datetime.strptime',
+        lambda: [tuple(datetime.strptime(value, TIMESTAMP_FORMAT) for value in pair) for pair in pairs],
+        args.repeat,
+    )
+    parse_result, flights = measure(
+        'parse_timestamp',
+        lambda: [tuple(parse_timestamp(value) for value in pair) for pair in pairs],
+        args.repeat,
+    )
+    assert flights == expected, "parse_timestamp differs from strptime"
+
+    datetime64_result, expected_hours = measure('datetime64 travel hours', lambda: travel_hours_datetime64(flights), args.repeat)
+    timedelta_result, hours = measure('timedelta travel hours', lambda: travel_hours_timedelta(flights), args.repeat)
+    assert np.array_equal(hours, expected_hours), "timedelta travel hours differ from datetime64 ones"
+
+    print(json.dumps({
+        "timestamps": len(pairs) * 2,
+        "results": [strptime_result, parse_result, datetime64_result, timedelta_result],
+        "parsing_speedup": round(strptime_result['best_ms'] / parse_result['best_ms'], 1),
+        "travel_hours_speedup": round(datetime64_result['best_ms'] / timedelta_result['best_ms'], 1),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,22 +1,200 @@
+import asyncio
+import threading
+import weakref
+from contextlib import contextmanager
+
+import httpx
 import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 
+from common import timing
+from common.resilience import UpstreamUnavailableError, upstream_registry
+
 class ApiClient:
     """API client class to make requests to a REST API"""
+    _session = None
+    _session_lock = threading.Lock()
+
     def __init__(self, base_url, username, password, api_key):
         """Inits the ApiClient with the API key, base URL and credentials"""
         self.api_key = api_key
         self.base_url = base_url
         self.auth = HTTPBasicAuth(username, password)
+        self.timeout = (settings.API_CLIENT_CONNECT_TIMEOUT, settings.API_CLIENT_READ_TIMEOUT)
+
+    @classmethod
+    def from_settings(cls):
+        """Inits the client with the stub API credentials defined on the project settings"""
+        return cls(
+            base_url=settings.STUB_AMOPROMO_BASE_URL,
+            username=settings.STUB_AMOPROMO_USERNAME,
+            password=settings.STUB_AMOPROMO_PASSWORD,
+            api_key=settings.STUP_AMOPROMO_API_KEY
+        )
+
+    @classmethod
+    def get_session(cls):
+        """Returns the process-wide session, keeping pooled connections alive between requests"""
+        if cls._session is None:
+            with cls._session_lock:
+                if cls._session is None:
+                    adapter = HTTPAdapter(
+                        pool_connections=settings.API_CLIENT_POOL_CONNECTIONS,
+                        pool_maxsize=settings.API_CLIENT_POOL_MAXSIZE
+                    )
+                    session = requests.Session()
+                    session.headers['Connection'] = 'keep-alive'
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    cls._session = session
+        return cls._session
+
+    @classmethod
+    def connection_stats(cls):
+        """Returns how many requests were served by a new connection and how many reused a pooled one"""
+        n_requests = 0
+        n_connections = 0
+
+        if cls._session is not None:
+            adapters = {id(adapter): adapter for adapter in cls._session.adapters.values()}
+            for adapter in adapters.values():
+                pools = adapter.poolmanager.pools
+                for key in pools.keys():
+                    pool = pools.get(key)
+                    if pool is None:
+                        continue
+                    n_requests += pool.num_requests
+                    n_connections += pool.num_connections
+
+        return {
+            "requests": n_requests,
+            "new_connections": n_connections,
+            "reused_connections": max(n_requests - n_connections, 0),
+        }
+
+    def _timeout(self, budget):
+        """Returns the (connect, read) timeout of a request, cut down to the budget left when there is one"""
+        if budget is None:
+            return self.timeout
+        return tuple(min(timeout, budget) for timeout in self.timeout)
+
+    @staticmethod
+    def _is_failure(response):
+        """Returns whether an upstream response means the endpoint is failing and the request may be retried"""
+        return response.status_code >= 500 or response.status_code == 429
+
+    @staticmethod
+    def _retry_exceptions():
+        """Returns the request errors that may be retried, read timeouts only with API_CLIENT_RETRY_TIMEOUTS"""
+        if settings.API_CLIENT_RETRY_TIMEOUTS:
+            return (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+        return (requests.exceptions.ConnectionError,)
+
+    def _build_url(self, endpoint, params=None):
+        """Builds the request URL for the given endpoint and params"""
+        return f"{self.base_url}/{endpoint}/{self.api_key}" if params is None else f"{self.base_url}/{endpoint}/{self.api_key}/{params}"
 
     def get(self, endpoint, params=None):
-        """Makes a GET request to the API"""
-        url = f"{self.base_url}/{endpoint}/{self.api_key}" if params is None else f"{self.base_url}/{endpoint}/{self.api_key}/{params}"
+        """Makes a GET request to the API through the circuit breaker of the endpoint
+
+        Connection errors, connect timeouts and 5xx/429 answers are retried with jittered backoff while
+        the request deadline allows it, and the request is hedged when API_CLIENT_HEDGE is set.
+        """
+        url = self._build_url(endpoint, params)
+        try:
+            with timing.timed('upstream'):
+                response = upstream_registry.get(self.base_url, endpoint).call(
+                    lambda budget: self.get_session().get(url, auth=self.auth, timeout=self._timeout(budget)),
+                    self._is_failure,
+                    self._retry_exceptions(),
+                    hedge=settings.API_CLIENT_HEDGE,
+                )
+                response.raise_for_status()
+                return response.json()
+        except (requests.exceptions.RequestException, UpstreamUnavailableError) as e:
+            print(f"An error occurred: {e}")
+            return None
+
+    @contextmanager
+    def stream(self, endpoint, params=None, headers=None):
+        """Makes a streamed GET request to the API, returning the response before its body is read.
+
+        Error statuses raise, while a 304 Not Modified answer to a conditional request is returned.
+        The request goes through the circuit breaker of the endpoint but is not retried.
+        """
+        url = self._build_url(endpoint, params)
+        request = lambda budget: self.get_session().get(
+            url, auth=self.auth, timeout=self._timeout(budget), headers=headers, stream=True
+        )
+        with upstream_registry.get(self.base_url, endpoint).call(
+            request, self._is_failure, self._retry_exceptions(), retries=0
+        ) as response:
+            if response.status_code != 304:
+                response.raise_for_status()
+            yield response
+
+    def iter_content(self, endpoint, params=None, chunk_size=64 * 1024):
+        """Makes a streamed GET request to the API, yielding the response body in chunks of bytes"""
+        with self.stream(endpoint, params) as response:
+            yield from response.iter_content(chunk_size)
+
+
+class AsyncApiClient(ApiClient):
+    """Asynchronous API client class to make requests to a REST API without blocking the event loop"""
+    _clients = weakref.WeakKeyDictionary()
+
+    def __init__(self, base_url, username, password, api_key):
+        """Inits the AsyncApiClient with the API key, base URL and credentials"""
+        super().__init__(base_url, username, password, api_key)
+        self.auth = httpx.BasicAuth(username, password)
+
+    @classmethod
+    def get_client(cls):
+        """Returns the httpx client shared by the requests made on the running event loop
+
+        Connections are pooled per event loop, since an httpx client cannot be used from
+        another one, and the pool is sized like the one of ``ApiClient.get_session``.
+        """
+        loop = asyncio.get_running_loop()
+        client = cls._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(limits=httpx.Limits(
+                max_connections=settings.API_CLIENT_POOL_CONNECTIONS * settings.API_CLIENT_POOL_MAXSIZE,
+                max_keepalive_connections=settings.API_CLIENT_POOL_MAXSIZE,
+            ))
+            cls._clients[loop] = client
+        return client
+
+    @staticmethod
+    def _retry_exceptions():
+        """Returns the httpx errors that may be retried, read timeouts only with API_CLIENT_RETRY_TIMEOUTS"""
+        if settings.API_CLIENT_RETRY_TIMEOUTS:
+            return (httpx.TransportError,)
+        return (httpx.NetworkError, httpx.ConnectTimeout)
+
+    async def _request(self, url, budget):
+        """Makes one asynchronous GET request, lasting at most the budget left when there is one"""
+        connect_timeout, read_timeout = self._timeout(budget)
+        return await self.get_client().get(
+            url, auth=self.auth, timeout=httpx.Timeout(read_timeout, connect=connect_timeout)
+        )
+
+    async def get(self, endpoint, params=None):
+        """Makes an asynchronous GET request to the API, with the breaker, retries and hedging of ``ApiClient.get``"""
+        url = self._build_url(endpoint, params)
         try:
-            response = requests.get(url, auth=self.auth, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            with timing.timed('upstream'):
+                response = await upstream_registry.get(self.base_url, endpoint).acall(
+                    lambda budget: self._request(url, budget),
+                    self._is_failure,
+                    self._retry_exceptions(),
+                    hedge=settings.API_CLIENT_HEDGE,
+                )
+                response.raise_for_status()
+                return response.json()
+        except (httpx.HTTPError, UpstreamUnavailableError) as e:
             print(f"An error occurred: {e}")
             return None
 
@@ -0,0 +1,129 @@
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+
+
+def accept_encoding_qualities(header):
+    """Return the quality of each content coding of an ``Accept-Encoding`` header."""
+    qualities = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        try:
+            qualities[coding] = float(params.strip().removeprefix('q=')) if params else 1.0
+        except ValueError:
+            continue
+    return qualities
+
+
+def accepted_encodings(header):
+    """Return the content codings accepted by an ``Accept-Encoding`` header, leaving out the ``q=0`` ones."""
+    return {coding for coding, quality in accept_encoding_qualities(header).items() if quality > 0}
+
+
+class GzipCodec:
+    """gzip compression, always available."""
+    name = 'gzip'
+
+    def compress(self, data):
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+    def compressor(self):
+        return _ZlibStream(zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31))
+
+
+class _ZlibStream:
+    """Streaming gzip compressor flushing every chunk, so the client can decode what it received."""
+    def __init__(self, compressobj):
+        self._compressobj = compressobj
+
+    def compress(self, chunk):
+        return self._compressobj.compress(chunk) + self._compressobj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressobj.flush()
+
+
+class BrotliCodec:
+    """brotli compression, available when the ``brotli`` package is installed."""
+    name = 'br'
+
+    def compress(self, data):
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+
+    def compressor(self):
+        return _BrotliStream(brotli.Compressor(quality=BROTLI_QUALITY))
+
+
+class _BrotliStream:
+    """Streaming brotli compressor flushing every chunk."""
+    def __init__(self, compressor):
+        self._compressor = compressor
+
+    def compress(self, chunk):
+        return self._compressor.process(chunk) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class ZstdCodec:
+    """zstd compression, available when the ``zstandard`` package is installed."""
+    name = 'zstd'
+
+    def compress(self, data):
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+    def compressor(self):
+        return _ZstdStream(zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj())
+
+
+class _ZstdStream:
+    """Streaming zstd compressor flushing a block every chunk."""
+    def __init__(self, compressobj):
+        self._compressobj = compressobj
+
+    def compress(self, chunk):
+        return self._compressobj.compress(chunk) + self._compressobj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressobj.flush()
+
+
+# Installed codecs, in order of preference when the client accepts several with the same quality
+CODECS = {
+    codec.name: codec
+    for codec, available in (
+        (ZstdCodec(), zstandard is not None),
+        (BrotliCodec(), brotli is not None),
+        (GzipCodec(), True),
+    )
+    if available
+}
+
+
+def negotiate_codec(header, codecs=None):
+    """Return the installed codec with the highest quality in an ``Accept-Encoding`` header, or None."""
+    codecs = CODECS if codecs is None else codecs
+    qualities = accept_encoding_qualities(header)
+    best, best_quality = None, 0
+    for name, codec in codecs.items():
+        quality = qualities.get(name, qualities.get('*', 0))
+        if quality > best_quality:
+            best, best_quality = codec, quality
+    return best
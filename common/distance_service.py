@@ -0,0 +1,104 @@
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+from common.rounding import round_exact
+
+EARTH_RADIUS_KM = 6371
+
+
+class DistanceService:
+    """This class calculates haversine distances reusing work between calls.
+
+    The cosine of each point latitude is computed once, and pair distances are memoized
+    in a bounded LRU under a symmetric key, so A->B and B->A share an entry. The results
+    are the same as ``HaversineCalculator.calculate`` with the same decimal places.
+    """
+    def __init__(self, decimal_places=2, max_pairs=4096, max_points=4096):
+        self.decimal_places = decimal_places
+        self.max_pairs = max_pairs
+        self.max_points = max_points
+        self._points = OrderedDict()
+        self._pairs = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, cache, key, value, max_size):
+        """Store a value in a bounded LRU cache."""
+        cache[key] = value
+        cache.move_to_end(key)
+        if len(cache) > max_size:
+            cache.popitem(last=False)
+
+    def _latitude_cosine(self, lat):
+        """Return the cosine of the latitude, computed once per point."""
+        cosine = self._points.get(lat)
+        if cosine is None:
+            cosine = math.cos(math.radians(lat))
+            self._remember(self._points, lat, cosine, self.max_points)
+        return cosine
+
+    def _calculate(self, lat1, lon1, lat2, lon2):
+        """Calculate the distance with the haversine formula, in the same order of operations as HaversineCalculator."""
+        dlat = math.radians(lat2 - lat1)
+        dlon = math.radians(lon2 - lon1)
+        a = math.sin(dlat / 2) * math.sin(dlat / 2) + self._latitude_cosine(lat1) * self._latitude_cosine(lat2) * math.sin(dlon / 2) * math.sin(dlon / 2)
+        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+        distance = EARTH_RADIUS_KM * c
+        return round(distance, self.decimal_places)
+
+    def distance(self, lat1, lon1, lat2, lon2):
+        """Return the distance in km between two points, memoized for the pair."""
+        key = ((lat1, lon1), (lat2, lon2)) if (lat1, lon1) <= (lat2, lon2) else ((lat2, lon2), (lat1, lon1))
+
+        with self._lock:
+            distance = self._pairs.get(key)
+            if distance is not None:
+                self._pairs.move_to_end(key)
+                self.hits += 1
+                return distance
+
+            self.misses += 1
+            distance = self._calculate(*key[0], *key[1])
+            self._remember(self._pairs, key, distance, self.max_pairs)
+            return distance
+
+    def distance_matrix(self, latitudes, longitudes):
+        """Return the matrix of the distances in km between every pair of points in a single vectorized pass."""
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        cosines = np.cos(np.radians(latitudes))
+
+        dlat = np.radians(latitudes[np.newaxis, :] - latitudes[:, np.newaxis])
+        dlon = np.radians(longitudes[np.newaxis, :] - longitudes[:, np.newaxis])
+        sin_dlat = np.sin(dlat / 2)
+        sin_dlon = np.sin(dlon / 2)
+        a = sin_dlat * sin_dlat + np.outer(cosines, cosines) * sin_dlon * sin_dlon
+        c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+        return round_exact(EARTH_RADIUS_KM * c, self.decimal_places)
+
+    def airport_distance_matrix(self, airports):
+        """Return the IATA codes and the distance matrix of airports with ``iata``, ``latitude`` and ``longitude``.
+
+        Accepts ``Airport`` rows or the entries of the airport registry, e.g.
+        ``distance_service.airport_distance_matrix(airport_registry.airports.values())``.
+        """
+        airports = list(airports)
+        matrix = self.distance_matrix(
+            [float(airport.latitude) for airport in airports],
+            [float(airport.longitude) for airport in airports]
+        )
+        return [airport.iata for airport in airports], matrix
+
+    def stats(self):
+        """Return the memoized pairs and the hit and miss counters."""
+        with self._lock:
+            return {"pairs": len(self._pairs), "points": len(self._points), "hits": self.hits, "misses": self.misses}
+
+
+distance_service = DistanceService(max_pairs=settings.DISTANCE_CACHE_MAX_PAIRS, max_points=settings.DISTANCE_CACHE_MAX_POINTS)
@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class StdlibJSONBackend:
+    """Encode with the stdlib ``json`` module and ``DjangoJSONEncoder``, exactly as ``JsonResponse`` does."""
+    name = 'json'
+    item_separator = ', '
+    key_separator = ': '
+
+    def __init__(self):
+        self._encoder = DjangoJSONEncoder()
+
+    def dumps(self, data):
+        """Return the JSON bytes of the data."""
+        return self._encoder.encode(data).encode()
+
+
+class OrjsonJSONBackend:
+    """Encode with ``orjson``, which serializes dicts, lists, strings and numbers in C.
+
+    Datetimes, dates, times, Decimals and the other types orjson cannot render like Django
+    go through ``DjangoJSONEncoder.default``, so they get the same values (milliseconds,
+    ``Z`` for UTC, Decimals as strings). The output still differs from ``JsonResponse``:
+    it is compact (no space after ``,`` and ``:``), non-ASCII characters are written as
+    UTF-8 instead of ``\\u`` escapes, infinite and NaN floats become ``null`` and integers
+    beyond 64 bits raise ``TypeError``. It is therefore opt-in.
+    """
+    name = 'orjson'
+    item_separator = ','
+    key_separator = ':'
+    options = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
+
+    def __init__(self):
+        self._default = DjangoJSONEncoder().default
+
+    def dumps(self, data):
+        """Return the JSON bytes of the data, falling back to ``DjangoJSONEncoder`` for datetimes, Decimal and others."""
+        return orjson.dumps(data, default=self._default, option=self.options)
+
+
+_BACKENDS = {StdlibJSONBackend.name: StdlibJSONBackend, OrjsonJSONBackend.name: OrjsonJSONBackend}
+_instances = {}
+
+
+def get_json_backend(name=None):
+    """Return the JSON backend named by ``JSON_RESPONSE_BACKEND``, using ``json`` when orjson is not installed.
+
+    ``auto`` picks orjson when it is installed.
+    """
+    name = name or settings.JSON_RESPONSE_BACKEND
+    if name == 'auto':
+        name = OrjsonJSONBackend.name if orjson is not None else StdlibJSONBackend.name
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown JSON backend '{name}', expected one of: auto, {', '.join(_BACKENDS)}.")
+    if name == OrjsonJSONBackend.name and orjson is None:
+        name = StdlibJSONBackend.name
+
+    if name not in _instances:
+        _instances[name] = _BACKENDS[name]()
+    return _instances[name]
+
+
+class FastJsonResponse(HttpResponse):
+    """``JsonResponse`` encoding its data with the configured JSON backend."""
+    def __init__(self, data, safe=True, backend=None, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError(
+                "In order to allow non-dict objects to be serialized set the "
+                "safe parameter to False."
+            )
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=(backend or get_json_backend()).dumps(data), **kwargs)
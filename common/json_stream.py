@@ -0,0 +1,87 @@
+import codecs
+import json
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+
+class _ChunkReader:
+    """Text buffer fed from an iterator of byte chunks, dropping what was already parsed."""
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def read_more(self):
+        """Append the next chunk to the buffer, returning False when the input is exhausted."""
+        if self.eof:
+            return False
+        self.buffer = self.buffer[self.pos:]
+        self.pos = 0
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self.buffer += self._decoder.decode(b'', final=True)
+            self.eof = True
+            return False
+        self.buffer += self._decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        return True
+
+    def next_char(self):
+        """Skip whitespace and return the next character without consuming it, or None at the end."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.read_more():
+                return None
+
+    def expect(self, characters):
+        """Consume the next character, which must be one of ``characters``."""
+        char = self.next_char()
+        if char is None or char not in characters:
+            raise ValueError(f"Expected one of {characters!r} at position {self.pos}, got {char!r}.")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode the next JSON value, reading more chunks until it is complete."""
+        self.next_char()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+                # A value touching the end of the buffer may still continue (e.g. a number).
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.read_more()
+
+
+def iter_json_object_items(chunks):
+    """Yield the (key, value) pairs of a top level JSON object while it is being read.
+
+    ``chunks`` is an iterator of bytes (or str) pieces of the document, such as
+    ``requests.Response.iter_content()``. Only the pair being decoded and the unread part
+    of the current chunk are kept in memory.
+    """
+    reader = _ChunkReader(chunks)
+    reader.expect('{')
+
+    if reader.next_char() == '}':
+        reader.pos += 1
+        return
+
+    while True:
+        key = reader.value()
+        if not isinstance(key, str):
+            raise ValueError(f"Expected an object key, got {key!r}.")
+        reader.expect(':')
+        yield key, reader.value()
+        if reader.expect(',}') == '}':
+            return
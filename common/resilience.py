@@ -0,0 +1,463 @@
+import asyncio
+import contextvars
+import math
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+_deadline = ContextVar('upstream_deadline', default=None)
+
+
+class UpstreamUnavailableError(Exception):
+    """Raised when an upstream request is not attempted at all."""
+
+
+class CircuitOpenError(UpstreamUnavailableError):
+    """Raised when the circuit breaker of an upstream endpoint rejects a request."""
+    def __init__(self, name):
+        super().__init__(f"The circuit breaker of {name} is open.")
+
+
+class DeadlineExceededError(UpstreamUnavailableError):
+    """Raised when the deadline of the incoming request leaves no time for an upstream request."""
+    def __init__(self, name):
+        super().__init__(f"No time left in the request deadline to call {name}.")
+
+
+@contextmanager
+def deadline(seconds):
+    """Give the upstream requests of the block ``seconds`` in total, or no deadline when None.
+
+    A deadline already set by an outer block is only ever shortened. Threads started with a
+    copy of the context, such as the legs fetched concurrently, share the same deadline.
+    """
+    current = _deadline.get()
+    expires_at = current if seconds is None else time.monotonic() + seconds
+    if current is not None and expires_at is not None:
+        expires_at = min(current, expires_at)
+    token = _deadline.set(expires_at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_budget():
+    """Return the seconds left before the deadline of the current context, or None without one."""
+    expires_at = _deadline.get()
+    return None if expires_at is None else max(expires_at - time.monotonic(), 0.0)
+
+
+def backoff_delay(retry, base, cap):
+    """Return the full jitter backoff before the ``retry``-th retry: uniform up to ``base * 2 ** (retry - 1)``."""
+    return random.uniform(0, min(cap, base * 2 ** (retry - 1)))
+
+
+class CircuitBreaker:
+    """Circuit breaker opening after ``failure_threshold`` consecutive failures.
+
+    While open, requests are rejected right away. Once ``recovery_timeout`` seconds have
+    passed it becomes half-open and lets a single probe through: a success closes it and a
+    failure opens it again. A cancelled probe gives its slot back without counting as a
+    failure, and a probe that never reports back loses its slot after another
+    ``recovery_timeout`` seconds, so the breaker cannot stay half-open forever.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold, recovery_timeout):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_started_at = 0.0
+        self._trips = 0
+        self._rejected = 0
+
+    @property
+    def state(self):
+        """Return the state, reporting an open breaker whose recovery timeout passed as half-open."""
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self):
+        """Return whether a request may be sent, taking the probe slot when half-open."""
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.recovery_timeout:
+                    self._rejected += 1
+                    return False
+                self._state = self.HALF_OPEN
+                self._probing = False
+
+            if self._state == self.HALF_OPEN:
+                now = time.monotonic()
+                if self._probing and now - self._probe_started_at < self.recovery_timeout:
+                    self._rejected += 1
+                    return False
+                self._probing = True
+                self._probe_started_at = now
+            return True
+
+    def record_success(self):
+        """Close the breaker after a successful request."""
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def release_probe(self):
+        """Give back the probe slot of a request that ended without an answer, such as a cancelled one."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        """Count a failed request, opening the breaker once the threshold is reached or a probe fails."""
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == self.HALF_OPEN or (self._state == self.CLOSED and self._failures >= self.failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trips += 1
+
+    def stats(self):
+        """Return the state, consecutive failures, trips and rejected requests of the breaker."""
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "trips": self._trips,
+                "rejected": self._rejected,
+            }
+
+
+class UpstreamEndpoint:
+    """Circuit breaker, retries with jittered backoff and hedging of the requests to one upstream endpoint.
+
+    ``attempt(budget)`` sends one request, lasting at most ``budget`` seconds when it is not
+    None, and returns its result. Results for which ``is_failure`` is true and the
+    ``retry_exceptions`` it raises count as failures, and are retried while the deadline of
+    the incoming request allows it. With hedging, a second request is sent when the first
+    one is slower than the recent p95 latency. In ``acall`` the first good result wins; in
+    ``call`` the first request runs on the calling thread and the hedge replaces it only
+    when it fails.
+    """
+    def __init__(self, name, failure_threshold, recovery_timeout, latency_window=200):
+        self.name = name
+        self.breaker = CircuitBreaker(failure_threshold, recovery_timeout)
+        self._latencies = deque(maxlen=latency_window)
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(('requests', 'retries', 'hedges', 'hedge_wins', 'deadline_exceeded'), 0)
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _observe(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def latency_percentile(self, percent):
+        """Return the nearest-rank percentile of the recent successful latencies, or None without enough of them."""
+        with self._lock:
+            ordered = sorted(self._latencies)
+        if len(ordered) < settings.API_CLIENT_HEDGE_MIN_SAMPLES:
+            return None
+        return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+    def hedge_delay(self):
+        """Return how long to wait for a request before hedging it."""
+        delay = self.latency_percentile(settings.API_CLIENT_HEDGE_PERCENTILE)
+        return settings.API_CLIENT_HEDGE_DEFAULT_DELAY if delay is None else delay
+
+    def _budget(self):
+        """Return the seconds an attempt may take before the deadline, or None without a deadline."""
+        remaining = remaining_budget()
+        if remaining is not None and remaining <= 0:
+            self._count('deadline_exceeded')
+            raise DeadlineExceededError(self.name)
+        return remaining
+
+    def _retry_delay(self, retry):
+        """Return the backoff before a retry, or None when it would not fit in the deadline."""
+        delay = backoff_delay(retry, settings.API_CLIENT_BACKOFF_BASE, settings.API_CLIENT_BACKOFF_MAX)
+        remaining = remaining_budget()
+        if remaining is not None and delay >= remaining:
+            self._count('deadline_exceeded')
+            return None
+        self._count('retries')
+        return delay
+
+    def _timed_attempt(self, attempt, budget, is_failure):
+        start_time = time.perf_counter()
+        result = attempt(budget)
+        if not is_failure(result):
+            self._observe(time.perf_counter() - start_time)
+        return result
+
+    def _deadline_exceeded(self):
+        """Count and raise a request that ran out of its deadline."""
+        self._count('deadline_exceeded')
+        return DeadlineExceededError(self.name)
+
+    def _delayed_hedge(self, attempt, is_failure, hedge_at, primary_done):
+        """Send the hedge at ``hedge_at`` unless the primary request finished or the deadline passed, returning None then."""
+        if primary_done.wait(max(hedge_at - time.monotonic(), 0)):
+            return None
+        budget = remaining_budget()
+        if budget is not None and budget <= 0:
+            return None
+        self._count('hedges')
+        return self._timed_attempt(attempt, budget, is_failure)
+
+    def _hedged_attempt(self, attempt, budget, is_failure):
+        """Send the request on the calling thread, and a hedge on the hedge pool when it is still running after the hedge delay.
+
+        A blocking request cannot be interrupted, so the hedge replaces the primary result only
+        when the primary fails, and is waited for within the deadline. A hedge still queued
+        behind a busy pool when the primary finishes is dropped.
+        """
+        primary_done = threading.Event()
+        hedge = _get_hedge_executor().submit(
+            contextvars.copy_context().run,
+            self._delayed_hedge, attempt, is_failure, time.monotonic() + self.hedge_delay(), primary_done
+        )
+        result, error = None, None
+        try:
+            result = self._timed_attempt(attempt, budget, is_failure)
+        except Exception as e:
+            error = e
+        finally:
+            primary_done.set()
+
+        if error is None and not is_failure(result):
+            hedge.cancel()
+            return result
+
+        hedge_result = None
+        if not hedge.cancel():
+            try:
+                hedge_result = hedge.result(timeout=remaining_budget())
+            except FuturesTimeoutError:
+                raise self._deadline_exceeded()
+            except Exception:
+                pass
+        if hedge_result is not None and not is_failure(hedge_result):
+            self._count('hedge_wins')
+            return hedge_result
+
+        if error is None:
+            return result
+        if hedge_result is not None:
+            return hedge_result
+        raise error
+
+    def call(self, attempt, is_failure, retry_exceptions, hedge=False, retries=None):
+        """Send a request through the breaker, retrying failures within the deadline, and return its result.
+
+        Failures are retried up to ``retries`` times (``API_CLIENT_MAX_RETRIES`` by default).
+        The last failed result is returned, or its exception raised, once the retries are
+        exhausted. ``CircuitOpenError`` and ``DeadlineExceededError`` are raised when no
+        request could be sent.
+        """
+        self._count('requests')
+        result, error = None, None
+        retries = settings.API_CLIENT_MAX_RETRIES if retries is None else retries
+        for retry in range(retries + 1):
+            if retry:
+                delay = self._retry_delay(retry)
+                if delay is None:
+                    break
+                time.sleep(delay)
+
+            budget = self._budget()
+            if not self.breaker.allow():
+                raise CircuitOpenError(self.name)
+            try:
+                if hedge:
+                    result = self._hedged_attempt(attempt, budget, is_failure)
+                else:
+                    result = self._timed_attempt(attempt, budget, is_failure)
+            except retry_exceptions as e:
+                self.breaker.record_failure()
+                result, error = None, e
+                continue
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            except BaseException:
+                self.breaker.release_probe()
+                raise
+
+            if not is_failure(result):
+                self.breaker.record_success()
+                return result
+            self.breaker.record_failure()
+
+        if result is not None:
+            return result
+        raise error or DeadlineExceededError(self.name)
+
+    async def _atimed_attempt(self, attempt, budget, is_failure):
+        start_time = time.perf_counter()
+        result = await attempt(budget)
+        if not is_failure(result):
+            self._observe(time.perf_counter() - start_time)
+        return result
+
+    async def _ahedged_attempt(self, attempt, budget, is_failure):
+        """Asynchronous version of ``_hedged_attempt`` where the first good result wins and the slower request is cancelled."""
+        primary = asyncio.ensure_future(self._atimed_attempt(attempt, budget, is_failure))
+        pending = {primary}
+        fallback, error = None, None
+        try:
+            remaining = remaining_budget()
+            hedge_delay = self.hedge_delay() if remaining is None else min(self.hedge_delay(), remaining)
+            done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+            hedge_budget = remaining_budget()
+            if not done and (hedge_budget is None or hedge_budget > 0):
+                self._count('hedges')
+                pending.add(asyncio.ensure_future(self._atimed_attempt(attempt, hedge_budget, is_failure)))
+
+            while True:
+                for task in done:
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                        continue
+                    result = task.result()
+                    if not is_failure(result):
+                        if task is not primary:
+                            self._count('hedge_wins')
+                        return result
+                    fallback = result
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining_budget(), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise self._deadline_exceeded()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if fallback is not None:
+            return fallback
+        raise error
+
+    async def acall(self, attempt, is_failure, retry_exceptions, hedge=False, retries=None):
+        """Asynchronous version of ``call`` where ``attempt(budget)`` returns an awaitable."""
+        self._count('requests')
+        result, error = None, None
+        retries = settings.API_CLIENT_MAX_RETRIES if retries is None else retries
+        for retry in range(retries + 1):
+            if retry:
+                delay = self._retry_delay(retry)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+
+            budget = self._budget()
+            if not self.breaker.allow():
+                raise CircuitOpenError(self.name)
+            try:
+                if hedge:
+                    result = await self._ahedged_attempt(attempt, budget, is_failure)
+                else:
+                    result = await self._atimed_attempt(attempt, budget, is_failure)
+            except retry_exceptions as e:
+                self.breaker.record_failure()
+                result, error = None, e
+                continue
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            except BaseException:
+                self.breaker.release_probe()
+                raise
+
+            if not is_failure(result):
+                self.breaker.record_success()
+                return result
+            self.breaker.record_failure()
+
+        if result is not None:
+            return result
+        raise error or DeadlineExceededError(self.name)
+
+    def stats(self):
+        """Return the breaker state and the request, retry and hedge counts of the endpoint."""
+        p95 = self.latency_percentile(95)
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            "breaker": self.breaker.stats(),
+            **counters,
+            "p95_ms": None if p95 is None else round(p95 * 1000, 3),
+        }
+
+
+class UpstreamRegistry:
+    """Process-wide ``UpstreamEndpoint`` per base URL and endpoint, so every client shares their state."""
+    def __init__(self):
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def get(self, base_url, endpoint):
+        """Return the state of an upstream endpoint, creating it on first use."""
+        name = f"{base_url}/{endpoint}"
+        upstream = self._endpoints.get(name)
+        if upstream is None:
+            with self._lock:
+                upstream = self._endpoints.get(name)
+                if upstream is None:
+                    upstream = self._endpoints[name] = UpstreamEndpoint(
+                        name,
+                        settings.API_CLIENT_BREAKER_FAILURE_THRESHOLD,
+                        settings.API_CLIENT_BREAKER_RECOVERY_TIMEOUT,
+                    )
+        return upstream
+
+    def stats(self):
+        """Return the stats of every upstream endpoint used by this process."""
+        with self._lock:
+            endpoints = dict(self._endpoints)
+        return {name: upstream.stats() for name, upstream in endpoints.items()}
+
+    def clear(self):
+        """Forget the state of every endpoint."""
+        with self._lock:
+            self._endpoints.clear()
+
+
+upstream_registry = UpstreamRegistry()
+
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+
+
+def _get_hedge_executor():
+    """Return the thread pool running hedged requests, sized like the connection pool."""
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _hedge_executor_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(
+                    max_workers=settings.API_CLIENT_POOL_MAXSIZE, thread_name_prefix='upstream-hedge'
+                )
+    return _hedge_executor
@@ -0,0 +1,20 @@
+import numpy as np
+
+
+def round_exact(values, decimal_places):
+    """Round an array exactly like the builtin ``round`` does for each float.
+
+    ``numpy.round`` scales the values before rounding, which can flip the result of a
+    value lying on a rounding boundary. Values whose scaled fraction is too close to one
+    half to be trusted are rounded again with the builtin.
+    """
+    scale = 10.0 ** decimal_places
+    scaled = values * scale
+    rounded = np.round(scaled) / scale
+
+    distance_to_half = np.abs(scaled - np.floor(scaled) - 0.5)
+    tolerance = np.abs(scaled) * 1e-12 + 1e-9
+    for index in np.flatnonzero(distance_to_half <= tolerance):
+        rounded.flat[index] = round(float(values.flat[index]), decimal_places)
+
+    return rounded
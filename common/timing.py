@@ -0,0 +1,81 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+_phases = ContextVar('timing_phases', default=None)
+_lock = threading.Lock()
+
+
+def start():
+    """Start collecting phase durations in the current context, returning the token to pass to ``stop``."""
+    return _phases.set({})
+
+
+def stop(token):
+    """Stop collecting phase durations, returning them as ``{phase: (total_seconds, count)}``."""
+    phases = _phases.get()
+    _phases.reset(token)
+    with _lock:
+        return {phase: tuple(values) for phase, values in (phases or {}).items()}
+
+
+def record(phase, seconds):
+    """Add the duration of a phase to the collection of the current context, if any.
+
+    The collection is shared by the threads and tasks started with a copy of the context,
+    such as the legs fetched concurrently by the airline manager.
+    """
+    phases = _phases.get()
+    if phases is None:
+        return
+    with _lock:
+        values = phases.setdefault(phase, [0.0, 0])
+        values[0] += seconds
+        values[1] += 1
+
+
+@contextmanager
+def timed(phase):
+    """Record how long the block takes as ``phase``."""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(phase, time.perf_counter() - start_time)
+
+
+@contextmanager
+def collect():
+    """Collect the phase durations of the block, exposing them on the yielded dict once it finishes."""
+    token = start()
+    phases = {}
+    try:
+        yield phases
+    finally:
+        phases.update(stop(token))
+
+
+def db_execute_wrapper(execute, sql, params, many, context):
+    """Database execute wrapper recording the duration of each query as the ``db`` phase."""
+    with timed('db'):
+        return execute(sql, params, many, context)
+
+
+def phases_to_ms(phases):
+    """Return the phase durations in milliseconds, rounded for reporting."""
+    return {phase: round(seconds * 1000, 3) for phase, (seconds, count) in phases.items()}
+
+
+def log_timing(event, duration, phases, **fields):
+    """Emit a structured (JSON) log line with the total and per-phase durations of an event."""
+    logger.info(json.dumps({
+        "event": event,
+        **fields,
+        "duration_ms": round(duration * 1000, 3),
+        "phases_ms": phases_to_ms(phases),
+    }, default=str))
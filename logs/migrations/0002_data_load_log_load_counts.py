@@ -0,0 +1,33 @@
+# Generated by Django 5.1.5 on 2026-10-18 12:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataloadlog',
+            name='n_deleted',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dataloadlog',
+            name='n_inserted',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dataloadlog',
+            name='n_unchanged',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dataloadlog',
+            name='n_updated',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
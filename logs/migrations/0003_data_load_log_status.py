@@ -0,0 +1,26 @@
+# Generated by Django 5.1.5 on 2026-10-18 12:38
+
+from django.db import migrations, models
+
+
+def backfill_status(apps, schema_editor):
+    """Derive the status of the existing logs from their success flag."""
+    DataLoadLog = apps.get_model('logs', 'DataLoadLog')
+    DataLoadLog.objects.filter(success=True).update(status='success')
+    DataLoadLog.objects.exclude(success=True).update(status='failed')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0002_data_load_log_load_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataloadlog',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('success', 'Success'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.RunPython(backfill_status, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:20
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fail_older_unfinished_logs(apps, schema_editor):
+    """Fail every unfinished log but the newest of each model, so the constraint can be created."""
+    DataLoadLog = apps.get_model('logs', 'DataLoadLog')
+    unfinished = DataLoadLog.objects.filter(status__in=['pending', 'running'])
+    for model in unfinished.values_list('model', flat=True).distinct():
+        newest = unfinished.filter(model=model).order_by('-started_at', '-id').first()
+        unfinished.filter(model=model).exclude(pk=newest.pk).update(
+            status='failed', success=False, message='The ETL process was abandoned.', finished_at=timezone.now()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0004_data_load_log_conditional_fetch'),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_older_unfinished_logs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='dataloadlog',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'running'])), fields=('model',), name='data_load_logs_one_unfinished_per_model'),
+        ),
+    ]
@@ -1,13 +1,43 @@
 from django.db import models
 
 class DataLoadLog(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCESS = 'success'
+    FAILED = 'failed'
+    SKIPPED = 'skipped'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (SUCCESS, 'Success'),
+        (FAILED, 'Failed'),
+        (SKIPPED, 'Skipped, unchanged'),
+    ]
+    FINISHED_STATUSES = (SUCCESS, FAILED, SKIPPED)
+    UNFINISHED_STATUSES = (PENDING, RUNNING)
+
     model = models.CharField(max_length=100, null=False, blank=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
     success = models.BooleanField(null=True, blank=True)
     message = models.TextField(max_length=255, null=True, blank=True)
     started_at = models.DateTimeField(auto_now_add=True)
     finished_at = models.DateTimeField(auto_now=True)
     n_records = models.IntegerField(null=True, blank=True)
+    n_inserted = models.IntegerField(null=True, blank=True)
+    n_updated = models.IntegerField(null=True, blank=True)
+    n_deleted = models.IntegerField(null=True, blank=True)
+    n_unchanged = models.IntegerField(null=True, blank=True)
+    etag = models.CharField(max_length=255, null=True, blank=True)
+    last_modified = models.CharField(max_length=64, null=True, blank=True)
+    content_hash = models.CharField(max_length=64, null=True, blank=True)
 
     class Meta:
         db_table = 'data_load_logs'
-        ordering = ['-started_at']
\ No newline at end of file
+        ordering = ['-started_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['model'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='data_load_logs_one_unfinished_per_model',
+            ),
+        ]
\ No newline at end of file
@@ -1,24 +1,42 @@
+from asgiref.sync import iscoroutinefunction
 from django.http import JsonResponse
 from functools import wraps
-from setup.utils.jwt_utils import JWTUtils  
+from setup.utils.token_cache import verified_token_cache
+
+def _authenticate(request):
+    """Validate the request token, returning an error response when it is not valid."""
+    token = request.headers.get('Authorization')
+
+    if not token:
+        return JsonResponse({"error": "Authorization token is required"}, status=401)
+
+    try:
+        token = token.split(' ')[1] if token.startswith('Bearer ') else token
+
+        decoded_data = verified_token_cache.decode(token)
+
+        request.user_data = decoded_data
+        return None
+
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=401)
 
 def jwt_required(view_func):
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _wrapped_async_view(self, request, *args, **kwargs):
+            error_response = _authenticate(request)
+            if error_response:
+                return error_response
+            return await view_func(self, request, *args, **kwargs)
+
+        return _wrapped_async_view
+
     @wraps(view_func)
     def _wrapped_view(self, request, *args, **kwargs):
-        token = request.headers.get('Authorization')
-        
-        if not token:
-            return JsonResponse({"error": "Authorization token is required"}, status=401)
-        
-        try:
-            token = token.split(' ')[1] if token.startswith('Bearer ') else token
-            
-            decoded_data = JWTUtils.decode(token)
-            
-            request.user_data = decoded_data
-            return view_func(self,request, *args, **kwargs)
-        
-        except ValueError as e:
-            return JsonResponse({"error": str(e)}, status=401)
-    
+        error_response = _authenticate(request)
+        if error_response:
+            return error_response
+        return view_func(self,request, *args, **kwargs)
+
     return _wrapped_view
@@ -0,0 +1,72 @@
+import threading
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    """Cumulative latency histogram of a route, with the total time spent per phase."""
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+        self.statuses = {}
+        self.phases = {}
+
+    def observe(self, duration_ms, status, phases_ms):
+        """Add a request to the histogram."""
+        index = next((i for i, bound in enumerate(self.buckets) if duration_ms <= bound), len(self.buckets))
+        self.bucket_counts[index] += 1
+        self.count += 1
+        self.sum_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+        for phase, phase_ms in phases_ms.items():
+            self.phases[phase] = self.phases.get(phase, 0.0) + phase_ms
+
+    def snapshot(self):
+        """Return the histogram with cumulative bucket counts, Prometheus style."""
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip((*map(str, self.buckets), '+Inf'), self.bucket_counts):
+            cumulative += count
+            buckets[bound] = cumulative
+
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum_ms, 3),
+            "mean_ms": round(self.sum_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "buckets_ms": buckets,
+            "statuses": dict(self.statuses),
+            "phases_sum_ms": {phase: round(total, 3) for phase, total in self.phases.items()},
+        }
+
+
+class RequestMetrics:
+    """Process-local latency histograms keyed by HTTP method and route pattern."""
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, method, route, duration_ms, status, phases_ms):
+        """Add a request to the histogram of its route."""
+        with self._lock:
+            histogram = self._histograms.get((method, route))
+            if histogram is None:
+                histogram = self._histograms[(method, route)] = LatencyHistogram()
+            histogram.observe(duration_ms, status, phases_ms)
+
+    def snapshot(self):
+        """Return the histograms as ``{"<METHOD> <route>": histogram}``."""
+        with self._lock:
+            return {f"{method} {route}": histogram.snapshot() for (method, route), histogram in sorted(self._histograms.items())}
+
+    def clear(self):
+        """Drop every histogram."""
+        with self._lock:
+            self._histograms.clear()
+
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,3 @@
+from .compression_middleware import CompressionMiddleware
+from .deadline_middleware import RequestDeadlineMiddleware
+from .timing_middleware import RequestTimingMiddleware
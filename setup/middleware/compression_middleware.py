@@ -0,0 +1,92 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from common import timing
+from common.content_encoding import negotiate_codec
+
+COMPRESSIBLE_CONTENT_TYPES = ('application/json', 'application/x-ndjson', 'text/')
+
+
+class CompressionMiddleware:
+    """Compress responses with the best coding accepted by the client: zstd, brotli or gzip.
+
+    zstd and brotli are used when the ``zstandard`` and ``brotli`` packages are installed.
+    Only JSON and text responses of at least ``COMPRESSION_MIN_SIZE`` bytes are compressed,
+    and responses that already carry a ``Content-Encoding`` (such as the pre-compressed
+    airport snapshot) are left alone. Streamed bodies are compressed chunk by chunk and
+    flushed after each one, so the client keeps receiving them progressively.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def _is_compressible(self, response):
+        """Return whether the response is a body that compression could shrink."""
+        if response.has_header('Content-Encoding') or not 200 <= response.status_code < 300 or response.status_code == 204:
+            return False
+        content_type = response.get('Content-Type', '').lower()
+        return content_type.startswith(COMPRESSIBLE_CONTENT_TYPES)
+
+    def process_response(self, request, response):
+        if not self._is_compressible(response):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codec = negotiate_codec(request.headers.get('Accept-Encoding', ''))
+        if codec is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self._acompress_stream(codec, response.streaming_content)
+            else:
+                response.streaming_content = self._compress_stream(codec, response.streaming_content)
+            del response['Content-Length']
+        else:
+            with timing.timed('compress'):
+                compressed = codec.compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # The compressed bytes differ from the identity ones, so a strong ETag becomes weak.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = codec.name
+        return response
+
+    def _compress_stream(self, codec, chunks):
+        """Yield the compressed chunks of a streamed body."""
+        compressor = codec.compressor()
+        for chunk in chunks:
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.finish()
+
+    async def _acompress_stream(self, codec, chunks):
+        """Yield the compressed chunks of an asynchronously streamed body."""
+        compressor = codec.compressor()
+        async for chunk in chunks:
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.finish()
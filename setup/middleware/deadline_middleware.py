@@ -0,0 +1,43 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from common.resilience import deadline
+
+
+class RequestDeadlineMiddleware:
+    """Give the upstream API calls of each request a shared time budget.
+
+    The budget is ``REQUEST_DEADLINE`` seconds, lowered by an ``X-Request-Timeout`` header
+    (in seconds) when the caller has less time left. Upstream retries, backoff and timeouts
+    are cut down to what remains of it, so a degraded upstream fails the request within the
+    budget instead of after every timeout.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def _budget(self, request):
+        """Return the seconds of the request budget, or None when it has none."""
+        budgets = [settings.REQUEST_DEADLINE] if settings.REQUEST_DEADLINE > 0 else []
+        try:
+            timeout = float(request.headers.get('X-Request-Timeout', ''))
+            if timeout > 0:
+                budgets.append(timeout)
+        except ValueError:
+            pass
+        return min(budgets, default=None)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with deadline(self._budget(request)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with deadline(self._budget(request)):
+            return await self.get_response(request)
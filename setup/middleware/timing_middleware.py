@@ -0,0 +1,81 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from common import timing
+from setup.metrics import request_metrics
+
+
+def _install_db_wrapper(connection, **kwargs):
+    """Time the queries of a database connection, in whatever thread it is used."""
+    if timing.db_execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(timing.db_execute_wrapper)
+
+
+class RequestTimingMiddleware:
+    """Time each request and break it down into the phases recorded by ``common.timing``.
+
+    The upstream API calls, database queries, pricing, combination and encoding phases are
+    returned in a ``Server-Timing`` header, written as a structured log line and added to
+    the per route latency histograms served by ``/api/metrics/``. Streamed bodies are sent
+    after the middleware returns, so only the time to the first byte is measured for them.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+        connection_created.connect(_install_db_wrapper, dispatch_uid='request_timing_db_wrapper')
+        for connection in connections.all(initialized_only=True):
+            _install_db_wrapper(connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        token = timing.start()
+        start_time = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            phases = timing.stop(token)
+        return self._finish(request, response, time.perf_counter() - start_time, phases)
+
+    async def __acall__(self, request):
+        token = timing.start()
+        start_time = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            phases = timing.stop(token)
+        return self._finish(request, response, time.perf_counter() - start_time, phases)
+
+    def _route(self, request):
+        """Return the route pattern of the request, so metrics are not keyed by its parameters."""
+        match = getattr(request, 'resolver_match', None)
+        return match.route if match is not None else 'unmatched'
+
+    def _finish(self, request, response, duration, phases):
+        """Report the timings of a request and add them to its response."""
+        phases_ms = timing.phases_to_ms(phases)
+        duration_ms = round(duration * 1000, 3)
+        route = self._route(request)
+
+        response['Server-Timing'] = ', '.join(
+            [f"{phase};dur={phase_ms}" for phase, phase_ms in phases_ms.items()] + [f"total;dur={duration_ms}"]
+        )
+        request_metrics.observe(request.method, route, duration_ms, response.status_code, phases_ms)
+        timing.log_timing(
+            'request', duration, phases,
+            method=request.method,
+            route=route,
+            path=request.path,
+            status=response.status_code,
+        )
+        return response
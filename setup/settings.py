@@ -35,6 +35,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'setup.middleware.RequestTimingMiddleware',
+    'setup.middleware.CompressionMiddleware',
+    'setup.middleware.RequestDeadlineMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -115,6 +118,9 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# Test runner silencing the timing log lines of the requests made by the tests
+TEST_RUNNER = 'setup.test_runner.QuietTimingTestRunner'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -126,5 +132,115 @@ STUP_AMOPROMO_API_KEY = env('STUP_AMOPROMO_API_KEY')
 STUB_AMOPROMO_USERNAME = env('STUB_AMOPROMO_USERNAME')
 STUB_AMOPROMO_PASSWORD = env('STUB_AMOPROMO_PASSWORD')
 
+# API client connection pool and timeouts (seconds)
+API_CLIENT_POOL_CONNECTIONS = env.int('API_CLIENT_POOL_CONNECTIONS', default=10)
+API_CLIENT_POOL_MAXSIZE = env.int('API_CLIENT_POOL_MAXSIZE', default=20)
+API_CLIENT_CONNECT_TIMEOUT = env.float('API_CLIENT_CONNECT_TIMEOUT', default=3.05)
+API_CLIENT_READ_TIMEOUT = env.float('API_CLIENT_READ_TIMEOUT', default=10)
+# Retries of failed upstream requests, with full jitter backoff between base * 2 ** n and the max (seconds)
+API_CLIENT_MAX_RETRIES = env.int('API_CLIENT_MAX_RETRIES', default=2)
+API_CLIENT_BACKOFF_BASE = env.float('API_CLIENT_BACKOFF_BASE', default=0.1)
+API_CLIENT_BACKOFF_MAX = env.float('API_CLIENT_BACKOFF_MAX', default=2)
+# Whether read timeouts are retried too, which can hold a request for several read timeouts
+API_CLIENT_RETRY_TIMEOUTS = env.bool('API_CLIENT_RETRY_TIMEOUTS', default=False)
+# Circuit breaker per upstream endpoint: consecutive failures that open it, seconds before a half-open probe
+API_CLIENT_BREAKER_FAILURE_THRESHOLD = env.int('API_CLIENT_BREAKER_FAILURE_THRESHOLD', default=5)
+API_CLIENT_BREAKER_RECOVERY_TIMEOUT = env.float('API_CLIENT_BREAKER_RECOVERY_TIMEOUT', default=30)
+# Hedged requests: a second request is sent once the first is slower than the percentile of the
+# recent latencies, or than the default delay until MIN_SAMPLES requests succeeded
+API_CLIENT_HEDGE = env.bool('API_CLIENT_HEDGE', default=False)
+API_CLIENT_HEDGE_PERCENTILE = env.float('API_CLIENT_HEDGE_PERCENTILE', default=95)
+API_CLIENT_HEDGE_MIN_SAMPLES = env.int('API_CLIENT_HEDGE_MIN_SAMPLES', default=20)
+API_CLIENT_HEDGE_DEFAULT_DELAY = env.float('API_CLIENT_HEDGE_DEFAULT_DELAY', default=1)
+# Seconds each incoming request may spend on upstream calls, lowered by its X-Request-Timeout header (0 disables it)
+REQUEST_DEADLINE = env.float('REQUEST_DEADLINE', default=API_CLIENT_READ_TIMEOUT)
+
+# Structured request and ETL timing log lines (set TIMING_LOG_LEVEL=WARNING to silence them)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'common.timing': {
+            'handlers': ['console'],
+            'level': env('TIMING_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Smallest response body, in bytes, compressed by the compression middleware
+COMPRESSION_MIN_SIZE = env.int('COMPRESSION_MIN_SIZE', default=1024)
+
+# JSON encoder of the combinator and airport responses: json (the exact bytes of JsonResponse), orjson (faster,
+# opt-in, compact output) or auto (orjson when installed)
+JSON_RESPONSE_BACKEND = env('JSON_RESPONSE_BACKEND', default='json')
+
+# Verified JWT tokens kept in memory to skip verifying them again (0 disables it)
+JWT_TOKEN_CACHE_MAX_ENTRIES = env.int('JWT_TOKEN_CACHE_MAX_ENTRIES', default=10000)
+
+# Airports ETL settings
+AIRPORT_ETL_BATCH_SIZE = env.int('AIRPORT_ETL_BATCH_SIZE', default=500)
+# Seconds after which an unfinished run (e.g. of a killed process) is failed so it no longer blocks a new one
+AIRPORT_ETL_STALE_AFTER = env.int('AIRPORT_ETL_STALE_AFTER', default=3600)
+
+# Seconds after which each process rebuilds its in-memory airport index (0 disables it)
+AIRPORT_REGISTRY_TTL = env.int('AIRPORT_REGISTRY_TTL', default=300)
+
+# Cache holding the token of the last airport edit, part of the airport data version and ETags
+AIRPORT_VERSION_CACHE_ALIAS = 'airport_version'
+
+# Directory keeping a copy of the pre-rendered airport list between restarts (empty disables it)
+AIRPORT_SNAPSHOT_DIR = env('AIRPORT_SNAPSHOT_DIR', default='')
+
+# Bounded memo of haversine distances
+DISTANCE_CACHE_MAX_PAIRS = env.int('DISTANCE_CACHE_MAX_PAIRS', default=4096)
+DISTANCE_CACHE_MAX_POINTS = env.int('DISTANCE_CACHE_MAX_POINTS', default=4096)
+
+# Airline search settings
+AIRLINE_SEARCH_MAX_WORKERS = env.int('AIRLINE_SEARCH_MAX_WORKERS', default=2)
+AIRLINE_BATCH_PRICING_MIN_OPTIONS = env.int('AIRLINE_BATCH_PRICING_MIN_OPTIONS', default=32)
+AIRLINE_SEARCH_CACHE_ALIAS = 'airline_search'
+AIRLINE_SEARCH_CACHE_TIMEOUT = env.int('AIRLINE_SEARCH_CACHE_TIMEOUT', default=300)
+AIRLINE_SEARCH_CACHE_MAX_ENTRIES = env.int('AIRLINE_SEARCH_CACHE_MAX_ENTRIES', default=1000)
+# Flexible dates search: widest +/- window in days and concurrent leg fetches
+AIRLINE_FLEXIBLE_MAX_DAYS = env.int('AIRLINE_FLEXIBLE_MAX_DAYS', default=3)
+AIRLINE_FLEXIBLE_MAX_WORKERS = env.int('AIRLINE_FLEXIBLE_MAX_WORKERS', default=4)
+# Batch search: most routes a batch may expand to and concurrent leg fetches
+AIRLINE_BATCH_MAX_ROUTES = env.int('AIRLINE_BATCH_MAX_ROUTES', default=50)
+AIRLINE_BATCH_MAX_WORKERS = env.int('AIRLINE_BATCH_MAX_WORKERS', default=4)
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/ref/settings/#caches
+# The airline search cache defaults to locmem; set AIRLINE_SEARCH_CACHE_BACKEND to
+# django.core.cache.backends.filebased.FileBasedCache or db.DatabaseCache (with
+# AIRLINE_SEARCH_CACHE_LOCATION as the directory or table) to share it between workers.
+# The same goes for AIRPORT_VERSION_CACHE_BACKEND, so airport edits reach the snapshots of every worker.
+# CULL_FREQUENCY equal to MAX_ENTRIES makes locmem evict a single least recently used entry.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    AIRLINE_SEARCH_CACHE_ALIAS: {
+        'BACKEND': env('AIRLINE_SEARCH_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': env('AIRLINE_SEARCH_CACHE_LOCATION', default='airline-search'),
+        'TIMEOUT': AIRLINE_SEARCH_CACHE_TIMEOUT,
+        'OPTIONS': {
+            'MAX_ENTRIES': AIRLINE_SEARCH_CACHE_MAX_ENTRIES,
+            'CULL_FREQUENCY': AIRLINE_SEARCH_CACHE_MAX_ENTRIES,
+        },
+    },
+    AIRPORT_VERSION_CACHE_ALIAS: {
+        'BACKEND': env('AIRPORT_VERSION_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': env('AIRPORT_VERSION_CACHE_LOCATION', default='airport-version'),
+        'TIMEOUT': None,
+    },
+}
+
 
 
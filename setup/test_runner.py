@@ -0,0 +1,11 @@
+import logging
+
+from django.test.runner import DiscoverRunner
+
+
+class QuietTimingTestRunner(DiscoverRunner):
+    """Test runner silencing the ``common.timing`` log lines written for every request of the tests."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        logging.getLogger('common.timing').setLevel(logging.WARNING)
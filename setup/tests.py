@@ -0,0 +1,205 @@
+import gzip
+import json
+import time
+import zlib
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+import jwt
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from common.content_encoding import GzipCodec, negotiate_codec
+from common.json_encoder import FastJsonResponse, get_json_backend, orjson
+from common.resilience import remaining_budget
+from setup.middleware import CompressionMiddleware, RequestDeadlineMiddleware
+from setup.metrics import LatencyHistogram, request_metrics
+from setup.utils.jwt_utils import JWTUtils
+from setup.utils.token_cache import VerifiedTokenCache
+
+
+class TestVerifiedTokenCache(SimpleTestCase):
+    def setUp(self):
+        self.cache = VerifiedTokenCache(max_entries=2)
+        self.token = JWTUtils.encode({'user_id': 1, 'username': 'amopromo'})
+
+    def test_repeated_tokens_are_verified_once(self):
+        with mock.patch.object(JWTUtils, 'decode', wraps=JWTUtils.decode) as decode:
+            payloads = [self.cache.decode(self.token) for _ in range(3)]
+
+        self.assertEqual(decode.call_count, 1)
+        self.assertEqual(payloads[0]['username'], 'amopromo')
+        self.assertEqual(payloads[0], payloads[2])
+        self.assertEqual((self.cache.stats()['hits'], self.cache.stats()['misses']), (2, 1))
+
+    def test_cached_token_is_rejected_once_expired(self):
+        payload = self.cache.decode(self.token)
+
+        with mock.patch('setup.utils.token_cache.time.time', return_value=payload['exp']), \
+                mock.patch.object(JWTUtils, 'decode', side_effect=ValueError('Token has expired')) as decode:
+            with self.assertRaisesMessage(ValueError, 'Token has expired'):
+                self.cache.decode(self.token)
+
+        decode.assert_called_once_with(self.token)
+        self.assertEqual(self.cache.stats()['expirations'], 1)
+
+    def test_invalid_tokens_are_rejected_and_not_cached(self):
+        forged = jwt.encode({'user_id': 1, 'exp': time.time() + 60}, 'another-secret', algorithm='HS256')
+
+        for _ in range(2):
+            with self.assertRaisesMessage(ValueError, 'Invalid token'):
+                self.cache.decode(forged)
+
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+    def test_least_recently_used_tokens_are_evicted(self):
+        tokens = [JWTUtils.encode({'user_id': user_id}) for user_id in range(3)]
+        for token in tokens:
+            self.cache.decode(token)
+
+        stats = self.cache.stats()
+        self.assertEqual((stats['size'], stats['evictions']), (2, 1))
+        self.assertEqual(stats['max_entries'], 2)
+        self.assertNotEqual(settings.JWT_TOKEN_CACHE_MAX_ENTRIES, 2)
+
+
+class TestRequestTiming(TestCase):
+    def setUp(self):
+        request_metrics.clear()
+        self.headers = {'Authorization': f"Bearer {JWTUtils.encode({'user_id': 1, 'username': 'amopromo'})}"}
+
+    def test_server_timing_breaks_down_the_request(self):
+        response = self.client.get('/api/airports/airport/', {'limit': 10}, headers=self.headers)
+
+        phases = dict(item.split(';dur=') for item in response['Server-Timing'].split(', '))
+        self.assertIn('db', phases)
+        self.assertGreaterEqual(float(phases['total']), float(phases['db']))
+
+    def test_metrics_endpoint_reports_histograms_per_route(self):
+        for _ in range(2):
+            self.client.get('/api/airports/airport/', {'limit': 10}, headers=self.headers)
+
+        metrics = self.client.get('/api/metrics/', headers=self.headers).json()
+
+        route = metrics['routes']['GET api/airports/airport/']
+        self.assertEqual(route['count'], 2)
+        self.assertEqual(route['buckets_ms']['+Inf'], 2)
+        self.assertEqual(route['statuses'], {'200': 2})
+        self.assertIn('db', route['phases_sum_ms'])
+        self.assertIn('verified_tokens', metrics['caches'])
+        self.assertIn('upstream', metrics)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = LatencyHistogram(buckets=(10, 100))
+        for duration_ms in (5, 50, 500):
+            histogram.observe(duration_ms, 200, {})
+
+        self.assertEqual(histogram.snapshot()['buckets_ms'], {'10': 1, '100': 2, '+Inf': 3})
+
+
+class TestJsonEncoder(SimpleTestCase):
+    data = {
+        'departure_time': datetime(2022, 6, 12, 20, 40),
+        'updated_at': datetime(2022, 6, 12, 20, 40, tzinfo=timezone.utc),
+        'loaded_at': datetime(2022, 6, 12, 20, 40, 1, 123456, tzinfo=timezone.utc),
+        'latitude': Decimal('-19.750000'),
+        'city': 'São Paulo',
+        'price': {'fare': 1234.56, 'fees': 123.46, 'total': 1358.02},
+        'options': [1, None, True],
+    }
+
+    def test_json_backend_renders_the_same_bytes_as_json_response(self):
+        with override_settings(JSON_RESPONSE_BACKEND='json'):
+            self.assertEqual(FastJsonResponse(self.data).content, JsonResponse(self.data).content)
+
+    @skipUnless(orjson, 'orjson is not installed')
+    def test_orjson_backend_renders_the_same_values(self):
+        content = get_json_backend('orjson').dumps(self.data)
+
+        self.assertEqual(json.loads(content), json.loads(JsonResponse(self.data).content))
+        self.assertIn(b'"updated_at":"2022-06-12T20:40:00Z"', content)
+        self.assertIn(b'"latitude":"-19.750000"', content)
+        self.assertIn(b'"loaded_at":"2022-06-12T20:40:01.123Z"', content)
+
+    def test_default_backend_keeps_the_json_response_bytes(self):
+        self.assertEqual(get_json_backend().name, 'json')
+
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(ValueError):
+            get_json_backend('simplejson')
+
+    def test_non_dict_data_requires_safe_false(self):
+        with self.assertRaises(TypeError):
+            FastJsonResponse([1, 2])
+        self.assertEqual(FastJsonResponse([1, 2], safe=False)['Content-Type'], 'application/json')
+
+
+@override_settings(COMPRESSION_MIN_SIZE=100)
+class TestCompressionMiddleware(SimpleTestCase):
+    body = json.dumps([{'iata': 'PLU', 'city': 'Belo Horizonte', 'state': 'MG'}] * 50).encode()
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def process(self, response, accept_encoding='gzip, deflate'):
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_json_responses_are_compressed_with_the_negotiated_coding(self):
+        response = HttpResponse(self.body, content_type='application/json')
+        response['ETag'] = '"v1"'
+
+        response = self.process(response)
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['ETag'], 'W/"v1"')
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertEqual(gzip.decompress(response.content), self.body)
+
+    def test_small_refused_and_encoded_responses_are_left_alone(self):
+        small = self.process(HttpResponse(b'{}', content_type='application/json'))
+        refused = self.process(HttpResponse(self.body, content_type='application/json'), 'gzip;q=0')
+        encoded = HttpResponse(gzip.compress(self.body), content_type='application/json')
+        encoded['Content-Encoding'] = 'gzip'
+
+        self.assertFalse(small.has_header('Content-Encoding'))
+        self.assertFalse(refused.has_header('Content-Encoding'))
+        self.assertEqual(refused.content, self.body)
+        self.assertEqual(self.process(encoded).content, encoded.content)
+
+    def test_streamed_bodies_are_compressed_chunk_by_chunk(self):
+        chunks = [self.body[index:index + 256] for index in range(0, len(self.body), 256)]
+        response = self.process(StreamingHttpResponse(iter(chunks), content_type='application/json'))
+
+        decompressor = zlib.decompressobj(31)
+        decoded = [decompressor.decompress(chunk) for chunk in response.streaming_content]
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(decoded[0], chunks[0])
+        self.assertEqual(b''.join(decoded), self.body)
+
+    def test_negotiation_follows_the_client_qualities(self):
+        self.assertIsInstance(negotiate_codec('br;q=0.2, gzip;q=0.8'), GzipCodec)
+        self.assertIsInstance(negotiate_codec('*'), type(negotiate_codec('zstd, br, gzip')))
+        self.assertIsNone(negotiate_codec('identity'))
+
+
+class TestRequestDeadlineMiddleware(SimpleTestCase):
+    def budget(self, **headers):
+        middleware = RequestDeadlineMiddleware(lambda request: remaining_budget())
+        return middleware(RequestFactory().get('/', **headers))
+
+    @override_settings(REQUEST_DEADLINE=5)
+    def test_header_can_only_lower_the_deadline(self):
+        self.assertTrue(4 < self.budget() <= 5)
+        self.assertTrue(0 < self.budget(HTTP_X_REQUEST_TIMEOUT='0.5') <= 0.5)
+        self.assertTrue(4 < self.budget(HTTP_X_REQUEST_TIMEOUT='60') <= 5)
+        self.assertTrue(4 < self.budget(HTTP_X_REQUEST_TIMEOUT='soon') <= 5)
+
+    @override_settings(REQUEST_DEADLINE=0)
+    def test_disabled_deadline_is_only_set_by_the_header(self):
+        self.assertIsNone(self.budget())
+        self.assertTrue(0 < self.budget(HTTP_X_REQUEST_TIMEOUT='2') <= 2)
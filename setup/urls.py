@@ -17,11 +17,13 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import include, path
 from setup.views.auth_view import TokenView
+from setup.views.metrics_view import MetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/airports/', include('airports.urls')),
     path('api/airlines/', include('airlines.urls')),
     path('api/token/', TokenView.as_view(), name='token_obtain_pair'),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
 ]
 
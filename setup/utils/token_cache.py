@@ -0,0 +1,98 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from setup.utils.jwt_utils import JWTUtils
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of verified JWT payloads, keyed by a SHA-256 digest of the secret and token.
+
+    A cached token is returned without verifying its signature again until its ``exp``
+    claim passes, after which it is dropped and verified (and rejected) as usual. Invalid
+    tokens are never cached.
+    """
+    def __init__(self, max_entries=None):
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    @property
+    def max_entries(self):
+        """Return how many tokens are kept, ``JWT_TOKEN_CACHE_MAX_ENTRIES`` unless given (0 disables the cache)."""
+        return settings.JWT_TOKEN_CACHE_MAX_ENTRIES if self._max_entries is None else self._max_entries
+
+    def _key(self, token):
+        """Return the digest under which a token is cached, without keeping the token itself."""
+        return hashlib.sha256(f"{settings.SECRET_KEY}:{token}".encode()).digest()
+
+    def _lookup(self, key):
+        """Return the cached payload of a key, or None when it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            payload, expires_at = entry
+            if expires_at is not None and time.time() >= expires_at:
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return payload
+
+    def _store(self, key, payload):
+        """Cache a verified payload, evicting the least recently used tokens over the bound."""
+        expires_at = payload.get('exp')
+        with self._lock:
+            self._entries[key] = (payload, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def decode(self, token):
+        """Return the payload of a token, verifying it only when it is not cached; raises ValueError like JWTUtils.decode."""
+        if not self.max_entries:
+            return JWTUtils.decode(token)
+
+        key = self._key(token)
+        payload = self._lookup(key)
+        if payload is None:
+            payload = JWTUtils.decode(token)
+            self._store(key, payload)
+        return dict(payload)
+
+    def stats(self):
+        """Return the hit and miss counters of the cache."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        """Drop every cached token and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._evictions = self._expirations = 0
+
+
+verified_token_cache = VerifiedTokenCache()
@@ -0,0 +1,27 @@
+from django.http import JsonResponse
+from django.views import View
+
+from airlines.search_cache import airline_search_cache
+from common.api_client import ApiClient
+from common.distance_service import distance_service
+from common.resilience import upstream_registry
+from setup.decorators.jwt_decorator import jwt_required
+from setup.metrics import request_metrics
+from setup.utils.token_cache import verified_token_cache
+
+
+class MetricsView(View):
+    """API view exposing the latency histograms per route and the cache, connection and upstream breaker stats of this process."""
+    @jwt_required
+    def get(self, request, *args, **kwargs):
+        """Handle GET requests returning the metrics collected since the process started."""
+        return JsonResponse({
+            "routes": request_metrics.snapshot(),
+            "caches": {
+                "airline_search": airline_search_cache.stats(),
+                "distances": distance_service.stats(),
+                "verified_tokens": verified_token_cache.stats(),
+            },
+            "api_client": ApiClient.connection_stats(),
+            "upstream": upstream_registry.stats(),
+        }, status=200)
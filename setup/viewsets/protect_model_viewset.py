@@ -1,41 +1,166 @@
-from django.http import JsonResponse
+import hashlib
+
+from django.http import HttpResponseNotModified, JsonResponse
+from django.utils.http import parse_etags, quote_etag
 from django.views import View
 from django.db.models import Model
 
+from common.json_encoder import FastJsonResponse
 from setup.decorators.jwt_decorator import jwt_required
 
 class ProtectModelViewset(View):
-    """A protected API viewset that requires authentication."""
+    """A protected API viewset that requires authentication.
+
+    Lists can be paginated with ``?limit=`` and ``?cursor=`` (keyset pagination on the primary
+    key, the next cursor is returned in the ``X-Next-Cursor`` header), projected with
+    ``?fields=a,b`` and filtered by ``filter_fields`` with ``?<field>=<value>``. When
+    ``get_data_version`` returns a version, responses carry an ETag and conditional
+    requests are answered with 304 Not Modified.
+    """
     model: Model = None
     fields = '__all__'
+    filter_fields = ()
+    max_page_size = 1000
+    reserved_params = ('fields', 'limit', 'cursor')
 
-    def _get_queryset(self):
-        """Return all objects from the model or specific fields if defined."""
-        if self.fields == "__all__":
-            return self.model.objects.all().values()
-        return self.model.objects.all().values(self.fields)
-    
-    def _get_unique_obj(self, id):
-        """Return a single object from the model or specific fields if defined."""
+    def get_data_version(self):
+        """Return a version that changes whenever the model data changes, or None to disable ETags."""
+        return None
+
+    def _get_allowed_fields(self):
+        """Return the fields that can be returned by the viewset."""
         if self.fields == "__all__":
-            return self.model.objects.filter(id=id).values()
-        return self.model.objects.all().filter(id=id).values(self.fields)
+            return [field.attname for field in self.model._meta.concrete_fields]
+        return [self.fields] if isinstance(self.fields, str) else list(self.fields)
+
+    def _get_fields(self, request):
+        """Return the fields requested with ``?fields=``, or every allowed field."""
+        allowed = self._get_allowed_fields()
+        requested = request.GET.get('fields')
+        if not requested:
+            return allowed
+
+        fields = [field.strip() for field in requested.split(',') if field.strip()]
+        unknown = [field for field in fields if field not in allowed]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}.")
+        return fields
+
+    def _get_filters(self, request):
+        """Return the ``filter_fields`` lookups given on the query string.
+
+        Other model fields cannot be filtered by, while parameters that are not model fields,
+        such as cache busters, are ignored.
+        """
+        model_fields = {field.name for field in self.model._meta.concrete_fields}
+        unknown = [
+            param for param in request.GET
+            if param in model_fields and param not in self.filter_fields
+        ]
+        if unknown:
+            raise ValueError(f"Cannot filter by: {', '.join(unknown)}.")
+        return {field: request.GET[field] for field in self.filter_fields if field in request.GET}
+
+    def _get_page(self, request):
+        """Return the ``(limit, cursor)`` of the request, with None when the list is not paginated."""
+        limit = request.GET.get('limit')
+        cursor = request.GET.get('cursor')
+        if limit is None and cursor is None:
+            return None, None
+
+        try:
+            limit = self.max_page_size if limit is None else int(limit)
+            cursor = None if cursor is None else int(cursor)
+        except ValueError:
+            raise ValueError("limit and cursor must be integers.")
+        if not 0 < limit <= self.max_page_size:
+            raise ValueError(f"limit must be between 1 and {self.max_page_size}.")
+        return limit, cursor
+
+    def _get_queryset(self, fields, filters=None, limit=None, cursor=None):
+        """Return the objects of the model with the given fields, one page of them when ``limit`` is set."""
+        queryset = self.model.objects.filter(**(filters or {})).order_by('pk')
+        if cursor is not None:
+            queryset = queryset.filter(pk__gt=cursor)
+        if limit is None:
+            return list(queryset.values(*fields)), None
+
+        rows = list(queryset.values('pk', *fields)[:limit + 1])
+        next_cursor = rows[limit - 1]['pk'] if len(rows) > limit else None
+        for row in rows:
+            row.pop('pk')
+        return rows[:limit], next_cursor
+
+    def _get_unique_obj(self, id, fields):
+        """Return a single object from the model with the given fields."""
+        return self.model.objects.filter(id=id).values(*fields)
+
+    def _get_etag(self, request):
+        """Return the ETag of the response, derived from the data version and the query string."""
+        version = self.get_data_version()
+        if version is None:
+            return None
+        query = hashlib.sha256(request.get_full_path().encode()).hexdigest()[:16]
+        return quote_etag(f"{version}-{query}")
+
+    def _etag_matches(self, request, etag):
+        """Return whether ``If-None-Match`` has the ETag, compared weakly since compression weakens it."""
+        return etag in [tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))]
+
+    def _not_modified(self, etag):
+        """Return a 304 Not Modified response carrying the ETag."""
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    def retrieve(self, request, pk):
+        """Return the response of a single object."""
+        etag = self._get_etag(request)
+        if etag and self._etag_matches(request, etag):
+            return self._not_modified(etag)
+
+        result = list(self._get_unique_obj(pk, self._get_fields(request)))
+        if not result:
+            return JsonResponse({
+                'error': f'Object with id {pk} not found.'
+            }, status=404)
+
+        response = FastJsonResponse(result, safe=False, status=200)
+        if etag:
+            response['ETag'] = etag
+        return response
+
+    def list(self, request):
+        """Return the response of the objects, paginated when asked for."""
+        etag = self._get_etag(request)
+        if etag and self._etag_matches(request, etag):
+            return self._not_modified(etag)
+
+        fields = self._get_fields(request)
+        filters = self._get_filters(request)
+        limit, cursor = self._get_page(request)
+        result, next_cursor = self._get_queryset(fields, filters, limit, cursor)
+
+        response = FastJsonResponse(result, safe=False, status=200)
+        if next_cursor is not None:
+            response['X-Next-Cursor'] = str(next_cursor)
+        if etag:
+            response['ETag'] = etag
+        return response
 
     @jwt_required
     def get(self, request, pk=None, *args, **kwargs):
         """Handle GET requests to return a queryset or a single object."""
         try:
             if pk:
-                result = self._get_unique_obj(pk)
-                if not result:
-                    return JsonResponse({
-                        'error': f'Object with id {pk} not found.'
-                    }, status=404)
-            else:
-                result = self._get_queryset()
-            
-            return JsonResponse(list(result), safe=False, status=200)
-        
+                return self.retrieve(request, pk)
+            return self.list(request)
+
+        except ValueError as e:
+            return JsonResponse({
+                'error': str(e)
+            }, status=400)
+
         except Exception as e:
             return JsonResponse({
                 'error': str(e)
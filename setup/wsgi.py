@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'setup.settings')
 
 application = get_wsgi_application()
+
+# Load the in-memory airport index before the first request is served
+from airports.registry import airport_registry
+
+airport_registry.warmup()